@@ -0,0 +1,482 @@
+"""
+:File: benchmark.py
+:Description: | Benchmarks of the computer vision functions used in tictactoe.py
+              | Usage: python3 benchmark.py <image of the board>
+              |        python3 benchmark.py <directory of images or video file>
+              |        python3 benchmark.py --synthetic <number of scenes>
+              |        python3 benchmark.py --session <recorded session file> [calibration directory]
+              |        python3 benchmark.py --search <time budget of each search>
+              |        python3 benchmark.py --mcts <time budget of each search> [maximum worker processes]
+
+:Author: Willian Beraldi Esperandio
+:Email: willian.esperandio@gmail.com
+:Date: 16/10/2026
+:Revision: version 1
+:License: MIT License
+"""
+
+
+import os
+import sys
+import time
+import math
+import itertools
+import cv2
+import numpy as np
+import tictactoe as ttt
+from capture import openFrameSource, GeneratorSource, ThreadedCapture
+import synthboard
+import recorder
+from calibration import loadCalibration
+from search import SearchEngine
+from transposition import TranspositionTable
+from mcts import MctsEngine
+
+"""
+-->  Measure the average execution time of a function
+-->  Parameters:
+-->          - function: function without parameters to be executed
+-->          - repeats: number of executions
+-->  Return:
+-->          - average time in seconds
+"""
+
+def timeFunction(function, repeats=5):
+    function()
+    start = time.perf_counter()
+    for _ in range(repeats):
+        function()
+    return (time.perf_counter() - start) / repeats
+
+"""
+-->  Test if two lists of squares are equal
+-->  Parameters:
+-->          - squaresA: first list of squares (or None)
+-->          - squaresB: second list of squares (or None)
+-->  Return:
+-->          - True if both contain the same squares in the same order
+-->          - False if they are different
+"""
+
+def sameSquares(squaresA, squaresB):
+    if squaresA is None or squaresB is None:
+        return squaresA is squaresB
+    return len(squaresA) == len(squaresB) and all(np.array_equal(a, b) for a, b in zip(squaresA, squaresB))
+
+"""
+-->  Compare the serial threshold sweep of findSquares with the thread pool version
+-->  Parameters:
+-->          - img: image of the board
+-->          - workerCounts: numbers of threads to be tested
+-->          - repeats: number of executions of each test
+-->  Return:
+-->          - dictionary {numWorkers: (time, speedup, same squares of the serial sweep)}
+"""
+
+def benchmarkFindSquares(img, workerCounts=(1, 2, 3, 4), repeats=5):
+    print("\n---- findSquares: threshold sweep ----")
+    serialSquares = ttt.findSquares(img, numWorkers=1)
+    serialTime = timeFunction(lambda: ttt.findSquares(img, numWorkers=1), repeats)
+    results = {}
+    for numWorkers in workerCounts:
+        squares = ttt.findSquares(img, numWorkers=numWorkers)
+        elapsed = timeFunction(lambda: ttt.findSquares(img, numWorkers=numWorkers), repeats)
+        same = sameSquares(serialSquares, squares)
+        results[numWorkers] = (elapsed, serialTime / elapsed, same)
+        print("Workers: %d - %.2f ms - speedup %.2fx - same squares: %s" % (numWorkers, elapsed*1000, serialTime/elapsed, same))
+    return results
+
+"""
+-->  Computes the average distance between the corners of two squares
+-->  Parameters:
+-->          - squareA: first square
+-->          - squareB: second square
+-->  Return:
+-->          - average distance in pixels (each corner is paired with the nearest one)
+"""
+
+def cornerError(squareA, squareB):
+    distances = np.linalg.norm(squareA[:,None,:].astype(float) - squareB[None,:,:].astype(float), axis=2)
+    return distances.min(axis=1).mean()
+
+"""
+-->  Compare the board localization at full resolution with the coarse-to-fine pyramid search
+-->  Parameters:
+-->          - img: image of the board with the preset pattern
+-->          - levelsList: pyramid depths to be tested (0 is the full resolution search)
+-->          - repeats: number of executions of each test
+-->  Return:
+-->          - dictionary {levels: (time, corner error against full resolution or None)}
+"""
+
+def benchmarkBoardLocalization(img, levelsList=(0, 1, 2, 3), repeats=3):
+    print("\n---- configureBoardPosition: pyramid levels ----")
+    fullSquare = ttt.findBoardSquarePyramid(img, levels=0)
+    print("")
+    results = {}
+    for levels in levelsList:
+        square = ttt.findBoardSquarePyramid(img, levels=levels)
+        elapsed = timeFunction(lambda: ttt.findBoardSquarePyramid(img, levels=levels), repeats)
+        print("")
+        if square is None or fullSquare is None:
+            results[levels] = (elapsed, None)
+            print("Levels: %d - %.2f ms - board not found" % (levels, elapsed*1000))
+        else:
+            error = cornerError(fullSquare, square)
+            results[levels] = (elapsed, error)
+            print("Levels: %d - %.2f ms - corner error %.2f px" % (levels, elapsed*1000, error))
+    return results
+
+"""
+-->  Compare the per-turn latency of the grid cell classifier with the Hough circles path
+-->  Parameters:
+-->          - img: image of the board with the preset pattern
+-->          - repeats: number of executions of each test
+-->  Return:
+-->          - dictionary {classifier: (time, board)}
+"""
+
+def benchmarkCellClassifier(img, repeats=20):
+    print("\n---- Cell classification: grid sampling x Hough circles ----")
+    square = ttt.findBoardSquarePyramid(img)
+    print("")
+    if square is None:
+        print("Board not found")
+        return {}
+    boardImg = ttt.BoardRectifier(square).rectify(img)
+    houghBoard = ttt.getRelativePos(boardImg, ttt.findCircles(boardImg), False)
+    classifier = ttt.CellClassifier.fit(boardImg, houghBoard)
+    results = {}
+    results['hough'] = (timeFunction(lambda: ttt.getRelativePos(boardImg, ttt.findCircles(boardImg), False), repeats), houghBoard)
+    results['grid'] = (timeFunction(lambda: classifier.classify(boardImg), repeats), classifier.classify(boardImg))
+    for name, (elapsed, board) in results.items():
+        print("Classifier: %s - %.3f ms - same board of Hough: %s" % (name, elapsed*1000, np.array_equal(board, houghBoard)))
+    return results
+
+"""
+-->  Previous version of tictactoe.avgGrayIntensity (Python loop), kept as reference
+-->  Parameters:
+-->          - img: image to process
+-->          - height: height of the pixel
+-->          - width: width of the pixel
+-->          - radius: radius of the circle area
+-->  Return:
+-->          - int value containing average gray intensity
+"""
+
+def avgGrayIntensityLoop(img, height, width, radius=20):
+    pixelCount = 0
+    sumIntensity = 0
+    imgX,imgY = img.shape[0:2]
+    for x in range(-radius,radius+1):
+        if(height + x > 0 and height+x < imgX):
+            y = int(math.sqrt(radius*radius - x*x))
+            if (width+y < imgY):
+                sumIntensity = sumIntensity + int(img[height+x][width+y])
+                pixelCount = pixelCount + 1
+            elif (width - y > 0):
+                sumIntensity = sumIntensity + int(img[height+x][width-y])
+                pixelCount = pixelCount + 1
+    return (sumIntensity // pixelCount)
+
+"""
+-->  Compare the Python loop of the average gray intensity with the mask versions (time and values)
+-->  Parameters:
+-->          - numCircles: number of circles of each test (random centers, some near the borders)
+-->          - radius: radius of the circle area
+-->          - repeats: number of executions of each test
+-->  Return:
+-->          - dictionary {version: time}
+"""
+
+def benchmarkAvgGrayIntensity(numCircles=9, radius=20, repeats=50):
+    print("\n---- avgGrayIntensity: loop x masks (%d circles) ----" % numCircles)
+    rng = np.random.RandomState(0)
+    grayImg = rng.randint(0, 256, (300, 300)).astype(np.uint8)
+    centers = rng.randint(0, 300, (numCircles, 2))
+    results = {}
+    results['loop'] = timeFunction(lambda: [avgGrayIntensityLoop(grayImg, y, x, radius) for x, y in centers], repeats)
+    results['mask'] = timeFunction(lambda: [ttt.avgGrayIntensity(grayImg, y, x, radius) for x, y in centers], repeats)
+    results['batch'] = timeFunction(lambda: ttt.avgGrayIntensities(grayImg, centers, radius), repeats)
+    loop = [avgGrayIntensityLoop(grayImg, y, x, radius) for x, y in centers]
+    single = [ttt.avgGrayIntensity(grayImg, y, x, radius) for x, y in centers]
+    batch = list(ttt.avgGrayIntensities(grayImg, centers, radius))
+    for name, elapsed in results.items():
+        print("Version: %s - %.3f ms - speedup %.2fx" % (name, elapsed*1000, results['loop']/elapsed))
+    print("Equal to the loop: mask %s - batch %s" % (single == loop, batch == loop))
+    return results
+
+"""
+-->  Measure the per-frame latency of the board reading over all the frames of a source
+-->  The first frame must contain the preset pattern (it configures the board)
+-->  Parameters:
+-->          - source: FrameSource delivering frames at full speed
+-->  Return:
+-->          - dictionary {stage: average time per frame}
+"""
+
+def benchmarkFrameSource(source):
+    print("\n---- Board reading over a frame source ----")
+    ret, img = source.read()
+    square = ttt.findBoardSquarePyramid(img) if ret else None
+    print("")
+    if square is None:
+        print("Board not found in the first frame")
+        return {}
+    tracker = ttt.BoardTracker(img, square)
+    rectifier = ttt.BoardRectifier(square)
+    boardImg = rectifier.rectify(img)
+    classifier = ttt.CellClassifier.fit(boardImg, ttt.getRelativePos(boardImg, ttt.findCircles(boardImg), False))
+    totals = {'track': 0.0, 'rectify': 0.0, 'classify': 0.0}
+    numFrames = 0
+    ret, img = source.read()
+    while ret:
+        start = time.perf_counter()
+        tracker.update(img)
+        rectifier.setSquare(tracker.square)
+        tracked = time.perf_counter()
+        boardImg = rectifier.rectify(img)
+        rectified = time.perf_counter()
+        ttt.readBoard(boardImg, classifier)
+        totals['track'] += tracked - start
+        totals['rectify'] += rectified - tracked
+        totals['classify'] += time.perf_counter() - rectified
+        numFrames += 1
+        ret, img = source.read()
+    results = {}
+    for stage, total in totals.items():
+        results[stage] = total / max(numFrames, 1)
+        print("Stage: %s - %.3f ms per frame (%d frames)" % (stage, results[stage]*1000, numFrames))
+    return results
+
+"""
+-->  Measure detection and classification over random synthetic scenes with ground truth
+-->  Parameters:
+-->          - count: number of scenes
+-->          - seed: seed of the scenes
+-->          - minIoU: minimum intersection over union of a detected board
+-->  Return:
+-->          - dictionary with the detection rate, the board accuracy and the average times
+"""
+
+def benchmarkSyntheticScenes(count=100, seed=0, minIoU=0.85):
+    print("\n---- Synthetic scenes (%d) ----" % count)
+    rng = np.random.RandomState(seed)
+    detected = correct = 0
+    squaresTime = readTime = 0.0
+    for k in range(count):
+        img, groundTruth = synthboard.randomScene(rng, ttt.ProgConst.numSquares)
+        start = time.perf_counter()
+        squares = ttt.findSquares(img, 1000) or []
+        squaresTime += time.perf_counter() - start
+        bestSquare, bestIoU = None, 0
+        for candidate in ttt.groupSquares(squares):
+            iou = ttt.squareIoU(groundTruth['quad'], candidate.polygon)
+            if iou > bestIoU:
+                bestSquare, bestIoU = candidate.square, iou
+        if bestIoU < minIoU:
+            continue
+        detected += 1
+        start = time.perf_counter()
+        boardImg = ttt.BoardRectifier(bestSquare).rectify(img)
+        board = ttt.getRelativePos(boardImg, ttt.findCircles(boardImg), False)
+        readTime += time.perf_counter() - start
+        expected = synthboard.cellLetters(groundTruth['cells'], ttt.ProgConst.boardRotation)
+        if board is not None and np.array_equal(np.array(board), expected):
+            correct += 1
+    results = {'detectionRate': detected / count, 'boardAccuracy': correct / max(detected, 1),
+               'findSquaresTime': squaresTime / count, 'readTime': readTime / max(detected, 1)}
+    print("Board detected: %.1f%% - findSquares %.2f ms" % (results['detectionRate']*100, results['findSquaresTime']*1000))
+    print("Board read correctly: %.1f%% of detected - %.2f ms" % (results['boardAccuracy']*100, results['readTime']*1000))
+    return results
+
+"""
+-->  Count the image allocations of the steady-state loop (capture, tracking, motion gate and
+-->  board reading) over copies of an image delivered by a threaded capture
+-->  Parameters:
+-->          - img: image of the board
+-->          - numFrames: number of frames measured
+-->          - warmupFrames: frames processed before the counters are restarted
+-->  Return:
+-->          - dictionary with the allocations of the pool and of the source in the measured frames
+"""
+
+def benchmarkFramePool(img, numFrames=200, warmupFrames=20):
+    print("\n---- Frame pool allocations ----")
+    square = ttt.findBoardSquarePyramid(img)
+    print("")
+    if square is None:
+        print("Board not found")
+        return {}
+    tracker = ttt.BoardTracker(img, square)
+    rectifier = ttt.BoardRectifier(square)
+    motionGate = ttt.MotionGate(square)
+    boardImg = rectifier.rectify(img)
+    classifier = ttt.CellClassifier.fit(boardImg, ttt.getRelativePos(boardImg, ttt.findCircles(boardImg), False))
+    pool = ttt.framePool
+    cam = ThreadedCapture(GeneratorSource(itertools.repeat(img)), pool).start()
+    start = time.perf_counter()
+    for k in range(numFrames + warmupFrames):
+        if k == warmupFrames:
+            pool.resetCounters()
+            cam.sourceAllocations = 0
+            start = time.perf_counter()
+        ret, frame = cam.read(newFrame=True)
+        if not ret:
+            break
+        tracker.update(frame)
+        rectifier.setSquare(tracker.square)
+        motionGate.setSquare(tracker.square)
+        motionGate.update(frame)
+        ttt.readBoard(rectifier.rectify(frame, pool.buffer('boardImg', boardImg.shape)), classifier)
+    elapsed = time.perf_counter() - start
+    cam.release()
+    results = {'poolAllocations': pool.allocations, 'sourceAllocations': cam.sourceAllocations,
+               'poolRequests': pool.requests, 'frameTime': elapsed / numFrames}
+    print("Buffers requested: %d - allocated: %d - frames allocated by the source: %d" %
+          (results['poolRequests'], results['poolAllocations'], results['sourceAllocations']))
+    print("Loop time: %.3f ms per frame" % (results['frameTime']*1000))
+    return results
+
+"""
+-->  Replay a recorded session through the grid classifier and compare with the recorded states
+-->  The classifier is fitted on the preset board recorded at the configuration, or loaded from
+-->  the calibration when the session has no preset board (warm start)
+-->  Parameters:
+-->          - path: session file
+-->          - calibrationPath: directory of the calibration (None uses ProgConst.calibrationPath)
+-->  Return:
+-->          - dictionary with the agreement with the recorded states and the average time
+-->          - empty dictionary if the session can't be replayed
+"""
+
+def benchmarkSession(path, calibrationPath=None):
+    print("\n---- Replay of the session " + path + " ----")
+    session = recorder.loadSession(path)
+    if session is None or len(session) == 0:
+        print(ttt.bcolors.FAIL + "ERROR: Invalid or empty session" + ttt.bcolors.ENDC)
+        return {}
+    preset = np.flatnonzero(session['frameIndex'] == recorder.PRESET_FRAME)
+    known = np.flatnonzero((session['board'] != recorder.UNKNOWN_CELL).all(axis=(1, 2)) &
+                           (session['frameIndex'] != recorder.PRESET_FRAME))
+    if len(known) == 0:
+        print(ttt.bcolors.FAIL + "ERROR: No record with a known board state" + ttt.bcolors.ENDC)
+        return {}
+    classifier = None
+    if len(preset) > 0:
+        classifier = ttt.CellClassifier.fit(session['image'][preset[0]], np.char.decode(session['board'][preset[0]]))
+    else:
+        metadata, arrays = loadCalibration(ttt.ProgConst.calibrationPath if calibrationPath is None else calibrationPath)
+        if metadata is not None and metadata.get("cellClassifier") is not None:
+            classifier = ttt.CellClassifier.fromDict(metadata["cellClassifier"])
+    if classifier is None:
+        print(ttt.bcolors.FAIL + "ERROR: No cell classifier: the session has no preset board and the calibration "
+              "has no classifier" + ttt.bcolors.ENDC)
+        return {}
+    agreements = 0
+    start = time.perf_counter()
+    for k in known:
+        board = classifier.classify(session['image'][k])
+        if np.array_equal(np.char.encode(board), session['board'][k]):
+            agreements += 1
+    elapsed = time.perf_counter() - start
+    duration = session['timestamp'][-1] - session['timestamp'][0]
+    results = {'records': len(session), 'knownRecords': len(known), 'agreement': agreements / len(known),
+               'readTime': elapsed / len(known)}
+    print("Records: %d (%.1f s) - with board state: %d - classifier: %s" % (results['records'], duration,
+          results['knownRecords'], "preset board" if len(preset) > 0 else "calibration"))
+    print("Same board of the record: %.1f%% - %.3f ms per board" % (results['agreement']*100, results['readTime']*1000))
+    return results
+
+"""
+-->  Measure the nodes per second and the depth reached by the search engine after the first
+-->  move of the opponent in the center of the board, without and with a transposition table
+-->  Parameters:
+-->          - timeBudget: time of each search in seconds
+-->          - boards: list of (numSquares, winLength)
+-->  Return:
+-->          - dictionary {(numSquares, winLength, table): (nodes per second, depth)}
+"""
+
+def benchmarkSearch(timeBudget=2.0, boards=((3, 3), (4, 4), (5, 4), (7, 5), (9, 5), (15, 5))):
+    print("\n---- Alpha-beta search (%.1f s per move) ----" % timeBudget)
+    results = {}
+    for numSquares, winLength in boards:
+        for table in (None, TranspositionTable(numSquares, winLength)):
+            engine = SearchEngine(numSquares, winLength, table=table)
+            center = numSquares//2*numSquares + numSquares//2
+            start = time.perf_counter()
+            cell, score, depth = engine.search(0, 1 << center, timeBudget)
+            elapsed = time.perf_counter() - start
+            results[numSquares, winLength, table is not None] = (engine.nodes / elapsed, depth)
+            print("Board: %dx%d, %d in a row%s - %.0f nodes/s - depth %d - %.3f s - move %s" %
+                  (numSquares, numSquares, winLength, " (transposition table)" if table is not None else "",
+                   engine.nodes / elapsed, depth, elapsed, divmod(cell, numSquares)))
+    return results
+
+"""
+-->  Measure the playouts per second of the Monte Carlo tree search with 1 to N worker processes,
+-->  after the first move of the opponent in the center of the board, and the start time of the
+-->  worker processes (paid when the engine is created, not in the search)
+-->  Parameters:
+-->          - timeBudget: time of each search in seconds
+-->          - boards: list of (numSquares, winLength)
+-->          - maxWorkers: maximum number of worker processes (None = number of cores)
+-->  Return:
+-->          - dictionary {(numSquares, winLength, workers): playouts per second}
+"""
+
+def benchmarkMcts(timeBudget=2.0, boards=((3, 3), (7, 5), (15, 5)), maxWorkers=None):
+    if maxWorkers is None:
+        maxWorkers = os.cpu_count() or 1
+    print("\n---- Monte Carlo tree search (%.1f s per move, %d cores) ----" % (timeBudget, os.cpu_count() or 1))
+    results = {}
+    for numSquares, winLength in boards:
+        center = numSquares//2*numSquares + numSquares//2
+        for workers in sorted({1, min(2, maxWorkers), min(4, maxWorkers), maxWorkers}):
+            start = time.perf_counter()
+            engine = MctsEngine(numSquares, winLength, workers, ttt.ProgConst.mctsPlayoutsPerLeaf,
+                                ttt.ProgConst.mctsBatchSize, ttt.ProgConst.mctsExploration, seed=0)
+            startTime = time.perf_counter() - start
+            cell, winRate, playouts = engine.search(0, 1 << center, timeBudget)
+            engine.close()
+            results[numSquares, winLength, workers] = playouts / engine.elapsed
+            print("Board: %dx%d, %d in a row - %d workers - %.0f playouts/s - search %.3f s - start %.2f s - move %s" %
+                  (numSquares, numSquares, winLength, workers, playouts / engine.elapsed, engine.elapsed,
+                   startTime, divmod(cell, numSquares)))
+    return results
+
+
+if __name__ == '__main__':
+    if len(sys.argv) < 2:
+        print("Usage: python3 benchmark.py <image of the board>")
+        sys.exit(1)
+    ttt.display.setMode('off')
+    if sys.argv[1] == '--synthetic':
+        benchmarkSyntheticScenes(int(sys.argv[2]) if len(sys.argv) > 2 else 100)
+        sys.exit(0)
+    if sys.argv[1] == '--search':
+        benchmarkSearch(float(sys.argv[2]) if len(sys.argv) > 2 else 2.0)
+        sys.exit(0)
+    if sys.argv[1] == '--mcts':
+        benchmarkMcts(float(sys.argv[2]) if len(sys.argv) > 2 else 2.0, maxWorkers=int(sys.argv[3]) if len(sys.argv) > 3 else None)
+        sys.exit(0)
+    if sys.argv[1] == '--session':
+        results = benchmarkSession(sys.argv[2], sys.argv[3] if len(sys.argv) > 3 else None)
+        sys.exit(0 if results else 1)
+    ## --- A single image or the first frame of a directory of images or video file
+    isSource = os.path.isdir(sys.argv[1]) or cv2.imread(sys.argv[1]) is None
+    if isSource:
+        ret, img = openFrameSource(sys.argv[1]).read()
+    else:
+        img = cv2.imread(sys.argv[1])
+    if img is None:
+        print(ttt.bcolors.FAIL + "ERROR: Unable to read " + sys.argv[1] + ttt.bcolors.ENDC)
+        sys.exit(1)
+    benchmarkFindSquares(img)
+    benchmarkBoardLocalization(img)
+    benchmarkCellClassifier(img)
+    benchmarkAvgGrayIntensity()
+    benchmarkFramePool(img)
+    if isSource:
+        benchmarkFrameSource(openFrameSource(sys.argv[1]))
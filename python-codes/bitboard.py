@@ -0,0 +1,251 @@
+"""
+:File: bitboard.py
+:Description: | Compact representation of the game: one bit mask of N*N bits for each player
+              | Masks of the lines of k cells are precomputed for any N and k
+              | Win, full board and legal moves are bit operations, without arrays
+
+:Author: Willian Beraldi Esperandio
+:Email: willian.esperandio@gmail.com
+:Date: 16/10/2026
+:Revision: version 1
+:License: MIT License
+"""
+
+
+import random
+from functools import lru_cache
+import numpy as np
+
+"""
+--> Letters of the cells in the boards produced by the vision
+"""
+
+WHITE_LETTER = 'W'
+BLACK_LETTER = 'B'
+EMPTY_LETTER = '-'
+
+"""
+-->  Masks of all lines of k cells (rows, columns and both diagonals) of a board
+-->  Cell (i, j) is the bit i*numSquares + j
+-->  Parameters:
+-->          - numSquares: number of cells of each row
+-->          - k: number of pieces in a row to win
+-->  Return:
+-->          - tuple of masks
+"""
+
+@lru_cache(maxsize=16)
+def lineMasks(numSquares, k):
+    lines = []
+    for i in range(numSquares):
+        for j in range(numSquares):
+            for di, dj in ((0, 1), (1, 0), (1, 1), (1, -1)):
+                lastI, lastJ = i + di*(k-1), j + dj*(k-1)
+                if 0 <= lastI < numSquares and 0 <= lastJ < numSquares:
+                    mask = 0
+                    for step in range(k):
+                        mask |= 1 << ((i + di*step)*numSquares + j + dj*step)
+                    lines.append(mask)
+    return tuple(lines)
+
+"""
+-->  Masks of the lines passing through each cell
+-->  Parameters:
+-->          - numSquares: number of cells of each row
+-->          - k: number of pieces in a row to win
+-->  Return:
+-->          - tuple (one item for each cell) of tuples of masks
+"""
+
+@lru_cache(maxsize=16)
+def cellLineMasks(numSquares, k):
+    lines = lineMasks(numSquares, k)
+    return tuple(tuple(line for line in lines if line >> cell & 1) for cell in range(numSquares*numSquares))
+
+"""
+-->  Masks of the corners, of the center (empty if numSquares is even) and of the other cells
+-->  Parameters:
+-->          - numSquares: number of cells of each row
+-->  Return:
+-->          - corners, center and sides masks
+"""
+
+@lru_cache(maxsize=16)
+def regionMasks(numSquares):
+    last = numSquares - 1
+    corners = 0
+    for i, j in ((0, 0), (0, last), (last, 0), (last, last)):
+        corners |= 1 << (i*numSquares + j)
+    center = 0
+    if numSquares % 2 == 1:
+        center = 1 << (numSquares//2*numSquares + numSquares//2)
+    sides = ((1 << numSquares*numSquares) - 1) & ~corners & ~center
+    return corners, center, sides
+
+"""
+-->  Index of a random set bit of a mask
+-->  Parameters:
+-->          - mask: mask with at least one bit set
+-->  Return:
+-->          - index of the bit
+"""
+
+def randomBit(mask):
+    for _ in range(random.randrange(bin(mask).count('1'))):
+        mask &= mask - 1
+    return (mask & -mask).bit_length() - 1
+
+"""
+-->  Iterate over the indexes of the set bits of a mask
+"""
+
+def iterBits(mask):
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+"""
+--> Class of the board as two bit masks: white and black pieces
+"""
+
+class BitBoard:
+    def __init__(self, numSquares=3, k=None, white=0, black=0):
+        self.numSquares = numSquares
+        self.k = numSquares if k is None else k
+        self.white = white
+        self.black = black
+        self.fullMask = (1 << numSquares*numSquares) - 1
+        self.lines = lineMasks(numSquares, self.k)
+
+    """
+    -->  Create the bit board of a board produced by the vision
+    -->  The masks are built with int operations only, so move selection doesn't create arrays
+    -->  Parameters:
+    -->          - board: numSquares x numSquares chararray of 'W', 'B' and '-'
+    -->          - k: number of pieces in a row to win (None = numSquares)
+    -->  Return:
+    -->          - BitBoard
+    """
+
+    @staticmethod
+    def fromCharArray(board, k=None):
+        white = black = 0
+        bit = 1
+        ## --- Rows of numpy boards are converted once to lists of letters
+        for row in (board.tolist() if hasattr(board, 'tolist') else board):
+            for cell in row:
+                if cell == WHITE_LETTER:
+                    white |= bit
+                elif cell == BLACK_LETTER:
+                    black |= bit
+                bit <<= 1
+        return BitBoard(len(board), k, white, black)
+
+    """
+    -->  Convert the bit board to the chararray used by the vision
+    -->  Return:
+    -->          - numSquares x numSquares chararray of 'W', 'B' and '-'
+    """
+
+    def toCharArray(self):
+        board = np.chararray((self.numSquares, self.numSquares), 1, True)
+        board[:] = EMPTY_LETTER
+        flat = board.reshape(-1)
+        flat[list(iterBits(self.white))] = WHITE_LETTER
+        flat[list(iterBits(self.black))] = BLACK_LETTER
+        return board
+
+    def copy(self):
+        return BitBoard(self.numSquares, self.k, self.white, self.black)
+
+    """
+    -->  Mask of the pieces of a letter
+    """
+
+    def pieces(self, letter):
+        return self.white if letter == WHITE_LETTER else self.black
+
+    """
+    -->  Mask of the empty cells (legal moves)
+    """
+
+    def empty(self):
+        return self.fullMask & ~(self.white | self.black)
+
+    def legalMoves(self):
+        return iterBits(self.empty())
+
+    def isFull(self):
+        return (self.white | self.black) == self.fullMask
+
+    """
+    -->  Test if a letter has k pieces in a row
+    """
+
+    def isWinner(self, letter):
+        mask = self.pieces(letter)
+        for line in self.lines:
+            if mask & line == line:
+                return True
+        return False
+
+    """
+    -->  Test if a move completed a line (only the lines through the cell are tested)
+    -->  Parameters:
+    -->          - mask: pieces of the player after the move
+    -->          - cell: cell of the move
+    -->  Return:
+    -->          - True if the move won the game
+    """
+
+    def isWinningMove(self, mask, cell):
+        for line in cellLineMasks(self.numSquares, self.k)[cell]:
+            if mask & line == line:
+                return True
+        return False
+
+    """
+    -->  Mask of the empty cells that complete a line of a letter
+    -->  Parameters:
+    -->          - letter: letter of the player
+    -->  Return:
+    -->          - mask of the winning moves (0 if there is none)
+    """
+
+    def winningMoves(self, letter):
+        mask = self.pieces(letter)
+        empty = self.empty()
+        moves = 0
+        for line in self.lines:
+            missing = line & ~mask
+            ## --- A single missing cell, and it is empty
+            if missing & (missing - 1) == 0 and missing & empty:
+                moves |= missing
+        return moves
+
+    """
+    -->  Place a piece
+    -->  Parameters:
+    -->          - cell: index of the cell (row*numSquares + column)
+    -->          - letter: letter of the piece
+    -->  Return:
+    -->          - None
+    """
+
+    def play(self, cell, letter):
+        if letter == WHITE_LETTER:
+            self.white |= 1 << cell
+        else:
+            self.black |= 1 << cell
+
+    def undo(self, cell):
+        self.white &= ~(1 << cell)
+        self.black &= ~(1 << cell)
+
+    """
+    -->  Convert a cell index to (row, column)
+    """
+
+    def position(self, cell):
+        return divmod(cell, self.numSquares)
@@ -0,0 +1,110 @@
+"""
+:File: calibration.py
+:Description: | Persistent storage of the board calibration
+              | Metadata is saved in a versioned json file and arrays in .npy files
+              | Each save writes new array files, named by the metadata, so the files of the
+              | calibration in use are never overwritten
+              | Arrays are loaded as memory-mapped files
+
+:Author: Willian Beraldi Esperandio
+:Email: willian.esperandio@gmail.com
+:Date: 16/10/2026
+:Revision: version 1
+:License: MIT License
+"""
+
+
+import json
+import os
+import time
+import numpy as np
+
+"""
+--> Version of the calibration files, calibrations of other versions are ignored
+"""
+
+CALIBRATION_VERSION = 3
+METADATA_FILE = "calibration.json"
+
+"""
+-->  Read the metadata of a calibration
+-->  Parameters:
+-->          - path: directory of the calibration
+-->  Return:
+-->          - metadata dictionary (None if there is no valid calibration)
+"""
+
+def readMetadata(path):
+    try:
+        with open(os.path.join(path, METADATA_FILE)) as file:
+            metadata = json.load(file)
+    except (OSError, ValueError):
+        return None
+    if not isinstance(metadata, dict) or metadata.get("version") != CALIBRATION_VERSION:
+        return None
+    return metadata
+
+"""
+-->  Save a calibration in a directory
+-->  The arrays are written to files of a new generation and the metadata naming them is
+-->  replaced at once, so an interrupted save leaves the previous calibration intact
+-->  Parameters:
+-->          - path: directory of the calibration (created if it doesn't exist)
+-->          - metadata: dictionary with json serializable values
+-->          - arrays: dictionary {name: numpy array}
+-->  Return:
+-->          - None
+"""
+
+def saveCalibration(path, metadata, arrays):
+    os.makedirs(path, exist_ok=True)
+    previous = readMetadata(path)
+    generation = 1 if previous is None else previous.get("generation", 0) + 1
+    files = {}
+    for name, array in arrays.items():
+        files[name] = "%s.%d.npy" % (name, generation)
+        with open(os.path.join(path, files[name]), "wb") as file:
+            np.save(file, np.ascontiguousarray(array))
+            file.flush()
+            os.fsync(file.fileno())
+    content = dict(metadata)
+    content["version"] = CALIBRATION_VERSION
+    content["generation"] = generation
+    content["created"] = time.time()
+    content["arrays"] = files
+    tmpFile = os.path.join(path, METADATA_FILE + ".tmp")
+    with open(tmpFile, "w") as file:
+        json.dump(content, file, indent=2)
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(tmpFile, os.path.join(path, METADATA_FILE))
+
+    ## --- Files of the previous generations (and of interrupted saves) are removed. A process that
+    ## --- mapped them keeps reading the old data until it drops the arrays
+    for fileName in os.listdir(path):
+        if fileName.endswith(".npy") and fileName not in files.values():
+            try:
+                os.remove(os.path.join(path, fileName))
+            except OSError:
+                pass
+
+"""
+-->  Load a calibration from a directory
+-->  Parameters:
+-->          - path: directory of the calibration
+-->  Return:
+-->          - metadata dictionary and dictionary of memory-mapped arrays
+-->          - None, None if there is no valid calibration
+"""
+
+def loadCalibration(path):
+    metadata = readMetadata(path)
+    if metadata is None:
+        return None, None
+    try:
+        arrays = {}
+        for name, fileName in metadata["arrays"].items():
+            arrays[name] = np.load(os.path.join(path, fileName), mmap_mode='r')
+        return metadata, arrays
+    except (OSError, ValueError, KeyError, AttributeError):
+        return None, None
@@ -0,0 +1,370 @@
+"""
+:File: capture.py
+:Description: | Frame sources: camera, video file, image directory and in-memory frames
+              | Camera capture running in its own thread
+              | Only the newest frame is kept, so readers never wait for the next exposure
+              | Frames and intermediate images reuse preallocated buffers of a frame pool
+
+:Author: Willian Beraldi Esperandio
+:Email: willian.esperandio@gmail.com
+:Date: 16/10/2026
+:Revision: version 1
+:License: MIT License
+"""
+
+
+import os
+import abc
+import threading
+from collections import deque
+import time
+import cv2
+import numpy as np
+
+"""
+--> Default number of frame buffers of the capture: the buffer being written, the newest frame
+--> and the frames still held by the reader. A reader that keeps a frame while reading more than
+--> HELD_FRAMES newer frames must copy it
+"""
+
+FRAME_BUFFERS = 4
+HELD_FRAMES = 2
+
+"""
+--> Class to reuse preallocated images instead of allocating new ones on every frame
+--> Each buffer is identified by a name and is created once for each resolution and type, so
+--> it can be passed as the dst parameter of OpenCV functions. The counters show if the
+--> steady-state loop still allocates: allocations must stop growing after the first frames
+"""
+
+class FramePool:
+    def __init__(self):
+        self.buffers = {}
+        self.lock = threading.Lock()
+        self.allocations = 0
+        self.requests = 0
+
+    """
+    -->  Get the buffer of a name, allocated only if the name is new or the shape changed
+    -->  Parameters:
+    -->          - name: name of the buffer (any hashable value)
+    -->          - shape: shape of the buffer
+    -->          - dtype: type of the buffer
+    -->  Return:
+    -->          - numpy array (its content is the one of the last use)
+    """
+
+    def buffer(self, name, shape, dtype=np.uint8):
+        with self.lock:
+            self.requests += 1
+            buffer = self.buffers.get(name)
+            if buffer is None or buffer.shape != tuple(shape) or buffer.dtype != dtype:
+                buffer = np.empty(shape, dtype)
+                self.buffers[name] = buffer
+                self.allocations += 1
+            return buffer
+
+    """
+    -->  Get a buffer with the shape and type of an image
+    -->  Parameters:
+    -->          - name: name of the buffer
+    -->          - img: image used as model
+    -->          - channels: number of channels (None keeps the channels of the image)
+    -->  Return:
+    -->          - numpy array
+    """
+
+    def like(self, name, img, channels=None):
+        shape = img.shape if channels is None else img.shape[:2] + ((channels,) if channels > 1 else ())
+        return self.buffer(name, shape, img.dtype)
+
+    """
+    -->  Copy an image into a buffer (used for the annotated copies of the images)
+    -->  Parameters:
+    -->          - name: name of the buffer
+    -->          - img: image to be copied
+    -->  Return:
+    -->          - copy of the image
+    """
+
+    def copy(self, name, img):
+        buffer = self.like(name, img)
+        np.copyto(buffer, img)
+        return buffer
+
+    """
+    -->  Restart the counters, used to measure only the steady-state loop
+    """
+
+    def resetCounters(self):
+        with self.lock:
+            self.allocations = 0
+            self.requests = 0
+
+"""
+--> Base class of the frame sources, same read/release interface of cv2.VideoCapture
+--> If fps is given, read() waits to deliver the frames at that rate, otherwise frames are
+--> delivered at full speed. Subclasses implement read()
+"""
+
+class FrameSource(abc.ABC):
+    def __init__(self, fps=None):
+        self.fps = fps
+        self.nextFrameTime = None
+
+    """
+    -->  Wait until the time of the next frame (only if fps was given)
+    """
+
+    def pace(self):
+        if not self.fps:
+            return
+        now = time.perf_counter()
+        if self.nextFrameTime is not None and now < self.nextFrameTime:
+            time.sleep(self.nextFrameTime - now)
+            now = self.nextFrameTime
+        self.nextFrameTime = now + 1.0/self.fps
+
+    """
+    -->  Read the next frame
+    -->  Parameters:
+    -->          - image: image where the frame is written, if the source can read in place
+    -->  Return:
+    -->          - ret: True if the frame is valid, False at the end of the source (or on error)
+    -->          - frame: the frame (image itself if it was written in place), None if ret is False
+    """
+
+    @abc.abstractmethod
+    def read(self, image=None):
+        pass
+
+    def isOpened(self):
+        return True
+
+    def release(self):
+        pass
+
+"""
+--> Live camera
+"""
+
+class CameraSource(FrameSource):
+    def __init__(self, index=0):
+        FrameSource.__init__(self)
+        self.capture = cv2.VideoCapture(index)
+
+    def read(self, image=None):
+        return self.capture.read(image)
+
+    def isOpened(self):
+        return self.capture.isOpened()
+
+    def release(self):
+        self.capture.release()
+
+"""
+--> Video file, optionally restarted at the end
+"""
+
+class VideoFileSource(FrameSource):
+    def __init__(self, path, fps=None, loop=False):
+        FrameSource.__init__(self, fps)
+        self.path = path
+        self.loop = loop
+        self.capture = cv2.VideoCapture(path)
+
+    def read(self, image=None):
+        self.pace()
+        ret, frame = self.capture.read(image)
+        if not ret and self.loop:
+            self.capture.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            ret, frame = self.capture.read(image)
+        return ret, frame
+
+    def isOpened(self):
+        return self.capture.isOpened()
+
+    def release(self):
+        self.capture.release()
+
+"""
+--> Directory of images replayed in alphabetical order
+"""
+
+class ImageDirectorySource(FrameSource):
+    extensions = ('.png', '.jpg', '.jpeg', '.bmp', '.tif', '.tiff')
+
+    def __init__(self, path, fps=None, loop=True):
+        FrameSource.__init__(self, fps)
+        self.files = sorted(os.path.join(path, name) for name in os.listdir(path)
+                            if name.lower().endswith(self.extensions))
+        self.loop = loop
+        self.position = 0
+
+    def read(self, image=None):
+        if self.position >= len(self.files):
+            if not self.loop or len(self.files) == 0:
+                return False, None
+            self.position = 0
+        self.pace()
+        frame = cv2.imread(self.files[self.position])
+        self.position += 1
+        return frame is not None, frame
+
+    def isOpened(self):
+        return len(self.files) > 0
+
+"""
+--> In-memory frames: any iterable of images (list, numpy array or generator)
+"""
+
+class GeneratorSource(FrameSource):
+    def __init__(self, frames, fps=None):
+        FrameSource.__init__(self, fps)
+        self.frames = iter(frames)
+
+    def read(self, image=None):
+        self.pace()
+        frame = next(self.frames, None)
+        if frame is not None and image is not None and image.shape == frame.shape and image.dtype == frame.dtype:
+            ## --- Same behaviour of cv2.VideoCapture.read: the frame is written in the given image
+            np.copyto(image, frame)
+            frame = image
+        return frame is not None, frame
+
+"""
+-->  Create the frame source of a description
+-->  Parameters:
+-->          - source: camera index (int), directory of images or video file
+-->          - fps: replay rate of files (None delivers frames at full speed)
+-->          - loop: restart files at the end
+-->  Return:
+-->          - FrameSource
+"""
+
+def openFrameSource(source, fps=None, loop=False):
+    if isinstance(source, int):
+        return CameraSource(source)
+    if os.path.isdir(source):
+        return ImageDirectorySource(source, fps, loop)
+    return VideoFileSource(source, fps, loop)
+
+"""
+--> Class to capture frames in a thread and keep the newest one in a single-slot buffer
+--> It has the same read/release interface of cv2.VideoCapture
+--> Frames are captured in place into a ring of buffers of the frame pool. The buffer being
+--> written is never the newest frame nor one of the last heldFrames frames returned to the
+--> reader, so a frame stays valid until the reader has read heldFrames newer frames
+"""
+
+class ThreadedCapture:
+    def __init__(self, source, pool=None, numBuffers=None, heldFrames=None):
+        self.source = source
+        self.pool = FramePool() if pool is None else pool
+        self.heldFrames = HELD_FRAMES if heldFrames is None else heldFrames
+        self.numBuffers = max(FRAME_BUFFERS if numBuffers is None else numBuffers, self.heldFrames + 2)
+        self.frameSlot = None
+        self.heldSlots = deque(maxlen=self.heldFrames)
+        self.frameShape = None
+        self.sourceAllocations = 0
+        self.lock = threading.Condition()
+        self.frame = None
+        self.ret = False
+        self.timestamp = 0.0
+        self.frameIndex = 0
+        self.readIndex = 0
+        self.droppedFrames = 0
+        self.running = False
+        self.thread = None
+
+    """
+    -->  Start the capture thread
+    -->  Return:
+    -->          - self, to allow ThreadedCapture(source).start()
+    """
+
+    def start(self):
+        if not self.running:
+            self.running = True
+            self.thread = threading.Thread(target=self.update, name="ThreadedCapture", daemon=True)
+            self.thread.start()
+        return self
+
+    """
+    -->  Loop of the capture thread
+    """
+
+    def update(self):
+        while self.running:
+            with self.lock:
+                busySlots = list(self.heldSlots) + [self.frameSlot]
+            slot = next(i for i in range(self.numBuffers) if i not in busySlots)
+            image = None
+            if self.frameShape is not None:
+                image = self.pool.buffer(("frame", slot), self.frameShape)
+            ret, frame = self.source.read(image)
+            timestamp = time.time()
+            if ret and frame is not image:
+                ## --- Source without in-place reading, or first frame of a new resolution
+                self.sourceAllocations += 1
+                if frame.shape != self.frameShape:
+                    self.frameShape = frame.shape
+            with self.lock:
+                ## --- Frame replaced before being read by any consumer
+                if self.frameIndex > self.readIndex:
+                    self.droppedFrames += 1
+                self.ret, self.frame, self.timestamp = ret, frame, timestamp
+                self.frameSlot = slot
+                self.frameIndex += 1
+                self.lock.notify_all()
+            if not ret:
+                ## --- End of the source (or camera error), avoid a busy loop
+                time.sleep(0.01)
+
+    """
+    -->  Get the newest frame with its timestamp (only waits for the first frame)
+    -->  Parameters:
+    -->          - timeout: maximum waiting time in seconds
+    -->          - newFrame: wait for a frame not returned yet (used to analyze distinct frames)
+    -->  Return:
+    -->          - ret: True if the frame is valid
+    -->          - frame: newest frame (None if there is no frame)
+    -->          - timestamp: time.time() of the capture
+    -->          - frameIndex: number of the frame since the start of the capture
+    """
+
+    def readWithTimestamp(self, timeout=2.0, newFrame=False):
+        with self.lock:
+            if newFrame:
+                self.lock.wait_for(lambda: self.frameIndex > self.readIndex, timeout)
+            elif self.frameIndex == 0:
+                self.lock.wait_for(lambda: self.frameIndex > 0, timeout)
+            if self.readIndex != self.frameIndex:
+                self.heldSlots.append(self.frameSlot)
+            self.readIndex = self.frameIndex
+            return self.ret, self.frame, self.timestamp, self.frameIndex
+
+    """
+    -->  Get the newest frame, same return of cv2.VideoCapture.read
+    -->  Parameters:
+    -->          - image: ignored, kept for compatibility with cv2.VideoCapture.read
+    -->          - newFrame: wait for a frame not returned yet
+    -->  Return:
+    -->          - ret: True if the frame is valid
+    -->          - frame: newest frame
+    """
+
+    def read(self, image=None, newFrame=False):
+        ret, frame, timestamp, frameIndex = self.readWithTimestamp(newFrame=newFrame)
+        return ret, frame
+
+    """
+    -->  Stop the capture thread and release the source
+    """
+
+    def release(self):
+        self.running = False
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+        self.source.release()
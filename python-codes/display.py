@@ -0,0 +1,170 @@
+"""
+:File: display.py
+:Description: | Display layer of the images: headless, throttled preview, MJPEG stream or full debug
+              | Windows are created once and preview images are downscaled and throttled
+              | In headless and stream modes the keys are read from the terminal
+
+:Author: Willian Beraldi Esperandio
+:Email: willian.esperandio@gmail.com
+:Date: 16/10/2026
+:Revision: version 1
+:License: MIT License
+"""
+
+
+import sys
+import time
+import queue
+import threading
+import cv2
+
+"""
+--> Display modes
+-->     - off: headless, no window is created and no image is drawn
+-->     - throttled: preview windows refreshed at most fps times per second with downscaled images
+-->     - stream: same images of the throttled mode sent to a PreviewServer instead of windows
+-->     - debug: every window at full resolution on every call
+"""
+
+MODE_OFF = 'off'
+MODE_THROTTLED = 'throttled'
+MODE_STREAM = 'stream'
+MODE_DEBUG = 'debug'
+
+"""
+--> Keys of the terminal lines in headless and stream modes (same codes of cv2.waitKey)
+"""
+
+TERMINAL_KEYS = {'': 13, 'q': 27, 'c': 32, 'l': 8}
+
+"""
+--> Class to show the images of the program according to the display mode
+--> Callers test wants() before drawing an annotated image, so nothing is drawn for images
+--> that won't be shown (in stream mode, images of streams without clients)
+"""
+
+class Display:
+    def __init__(self, mode=MODE_THROTTLED, fps=10, scale=0.5, pool=None, windowSize=(640, 360), server=None):
+        self.mode = mode
+        self.fps = fps
+        self.scale = scale
+        self.pool = pool
+        self.server = server
+        self.windowSize = windowSize
+        self.windows = set()
+        self.lastShown = {}
+        self.keys = None
+
+    """
+    -->  Change the display mode, closing the windows if the new mode is headless
+    """
+
+    def setMode(self, mode):
+        self.mode = mode
+        if mode == MODE_OFF:
+            self.close()
+
+    """
+    -->  Test if an image of a window would be shown now
+    -->  Parameters:
+    -->          - windowName: name of the window
+    -->          - debug: window only shown in debug mode
+    -->  Return:
+    -->          - True if the image must be drawn and shown
+    """
+
+    def wants(self, windowName, debug=False):
+        if self.mode == MODE_DEBUG:
+            return True
+        if self.mode == MODE_OFF or debug:
+            return False
+        if self.mode == MODE_STREAM:
+            if self.server is None:
+                return False
+            self.server.addStream(windowName)
+            if not self.server.hasClients(windowName):
+                return False
+        return time.perf_counter() - self.lastShown.get(windowName, 0.0) >= 1.0/self.fps
+
+    """
+    -->  Show an image in a window, created only in the first call
+    -->  Parameters:
+    -->          - windowName: name of the window
+    -->          - img: image to be displayed
+    -->          - debug: window only shown in debug mode
+    -->  Return:
+    -->          - True if the image was shown
+    """
+
+    def show(self, windowName, img, debug=False):
+        if not self.wants(windowName, debug):
+            return False
+        if windowName not in self.windows and self.mode != MODE_STREAM:
+            cv2.namedWindow(windowName, cv2.WINDOW_NORMAL | cv2.WINDOW_KEEPRATIO | cv2.WINDOW_GUI_NORMAL)
+            cv2.resizeWindow(windowName, *self.windowSize)
+            self.windows.add(windowName)
+        if self.mode in (MODE_THROTTLED, MODE_STREAM) and self.scale < 1.0:
+            size = (int(img.shape[1]*self.scale), int(img.shape[0]*self.scale))
+            dst = None
+            if self.pool is not None:
+                dst = self.pool.buffer(('display', windowName), (size[1], size[0]) + img.shape[2:], img.dtype)
+            img = cv2.resize(img, size, dst=dst, interpolation=cv2.INTER_AREA)
+        if self.mode == MODE_STREAM:
+            self.server.publish(windowName, img)
+        else:
+            cv2.imshow(windowName, img)
+        self.lastShown[windowName] = time.perf_counter()
+        return True
+
+    """
+    -->  Close a window (if it was created)
+    """
+
+    def destroyWindow(self, windowName):
+        if windowName in self.windows:
+            cv2.destroyWindow(windowName)
+            self.windows.discard(windowName)
+        self.lastShown.pop(windowName, None)
+
+    """
+    -->  Close all windows and the preview server
+    """
+
+    def close(self):
+        if self.server is not None:
+            self.server.close()
+        if self.windows:
+            cv2.destroyAllWindows()
+        self.windows.clear()
+        self.lastShown.clear()
+
+    """
+    -->  Loop of the thread reading the terminal in headless and stream modes
+    """
+
+    def readTerminal(self):
+        for line in sys.stdin:
+            line = line.strip().lower()
+            self.keys.put(TERMINAL_KEYS.get(line, ord(line[0]) if line else 13))
+
+    """
+    -->  Wait for a key, same return of cv2.waitKey
+    -->  In headless and stream modes each line of the terminal is a key: <ENTER> alone, 'q' (esc),
+    -->  'c' (space, configure the board) and 'l' (backspace, center lines)
+    -->  Parameters:
+    -->          - delay: waiting time in milliseconds
+    -->  Return:
+    -->          - code of the key
+    -->          - -1 if no key was pressed
+    """
+
+    def waitKey(self, delay=1):
+        if self.mode not in (MODE_OFF, MODE_STREAM):
+            return cv2.waitKey(delay)
+        if self.keys is None:
+            self.keys = queue.Queue()
+            threading.Thread(target=self.readTerminal, name="TerminalKeys", daemon=True).start()
+        try:
+            return self.keys.get(timeout=max(delay, 1)/1000.0)
+        except queue.Empty:
+            return -1
@@ -0,0 +1,304 @@
+"""
+:File: mcts.py
+:Description: | Monte Carlo tree search (UCT) of the moves for NxN boards with k pieces in a row
+              | The tree is kept in the main process and the random playouts of the leaves run
+              | in batches in worker processes (one chunk of leaves for each worker), with seeds
+              | drawn from a seedable generator
+              | Anytime: the most visited move is returned at the deadline
+
+:Author: Willian Beraldi Esperandio
+:Email: willian.esperandio@gmail.com
+:Date: 16/10/2026
+:Revision: version 1
+:License: MIT License
+"""
+
+
+import math
+import random
+import time
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from bitboard import cellLineMasks
+
+"""
+--> Visits added to the nodes of a path while its playouts are running, so the other leaves of
+--> the same batch are selected in other paths
+"""
+
+VIRTUAL_LOSS = 1
+
+"""
+-->  Test if the last move completed a line
+-->  Parameters:
+-->          - mask: pieces of the player after the move
+-->          - cell: cell of the move
+-->          - lines: masks of the lines through each cell
+-->  Return:
+-->          - True if the move won the game
+"""
+
+def isWinningMove(mask, cell, lines):
+    for line in lines[cell]:
+        if mask & line == line:
+            return True
+    return False
+
+"""
+-->  Random playouts of a position (run in the worker processes)
+-->  Parameters:
+-->          - mover: pieces of the player to move
+-->          - opponent: pieces of the opponent
+-->          - numSquares: number of cells of each row
+-->          - k: number of pieces in a row to win
+-->          - playouts: number of playouts
+-->          - seed: seed of the random moves
+-->  Return:
+-->          - reward of the player to move: 1 for each win and 0.5 for each draw
+"""
+
+def playout(mover, opponent, numSquares, k, playouts, seed):
+    rng = random.Random(seed)
+    lines = cellLineMasks(numSquares, k)
+    empty = [cell for cell in range(numSquares*numSquares) if not (mover | opponent) >> cell & 1]
+    reward = 0.0
+    for _ in range(playouts):
+        rng.shuffle(empty)
+        players = [mover, opponent]
+        turn = 0
+        winner = None
+        for cell in empty:
+            players[turn] |= 1 << cell
+            if isWinningMove(players[turn], cell, lines):
+                winner = turn
+                break
+            turn = 1 - turn
+        if winner is None:
+            reward += 0.5
+        elif winner == 0:
+            reward += 1.0
+    return reward
+
+"""
+-->  Random playouts of a chunk of leaves (one task of a worker process)
+-->  Parameters:
+-->          - leaves: list of (mover, opponent, seed) of the leaves
+-->          - numSquares: number of cells of each row
+-->          - k: number of pieces in a row to win
+-->          - playouts: number of playouts of each leaf
+-->  Return:
+-->          - list with the reward of each leaf (same as playout)
+"""
+
+def playoutChunk(leaves, numSquares, k, playouts):
+    return [playout(mover, opponent, numSquares, k, playouts, seed) for mover, opponent, seed in leaves]
+
+"""
+--> Node of the tree
+--> wins are counted for the player who made the move of the node (the opponent of mover)
+"""
+
+class MctsNode:
+    __slots__ = ('mover', 'opponent', 'move', 'parent', 'children', 'untried', 'visits', 'wins', 'terminal')
+
+    def __init__(self, mover, opponent, move=None, parent=None, terminal=None, full=0):
+        self.mover = mover
+        self.opponent = opponent
+        self.move = move
+        self.parent = parent
+        self.children = []
+        self.terminal = terminal
+        self.untried = 0 if terminal is not None else full & ~(mover | opponent)
+        self.visits = 0
+        self.wins = 0.0
+
+"""
+--> Class of the search engine
+--> Each iteration selects a batch of leaves with UCT (virtual loss spreads the batch over the
+--> tree), runs their playouts in the process pool and backs the rewards up the tree
+--> A batch has batchSize leaves for each worker and each worker receives its leaves in a single
+--> task, so the pickling cost is paid once per worker and batch, not once per leaf
+"""
+
+class MctsEngine:
+    def __init__(self, numSquares=3, k=None, numWorkers=4, playoutsPerLeaf=16, batchSize=8,
+                 exploration=1.4, seed=None):
+        self.numSquares = numSquares
+        self.k = numSquares if k is None else k
+        self.numWorkers = numWorkers
+        self.playoutsPerLeaf = playoutsPerLeaf
+        self.batchSize = batchSize
+        self.exploration = exploration
+        self.full = (1 << numSquares*numSquares) - 1
+        self.lines = cellLineMasks(numSquares, self.k)
+        self.rng = random.Random(seed)
+        self.pool = None
+        self.playouts = 0
+        self.elapsed = 0.0
+        self.stopped = False
+        if numWorkers > 1:
+            self.startPool()
+
+    """
+    -->  Stop the current search (called from another thread), the best move so far is returned
+    """
+
+    def stop(self):
+        self.stopped = True
+
+    """
+    -->  Start the process pool of the playouts and wait until every worker is running
+    -->  Workers are started with 'spawn' because the main program runs capture threads. Each worker
+    -->  imports the main module once, so the pool is started with the engine and not in a search
+    """
+
+    def startPool(self):
+        if self.pool is None:
+            self.pool = ProcessPoolExecutor(self.numWorkers, mp_context=multiprocessing.get_context('spawn'))
+            ## --- One task for each worker: the tasks are submitted before any worker is idle
+            list(self.pool.map(playoutChunk, [[]]*self.numWorkers, [self.numSquares]*self.numWorkers,
+                               [self.k]*self.numWorkers, [0]*self.numWorkers))
+
+    """
+    -->  Run the playouts of a batch of leaves
+    -->  Parameters:
+    -->          - leaves: list of (mover, opponent, seed) of the leaves
+    -->  Return:
+    -->          - list with the reward of each leaf, in the order of leaves
+    """
+
+    def runPlayouts(self, leaves):
+        if self.pool is None or not leaves:
+            return playoutChunk(leaves, self.numSquares, self.k, self.playoutsPerLeaf)
+        chunkSize = -(-len(leaves) // self.numWorkers)
+        chunks = [leaves[i:i+chunkSize] for i in range(0, len(leaves), chunkSize)]
+        rewards = []
+        for chunkRewards in self.pool.map(playoutChunk, chunks, [self.numSquares]*len(chunks),
+                                          [self.k]*len(chunks), [self.playoutsPerLeaf]*len(chunks)):
+            rewards.extend(chunkRewards)
+        return rewards
+
+    """
+    -->  Stop the worker processes
+    """
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.shutdown()
+            self.pool = None
+
+    """
+    -->  Restart the random generator, so searches are reproducible
+    """
+
+    def seed(self, seed):
+        self.rng = random.Random(seed)
+
+    """
+    -->  Child of a node with the highest upper confidence bound
+    """
+
+    def selectChild(self, node):
+        logVisits = math.log(node.visits)
+        exploration = self.exploration
+        best, bestValue = None, -1.0
+        for child in node.children:
+            value = child.wins/child.visits + exploration*math.sqrt(logVisits/child.visits)
+            if value > bestValue:
+                best, bestValue = child, value
+        return best
+
+    """
+    -->  Select a leaf: descend with UCT while the nodes are fully expanded, then expand one move
+    -->  Visits of the path are increased by the virtual loss
+    -->  Return:
+    -->          - leaf node
+    """
+
+    def selectLeaf(self, root):
+        node = root
+        node.visits += VIRTUAL_LOSS
+        while node.terminal is None and not node.untried and node.children:
+            node = self.selectChild(node)
+            node.visits += VIRTUAL_LOSS
+        if node.terminal is None and node.untried:
+            cell = self.randomCell(node.untried)
+            node.untried &= ~(1 << cell)
+            ## --- The player to move of the node plays the cell
+            pieces = node.mover | 1 << cell
+            terminal = None
+            if isWinningMove(pieces, cell, self.lines):
+                terminal = 1.0
+            elif (pieces | node.opponent) == self.full:
+                terminal = 0.5
+            child = MctsNode(node.opponent, pieces, cell, node, terminal, self.full)
+            node.children.append(child)
+            node = child
+            node.visits += VIRTUAL_LOSS
+        return node
+
+    """
+    -->  Random cell of a mask using the seedable generator of the engine
+    """
+
+    def randomCell(self, mask):
+        for _ in range(self.rng.randrange(bin(mask).count('1'))):
+            mask &= mask - 1
+        return (mask & -mask).bit_length() - 1
+
+    """
+    -->  Back a reward up the tree
+    -->  Parameters:
+    -->          - node: leaf
+    -->          - reward: reward of the player who made the move of the leaf
+    -->          - playouts: number of playouts of the reward
+    -->  Return:
+    -->          - None
+    """
+
+    def backup(self, node, reward, playouts):
+        while node is not None:
+            node.visits += playouts - VIRTUAL_LOSS
+            node.wins += reward
+            reward = playouts - reward
+            node = node.parent
+
+    """
+    -->  Search the best move until the deadline (or the number of iterations)
+    -->  Parameters:
+    -->          - mover: pieces of the player to move
+    -->          - opponent: pieces of the opponent
+    -->          - timeBudget: maximum time of the search in seconds
+    -->          - maxIterations: maximum number of batches (None = until the deadline)
+    -->  Return:
+    -->          - most visited move (cell index), None if there is no empty cell
+    -->          - win rate of the move (draws count as half)
+    -->          - number of random playouts
+    """
+
+    def search(self, mover, opponent, timeBudget=1.0, maxIterations=None):
+        start = time.perf_counter()
+        deadline = start + timeBudget
+        root = MctsNode(mover, opponent, full=self.full)
+        if not root.untried:
+            return None, 0.0, 0
+        self.playouts = 0
+        self.stopped = False
+        iterations = 0
+        while not self.stopped and time.perf_counter() < deadline and (maxIterations is None or iterations < maxIterations):
+            leaves = [self.selectLeaf(root) for _ in range(self.batchSize*max(1, self.numWorkers))]
+            rewards = iter(self.runPlayouts([(leaf.mover, leaf.opponent, self.rng.getrandbits(32))
+                                             for leaf in leaves if leaf.terminal is None]))
+            for leaf in leaves:
+                if leaf.terminal is None:
+                    ## --- Playout reward is of the player to move of the leaf
+                    self.backup(leaf, self.playoutsPerLeaf - next(rewards), self.playoutsPerLeaf)
+                    self.playouts += self.playoutsPerLeaf
+                else:
+                    self.backup(leaf, leaf.terminal*self.playoutsPerLeaf, self.playoutsPerLeaf)
+            iterations += 1
+        self.elapsed = time.perf_counter() - start
+        if not root.children:
+            return self.randomCell(root.untried), 0.0, self.playouts
+        best = max(root.children, key=lambda child: child.visits)
+        return best.move, best.wins/best.visits, self.playouts
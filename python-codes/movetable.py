@@ -0,0 +1,223 @@
+"""
+:File: movetable.py
+:Description: | Perfect play table of the 3x3 game, generated offline and loaded once
+              | Positions are indexed in base 3, so a lookup is one index operation
+              | Usage: python3 movetable.py --generate (writes the table)
+              |        python3 movetable.py --verify (checks the table with exhaustive minimax)
+
+:Author: Willian Beraldi Esperandio
+:Email: willian.esperandio@gmail.com
+:Date: 16/10/2026
+:Revision: version 1
+:License: MIT License
+"""
+
+
+import os
+import sys
+import time
+from functools import lru_cache
+import numpy as np
+from bitboard import lineMasks, iterBits
+
+"""
+--> Table of the 3x3 board: one entry for each of the 3^9 positions, seen by the player to move
+--> (cell code 1 = pieces of the player to move, 2 = pieces of the opponent)
+-->     - value: +1 win, 0 draw, -1 loss with perfect play, UNREACHABLE if the position can't happen
+-->     - moves: mask of the optimal moves (fastest win or slowest loss), 0 if the game is over
+"""
+
+NUM_SQUARES = 3
+NUM_CELLS = NUM_SQUARES*NUM_SQUARES
+UNREACHABLE = -128
+TABLE_DTYPE = np.dtype([('value', 'i1'), ('moves', '<u2')])
+TABLE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "movetable.npy")
+
+"""
+-->  Base 3 value of each mask of pieces (sum of 3^cell of the set bits)
+-->  Return:
+-->          - tuple with 2^9 values
+"""
+
+@lru_cache(maxsize=1)
+def ternaryValues():
+    return tuple(sum(3**cell for cell in iterBits(mask)) for mask in range(1 << NUM_CELLS))
+
+"""
+-->  Index of a position in the table
+-->  Parameters:
+-->          - mover: mask of the pieces of the player to move
+-->          - opponent: mask of the pieces of the opponent
+-->  Return:
+-->          - index in the table
+"""
+
+def positionIndex(mover, opponent):
+    ternary = ternaryValues()
+    return ternary[mover] + 2*ternary[opponent]
+
+def hasLine(mask):
+    for line in lineMasks(NUM_SQUARES, NUM_SQUARES):
+        if mask & line == line:
+            return True
+    return False
+
+"""
+-->  Generate the table with memoized negamax over the reachable positions
+-->  Both players may start the game, so positions where the player to move has as many pieces
+-->  as the opponent or one less are reachable
+-->  Return:
+-->          - table (numpy array of TABLE_DTYPE)
+"""
+
+def generateTable():
+    table = np.zeros(3**NUM_CELLS, TABLE_DTYPE)
+    table['value'] = UNREACHABLE
+    full = (1 << NUM_CELLS) - 1
+    scores = {}
+
+    ## --- Score of the player to move: plies to the end are used to prefer the fastest win
+    def negamax(mover, opponent):
+        index = positionIndex(mover, opponent)
+        if index in scores:
+            return scores[index]
+        if hasLine(opponent):
+            score, moves = -(NUM_CELLS + 1 - bin(mover | opponent).count('1')), 0
+        elif mover | opponent == full:
+            score, moves = 0, 0
+        else:
+            score, moves = None, 0
+            for cell in iterBits(full & ~(mover | opponent)):
+                moveScore = -negamax(opponent, mover | 1 << cell)
+                if score is None or moveScore > score:
+                    score, moves = moveScore, 1 << cell
+                elif moveScore == score:
+                    moves |= 1 << cell
+        table[index] = ((score > 0) - (score < 0), moves)
+        scores[index] = score
+        return score
+
+    ## --- The player to move starts, or the opponent played the first piece in any cell
+    negamax(0, 0)
+    for cell in range(NUM_CELLS):
+        negamax(0, 1 << cell)
+    return table
+
+"""
+-->  Load the table (once) from the binary file
+-->  Parameters:
+-->          - path: file of the table (None uses TABLE_FILE)
+-->  Return:
+-->          - table (numpy array of TABLE_DTYPE)
+-->          - None if the file doesn't exist or is invalid
+"""
+
+@lru_cache(maxsize=4)
+def loadMoveTable(path=None):
+    try:
+        table = np.load(TABLE_FILE if path is None else path)
+    except (OSError, ValueError):
+        return None
+    if table.dtype != TABLE_DTYPE or table.shape != (3**NUM_CELLS,):
+        return None
+    return table
+
+"""
+-->  Optimal moves of a position
+-->  Parameters:
+-->          - mover: mask of the pieces of the player to move
+-->          - opponent: mask of the pieces of the opponent
+-->          - table: table (None loads the default table)
+-->  Return:
+-->          - value of the position and mask of the optimal moves
+-->          - None, 0 if the position isn't reachable or there is no table
+"""
+
+def lookupMoves(mover, opponent, table=None):
+    table = loadMoveTable() if table is None else table
+    if table is None:
+        return None, 0
+    value, moves = table[positionIndex(mover, opponent)]
+    if value == UNREACHABLE:
+        return None, 0
+    return int(value), int(moves)
+
+"""
+-->  Plain minimax without memoization, used to verify the table
+-->  Return:
+-->          - value of the position for the player to move (+1, 0 or -1)
+"""
+
+def minimax(mover, opponent):
+    if hasLine(opponent):
+        return -1
+    empty = ((1 << NUM_CELLS) - 1) & ~(mover | opponent)
+    if empty == 0:
+        return 0
+    best = -1
+    for cell in iterBits(empty):
+        best = max(best, -minimax(opponent, mover | 1 << cell))
+        if best == 1:
+            break
+    return best
+
+"""
+-->  Verify every reachable position of the table with exhaustive minimax: the value of the
+-->  position and the value of each move (optimal moves must keep the value of the position)
+-->  Parameters:
+-->          - table: table to be verified
+-->  Return:
+-->          - number of verified positions and number of errors
+"""
+
+def verifyTable(table):
+    values = {}
+    def value(mover, opponent):
+        index = positionIndex(mover, opponent)
+        if index not in values:
+            values[index] = minimax(mover, opponent)
+        return values[index]
+
+    ternary = ternaryValues()
+    full = (1 << NUM_CELLS) - 1
+    positions = errors = 0
+    for mover in range(1 << NUM_CELLS):
+        for opponent in range(1 << NUM_CELLS):
+            if mover & opponent:
+                continue
+            entry = table[ternary[mover] + 2*ternary[opponent]]
+            if entry['value'] == UNREACHABLE:
+                continue
+            positions += 1
+            expected = value(mover, opponent)
+            moves = int(entry['moves'])
+            gameOver = hasLine(opponent) or hasLine(mover) or mover | opponent == full
+            if entry['value'] != expected or (moves == 0) != gameOver or moves & (mover | opponent):
+                errors += 1
+                continue
+            for cell in iterBits(moves):
+                if -value(opponent, mover | 1 << cell) != expected:
+                    errors += 1
+                    break
+    return positions, errors
+
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1 and sys.argv[1] == '--generate':
+        start = time.perf_counter()
+        table = generateTable()
+        np.save(TABLE_FILE, table)
+        print("Table generated: %d reachable positions in %.2f s - %s (%d bytes)" %
+              ((table['value'] != UNREACHABLE).sum(), time.perf_counter() - start, TABLE_FILE, os.path.getsize(TABLE_FILE)))
+    elif len(sys.argv) > 1 and sys.argv[1] == '--verify':
+        table = loadMoveTable()
+        if table is None:
+            print("ERROR: Unable to load " + TABLE_FILE)
+            sys.exit(1)
+        start = time.perf_counter()
+        positions, errors = verifyTable(table)
+        print("Verified %d positions in %.2f s - errors: %d" % (positions, time.perf_counter() - start, errors))
+        sys.exit(1 if errors else 0)
+    else:
+        print("Usage: python3 movetable.py --generate | --verify")
+        sys.exit(1)
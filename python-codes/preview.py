@@ -0,0 +1,235 @@
+"""
+:File: preview.py
+:Description: | Preview server of the images as MJPEG streams over HTTP, bound to localhost
+              | JPEG encoding runs in a thread and only the newest image of each stream is kept,
+              | so slow clients skip images and never stall the vision loop
+
+:Author: Willian Beraldi Esperandio
+:Email: willian.esperandio@gmail.com
+:Date: 16/10/2026
+:Revision: version 1
+:License: MIT License
+"""
+
+
+import threading
+import time
+import cv2
+import numpy as np
+from urllib.parse import quote, unquote
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+BOUNDARY = b'frame'
+
+"""
+--> Handler of the HTTP requests: '/' lists the streams and '/stream/<name>' sends the MJPEG stream
+"""
+
+class PreviewHandler(BaseHTTPRequestHandler):
+    ## --- A client that stops reading is disconnected instead of holding its thread forever
+    timeout = 10
+
+    def do_GET(self):
+        preview = self.server.preview
+        if self.path == '/':
+            links = "".join('<li><a href="/stream/%s">%s</a></li>' % (quote(name), name) for name in preview.streamNames())
+            content = ("<html><body><h3>Tic-Tac-Toe preview</h3><ul>" + links + "</ul></body></html>").encode()
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/html')
+            self.send_header('Content-Length', str(len(content)))
+            self.end_headers()
+            self.wfile.write(content)
+            return
+        if not self.path.startswith('/stream/'):
+            self.send_error(404)
+            return
+        name = unquote(self.path[len('/stream/'):])
+        self.send_response(200)
+        self.send_header('Content-Type', 'multipart/x-mixed-replace; boundary=' + BOUNDARY.decode())
+        self.send_header('Cache-Control', 'no-cache')
+        self.end_headers()
+        preview.addClient(name)
+        try:
+            sequence = 0
+            while preview.running:
+                sequence, jpeg = preview.waitFrame(name, sequence)
+                if jpeg is None:
+                    continue
+                self.wfile.write(b'--' + BOUNDARY + b'\r\nContent-Type: image/jpeg\r\nContent-Length: ' +
+                                 str(len(jpeg)).encode() + b'\r\n\r\n' + jpeg + b'\r\n')
+        except OSError:
+            ## --- Client disconnected
+            pass
+        finally:
+            preview.removeClient(name)
+
+    def log_message(self, format, *args):
+        pass
+
+"""
+--> Class of the preview server
+--> publish() only copies the image when the stream has clients and the encoder thread encodes
+--> the newest image of each stream. Images published before the encoder takes them are dropped
+"""
+
+class PreviewServer:
+    def __init__(self, port=8080, fps=10, quality=70, host='127.0.0.1'):
+        self.address = (host, port)
+        self.fps = fps
+        self.quality = quality
+        self.lock = threading.Condition()
+        self.clients = {}
+        self.streams = set()
+        self.pending = {}
+        self.spare = {}
+        self.frames = {}
+        self.lastEncoded = {}
+        self.publishedFrames = 0
+        self.encodedFrames = 0
+        self.droppedFrames = 0
+        self.running = False
+        self.server = None
+        self.threads = []
+
+    """
+    -->  Start the HTTP server and the encoder thread
+    -->  Return:
+    -->          - self, to allow PreviewServer().start()
+    """
+
+    def start(self):
+        if self.running:
+            return self
+        self.server = ThreadingHTTPServer(self.address, PreviewHandler)
+        self.server.daemon_threads = True
+        self.server.preview = self
+        self.address = self.server.server_address
+        self.running = True
+        self.threads = [threading.Thread(target=self.server.serve_forever, name="PreviewServer", daemon=True),
+                        threading.Thread(target=self.encode, name="PreviewEncoder", daemon=True)]
+        for thread in self.threads:
+            thread.start()
+        return self
+
+    """
+    -->  URL of the list of streams
+    """
+
+    def url(self):
+        return "http://%s:%d/" % self.address
+
+    def streamNames(self):
+        with self.lock:
+            return sorted(self.streams | set(self.clients))
+
+    """
+    -->  List a stream in the index page, even before it has clients
+    """
+
+    def addStream(self, name):
+        if name not in self.streams:
+            with self.lock:
+                self.streams.add(name)
+
+    def addClient(self, name):
+        with self.lock:
+            self.clients[name] = self.clients.get(name, 0) + 1
+
+    def removeClient(self, name):
+        with self.lock:
+            self.clients[name] -= 1
+
+    """
+    -->  Test if a stream has clients (images of streams without clients aren't drawn)
+    """
+
+    def hasClients(self, name):
+        return self.clients.get(name, 0) > 0
+
+    """
+    -->  Publish an image in a stream without waiting for the encoding
+    -->  Parameters:
+    -->          - name: name of the stream
+    -->          - img: image (copied, the caller can reuse it)
+    -->  Return:
+    -->          - True if the image was queued to the encoder
+    """
+
+    def publish(self, name, img):
+        if not self.running:
+            return False
+        with self.lock:
+            if not self.hasClients(name):
+                return False
+            now = time.perf_counter()
+            if now - self.lastEncoded.get(name, 0.0) < 1.0/self.fps:
+                return False
+            if name in self.pending:
+                ## --- Encoder didn't take the last image yet, it is replaced
+                self.droppedFrames += 1
+                buffer = self.pending.pop(name)
+            else:
+                buffer = self.spare.pop(name, None)
+            if buffer is None or buffer.shape != img.shape or buffer.dtype != img.dtype:
+                buffer = np.empty_like(img)
+            np.copyto(buffer, img)
+            self.pending[name] = buffer
+            self.lastEncoded[name] = now
+            self.publishedFrames += 1
+            self.lock.notify_all()
+        return True
+
+    """
+    -->  Loop of the encoder thread
+    """
+
+    def encode(self):
+        encodeParams = [int(cv2.IMWRITE_JPEG_QUALITY), self.quality]
+        while self.running:
+            with self.lock:
+                self.lock.wait_for(lambda: self.pending or not self.running)
+                if not self.running:
+                    break
+                name, img = self.pending.popitem()
+            ret, jpeg = cv2.imencode('.jpg', img, encodeParams)
+            with self.lock:
+                self.spare[name] = img
+                if ret:
+                    sequence = self.frames.get(name, (0, None))[0] + 1
+                    self.frames[name] = (sequence, jpeg.tobytes())
+                    self.encodedFrames += 1
+                self.lock.notify_all()
+
+    """
+    -->  Wait for an image of a stream newer than the last one sent to a client
+    -->  Parameters:
+    -->          - name: name of the stream
+    -->          - sequence: sequence number of the last image sent
+    -->          - timeout: maximum waiting time in seconds
+    -->  Return:
+    -->          - sequence number and JPEG bytes of the newest image (None if there is no new image)
+    """
+
+    def waitFrame(self, name, sequence, timeout=1.0):
+        with self.lock:
+            self.lock.wait_for(lambda: self.frames.get(name, (0, None))[0] > sequence or not self.running, timeout)
+            newSequence, jpeg = self.frames.get(name, (0, None))
+            if newSequence <= sequence:
+                return sequence, None
+            return newSequence, jpeg
+
+    """
+    -->  Stop the server and the encoder thread
+    """
+
+    def close(self):
+        if not self.running:
+            return
+        with self.lock:
+            self.running = False
+            self.lock.notify_all()
+        self.server.shutdown()
+        self.server.server_close()
+        for thread in self.threads:
+            thread.join()
+        self.threads = []
@@ -0,0 +1,164 @@
+"""
+:File: recorder.py
+:Description: | Recorder of the game sessions: rectified image of the board, timestamp and board state
+              | Records have a fixed size, so the file is replayed through memory mapping without decoding
+              | Records are written to the file by a thread, the main loop only copies the board image
+
+:Author: Willian Beraldi Esperandio
+:Email: willian.esperandio@gmail.com
+:Date: 16/10/2026
+:Revision: version 1
+:License: MIT License
+"""
+
+
+import os
+import queue
+import threading
+import numpy as np
+
+"""
+--> Header of the session files (64 bytes), followed by the records
+"""
+
+SESSION_MAGIC = b'TTTSESS1'
+SESSION_VERSION = 1
+HEADER_DTYPE = np.dtype([('magic', 'S8'), ('version', '<u4'), ('boardSize', '<u4'), ('numSquares', '<u4'),
+                         ('channels', '<u4'), ('reserved', 'u1', (40,))])
+UNKNOWN_CELL = b'?'
+
+"""
+--> Frame index of the records of the preset board taken at the configuration, used by the replay
+--> to fit the cell classifier of the session
+"""
+
+PRESET_FRAME = -1
+
+"""
+-->  Type of the records of a session
+-->  Parameters:
+-->          - boardSize: size of the square image of the board
+-->          - numSquares: number of cells of each row
+-->          - channels: channels of the board image
+-->  Return:
+-->          - numpy structured dtype with the fields timestamp, frameIndex, board and image
+"""
+
+def recordDtype(boardSize, numSquares, channels=3):
+    return np.dtype([('timestamp', '<f8'), ('frameIndex', '<i8'), ('board', 'S1', (numSquares, numSquares)),
+                     ('image', 'u1', (boardSize, boardSize, channels))])
+
+"""
+--> Class to append the board images of a session to a file
+--> record() copies the image into a free slot of a ring of records and the writer thread
+--> writes the slot to the file. If the writer falls behind and all slots are waiting to be
+--> written, the record is dropped instead of blocking the main loop. A frame is recorded only
+--> once, even if it is read many times
+"""
+
+class SessionRecorder:
+    def __init__(self, path, boardSize, numSquares, channels=3, numSlots=32):
+        self.path = path
+        self.dtype = recordDtype(boardSize, numSquares, channels)
+        self.records = np.zeros(numSlots, self.dtype)
+        self.rawRecords = self.records.view(np.uint8).reshape(numSlots, self.dtype.itemsize)
+        self.freeSlots = queue.Queue()
+        for slot in range(numSlots):
+            self.freeSlots.put(slot)
+        self.filledSlots = queue.Queue()
+        self.lastFrameIndex = None
+        self.recordedFrames = 0
+        self.droppedRecords = 0
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.file = open(path, 'wb')
+        header = np.zeros(1, HEADER_DTYPE)
+        header['magic'] = SESSION_MAGIC
+        header['version'] = SESSION_VERSION
+        header['boardSize'] = boardSize
+        header['numSquares'] = numSquares
+        header['channels'] = channels
+        self.file.write(header.tobytes())
+        self.thread = threading.Thread(target=self.write, name="SessionRecorder", daemon=True)
+        self.thread.start()
+
+    """
+    -->  Append a board image to the session
+    -->  Parameters:
+    -->          - boardImg: rectified image of the board
+    -->          - timestamp: time of the capture of the frame
+    -->          - frameIndex: number of the frame in the capture (PRESET_FRAME for the preset board)
+    -->          - board: board state of the image (None if unknown)
+    -->  Return:
+    -->          - True if the record was queued
+    -->          - False if it was dropped (or the frame was already recorded)
+    """
+
+    def record(self, boardImg, timestamp, frameIndex, board=None):
+        if frameIndex == self.lastFrameIndex and frameIndex != PRESET_FRAME:
+            return False
+        try:
+            slot = self.freeSlots.get_nowait()
+        except queue.Empty:
+            self.droppedRecords += 1
+            return False
+        record = self.records[slot]
+        record['timestamp'] = timestamp
+        record['frameIndex'] = frameIndex
+        if board is None:
+            record['board'] = UNKNOWN_CELL
+        else:
+            record['board'] = np.char.encode(board, 'ascii')
+        np.copyto(record['image'], boardImg)
+        self.filledSlots.put(slot)
+        self.lastFrameIndex = frameIndex
+        return True
+
+    """
+    -->  Loop of the writer thread
+    """
+
+    def write(self):
+        while True:
+            slot = self.filledSlots.get()
+            if slot is None:
+                break
+            self.file.write(self.rawRecords[slot].data)
+            self.recordedFrames += 1
+            self.freeSlots.put(slot)
+
+    """
+    -->  Write the pending records and close the file
+    """
+
+    def close(self):
+        if self.thread is not None:
+            self.filledSlots.put(None)
+            self.thread.join()
+            self.thread = None
+            self.file.close()
+
+"""
+-->  Open a session file for replay, without reading the records into memory
+-->  Parameters:
+-->          - path: session file
+-->  Return:
+-->          - memory-mapped array of records (fields timestamp, frameIndex, board and image)
+-->          - None if the file isn't a valid session
+"""
+
+def loadSession(path):
+    try:
+        header = np.fromfile(path, HEADER_DTYPE, count=1)
+    except (OSError, ValueError):
+        return None
+    if len(header) == 0 or header['magic'][0] != SESSION_MAGIC or header['version'][0] != SESSION_VERSION:
+        return None
+    dtype = recordDtype(int(header['boardSize'][0]), int(header['numSquares'][0]), int(header['channels'][0]))
+    ## --- A record partially written by an interrupted session is ignored
+    count = (os.path.getsize(path) - HEADER_DTYPE.itemsize) // dtype.itemsize
+    if count == 0:
+        return np.zeros(0, dtype)
+    return np.memmap(path, dtype, mode='r', offset=HEADER_DTYPE.itemsize, shape=(count,))
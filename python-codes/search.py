@@ -0,0 +1,337 @@
+"""
+:File: search.py
+:Description: | Search engine of the moves for NxN boards with k pieces in a row
+              | Negamax with alpha-beta pruning, move ordering and iterative deepening
+              | Hard time budget: the best move found so far is returned at the deadline
+              | Optional transposition table shared by the symmetric positions
+
+:Author: Willian Beraldi Esperandio
+:Email: willian.esperandio@gmail.com
+:Date: 16/10/2026
+:Revision: version 1
+:License: MIT License
+"""
+
+
+import time
+from functools import lru_cache
+from bitboard import lineMasks, iterBits
+from transposition import ZobristHasher, canonicalKey, EXACT, LOWER, UPPER
+
+"""
+--> Score of a win (a win in fewer plies has a higher score) and mask of the node counter used
+--> to test the deadline every 16 nodes (a node of a 15x15 board takes about 0.25 ms)
+"""
+
+WIN_SCORE = 1000000
+NODE_CHECK_MASK = 15
+
+"""
+--> Time (seconds) kept from the budget to unwind the search and store the tables
+"""
+
+DEADLINE_MARGIN = 0.01
+
+"""
+--> Scores above this bound are wins (or losses, if negative) at a known distance
+"""
+
+WIN_BOUND = WIN_SCORE - 10000
+
+"""
+--> Exception used to abort the search at the deadline
+"""
+
+class SearchTimeout(Exception):
+    pass
+
+"""
+-->  Masks of the cells around each cell (candidate moves are the empty cells near the pieces)
+-->  Parameters:
+-->          - numSquares: number of cells of each row
+-->          - radius: distance (in cells) of the neighbourhood
+-->  Return:
+-->          - tuple (one item for each cell) of masks
+"""
+
+@lru_cache(maxsize=16)
+def neighbourMasks(numSquares, radius):
+    masks = []
+    for i in range(numSquares):
+        for j in range(numSquares):
+            mask = 0
+            for ni in range(max(0, i-radius), min(numSquares, i+radius+1)):
+                for nj in range(max(0, j-radius), min(numSquares, j+radius+1)):
+                    mask |= 1 << (ni*numSquares + nj)
+            masks.append(mask)
+    return tuple(masks)
+
+"""
+-->  Weight of a line with c pieces of a single player (c = 0 to k)
+"""
+
+@lru_cache(maxsize=16)
+def lineWeights(k):
+    return tuple(0 if c == 0 else 10**(c-1) for c in range(k+1))
+
+"""
+-->  Convert the score of a win from "plies from the root" to "plies from the position" (stored
+-->  in the transposition table) and back
+"""
+
+def scoreToTable(score, ply):
+    if score > WIN_BOUND:
+        return score + ply
+    if score < -WIN_BOUND:
+        return score - ply
+    return score
+
+def scoreFromTable(score, ply):
+    if score > WIN_BOUND:
+        return score - ply
+    if score < -WIN_BOUND:
+        return score + ply
+    return score
+
+"""
+--> Class of the search engine
+--> Positions are two masks: pieces of the player to move and pieces of the opponent
+--> The engine keeps the history of good moves between searches, used to order the moves
+--> With a TranspositionTable, the hashes of the 8 symmetries of the positions are updated with
+--> each move and positions already searched (in any orientation) are reused
+"""
+
+class SearchEngine:
+    def __init__(self, numSquares=3, k=None, radius=2, table=None):
+        self.numSquares = numSquares
+        self.k = numSquares if k is None else k
+        self.numCells = numSquares*numSquares
+        self.full = (1 << self.numCells) - 1
+        self.lines = lineMasks(numSquares, self.k)
+        self.neighbours = neighbourMasks(numSquares, radius)
+        self.weights = lineWeights(self.k)
+        center = numSquares//2
+        self.centerCell = center*numSquares + center
+        ## --- Central cells first when the history doesn't decide the order
+        self.centrality = [-(abs(cell//numSquares - center) + abs(cell%numSquares - center)) for cell in range(self.numCells)]
+        self.history = [0]*self.numCells
+        self.table = table
+        self.hasher = ZobristHasher(numSquares) if table is not None else None
+        self.nodes = 0
+        self.deadline = None
+        self.stopped = False
+
+    """
+    -->  Stop the current search (called from another thread), the best move so far is returned
+    """
+
+    def stop(self):
+        self.stopped = True
+
+    """
+    -->  Mask of the empty cells that complete a line of a player
+    """
+
+    def winningMoves(self, mask, empty):
+        moves = 0
+        for line in self.lines:
+            missing = line & ~mask
+            if missing & (missing - 1) == 0 and missing & empty:
+                moves |= missing
+        return moves
+
+    """
+    -->  Evaluation of a position at the depth limit: lines open for a single player
+    """
+
+    def evaluate(self, mover, opponent):
+        score = 0
+        weights = self.weights
+        for line in self.lines:
+            moverLine = mover & line
+            opponentLine = opponent & line
+            if moverLine:
+                if not opponentLine:
+                    score += weights[bin(moverLine).count('1')]
+            elif opponentLine:
+                score -= weights[bin(opponentLine).count('1')]
+        return score
+
+    """
+    -->  Candidate moves: empty cells near the pieces (every empty cell on small boards)
+    """
+
+    def candidates(self, occupied, empty):
+        if not occupied:
+            return 1 << self.centerCell
+        near = 0
+        for cell in iterBits(occupied):
+            near |= self.neighbours[cell]
+        return (empty & near) or empty
+
+    """
+    -->  Moves of a position in search order: the first move (best move of the previous iteration),
+    -->  then by history and centrality
+    """
+
+    def orderMoves(self, moves, firstMove=None):
+        ordered = sorted(iterBits(moves), key=lambda cell: (self.history[cell], self.centrality[cell]), reverse=True)
+        if firstMove is not None and moves >> firstMove & 1:
+            ordered.remove(firstMove)
+            ordered.insert(0, firstMove)
+        return ordered
+
+    """
+    -->  Negamax with alpha-beta pruning
+    -->  Parameters:
+    -->          - mover: pieces of the player to move
+    -->          - opponent: pieces of the opponent
+    -->          - depth: remaining depth
+    -->          - alpha, beta: window of the search
+    -->          - ply: distance from the root
+    -->          - hashes: Zobrist hashes of the position (None without transposition table)
+    -->  Return:
+    -->          - score of the position for the player to move
+    """
+
+    def negamax(self, mover, opponent, depth, alpha, beta, ply, hashes=None):
+        self.nodes += 1
+        if self.nodes & NODE_CHECK_MASK == 0 and (self.stopped or time.perf_counter() >= self.deadline):
+            raise SearchTimeout()
+        tableMove = None
+        if hashes is not None:
+            key, symmetry = canonicalKey(hashes[0])
+            entry = self.table.probe(key, symmetry)
+            if entry is not None:
+                score, entryDepth, flag, tableMove = entry
+                if entryDepth >= depth:
+                    score = scoreFromTable(score, ply)
+                    if (flag == EXACT or (flag == LOWER and score >= beta) or
+                            (flag == UPPER and score <= alpha)):
+                        return score
+        occupied = mover | opponent
+        empty = self.full & ~occupied
+        if not empty:
+            return 0
+        ## --- Immediate win, or forced block of the opponent threats
+        if self.winningMoves(mover, empty):
+            return WIN_SCORE - ply - 1
+        threats = self.winningMoves(opponent, empty)
+        if threats:
+            if threats & (threats - 1):
+                return -(WIN_SCORE - ply - 2)
+            moves = threats
+        else:
+            if depth <= 0:
+                return self.evaluate(mover, opponent)
+            moves = self.candidates(occupied, empty)
+        originalAlpha = alpha
+        bestScore = -WIN_SCORE
+        bestMove = -1
+        for cell in self.orderMoves(moves, tableMove):
+            childHashes = None if hashes is None else self.hasher.play(hashes, cell)
+            score = -self.negamax(opponent, mover | 1 << cell, depth - 1, -beta, -alpha, ply + 1, childHashes)
+            if score > bestScore:
+                bestScore = score
+                bestMove = cell
+            if score > alpha:
+                alpha = score
+                if alpha >= beta:
+                    self.history[cell] += depth*depth
+                    break
+        if hashes is not None:
+            if bestScore <= originalAlpha:
+                flag = UPPER
+            elif bestScore >= beta:
+                flag = LOWER
+            else:
+                flag = EXACT
+            self.table.store(key, symmetry, scoreToTable(bestScore, ply), depth, flag, bestMove)
+        return bestScore
+
+    """
+    -->  Search all moves of the root at a given depth
+    -->  Parameters:
+    -->          - mover, opponent: position
+    -->          - depth: depth of the search
+    -->          - firstMove: move searched first
+    -->          - results: list receiving (move, score) of each move completely searched
+    -->          - hashes: Zobrist hashes of the position (None without transposition table)
+    -->  Return:
+    -->          - None (results are stored in results, so they survive a timeout)
+    """
+
+    def searchRoot(self, mover, opponent, depth, firstMove, results, hashes=None):
+        occupied = mover | opponent
+        empty = self.full & ~occupied
+        wins = self.winningMoves(mover, empty)
+        if wins:
+            results.append(((wins & -wins).bit_length() - 1, WIN_SCORE - 1))
+            return
+        threats = self.winningMoves(opponent, empty)
+        moves = threats if threats else self.candidates(occupied, empty)
+        alpha = -WIN_SCORE - 1
+        for cell in self.orderMoves(moves, firstMove):
+            childHashes = None if hashes is None else self.hasher.play(hashes, cell)
+            score = -self.negamax(opponent, mover | 1 << cell, depth - 1, -WIN_SCORE - 1, -alpha, 1, childHashes)
+            results.append((cell, score))
+            alpha = max(alpha, score)
+
+    """
+    -->  Search the best move with iterative deepening until the deadline
+    -->  Parameters:
+    -->          - mover: pieces of the player to move
+    -->          - opponent: pieces of the opponent
+    -->          - timeBudget: maximum time of the search in seconds
+    -->          - maxDepth: maximum depth (None = until the end of the game)
+    -->  Return:
+    -->          - best move (cell index), None if there is no empty cell
+    -->          - score of the move
+    -->          - depth of the last complete iteration
+    """
+
+    def search(self, mover, opponent, timeBudget=1.0, maxDepth=None):
+        start = time.perf_counter()
+        self.deadline = start + max(0.0, timeBudget - DEADLINE_MARGIN)
+        self.stopped = False
+        self.nodes = 0
+        ## --- Old history is halved, so the order follows the recent positions
+        self.history = [value//2 for value in self.history]
+        empty = self.full & ~(mover | opponent)
+        if not empty:
+            return None, 0, 0
+        numEmpty = bin(empty).count('1')
+        maxDepth = numEmpty if maxDepth is None else min(maxDepth, numEmpty)
+        ## --- Any legal move is available before the first iteration ends
+        bestMove = self.orderMoves(self.candidates(mover | opponent, empty))[0]
+        hashes = None
+        if self.table is not None:
+            self.table.newSearch()
+            hashes = self.hasher.hashPosition(mover, opponent)
+            key, symmetry = canonicalKey(hashes[0])
+            entry = self.table.probe(key, symmetry)
+            ## --- Best move of this position in a previous search (or game)
+            if entry is not None and entry[3] >= 0 and empty >> entry[3] & 1:
+                bestMove = entry[3]
+        bestScore = 0
+        completedDepth = 0
+        for depth in range(1, maxDepth + 1):
+            results = []
+            try:
+                self.searchRoot(mover, opponent, depth, bestMove, results, hashes)
+            except SearchTimeout:
+                ## --- Partial iteration: used only if the previous best move was searched again
+                if results and results[0][0] == bestMove:
+                    bestMove, bestScore = max(results, key=lambda result: result[1])
+                break
+            bestMove, bestScore = max(results, key=lambda result: result[1])
+            completedDepth = depth
+            if hashes is not None:
+                self.table.store(key, symmetry, bestScore, depth, EXACT, bestMove)
+            ## --- The result of the game is known
+            if abs(bestScore) >= WIN_SCORE - self.numCells:
+                break
+        if self.table is not None:
+            self.table.flush()
+        self.elapsed = time.perf_counter() - start
+        return bestMove, bestScore, completedDepth
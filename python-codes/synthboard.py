@@ -0,0 +1,233 @@
+"""
+:File: synthboard.py
+:Description: | Synthetic renderer of camera-like images of the board with exact ground truth
+              | Perspective, rotation, blur, noise and lighting are configurable
+              | Datasets are generated into memory-mapped .npy files
+
+:Author: Willian Beraldi Esperandio
+:Email: willian.esperandio@gmail.com
+:Date: 16/10/2026
+:Revision: version 1
+:License: MIT License
+"""
+
+
+import os
+import cv2
+import numpy as np
+
+"""
+--> Codes of the cells in the ground truth
+"""
+
+EMPTY = 0
+WHITE = 1
+BLACK = 2
+CELL_LETTERS = np.array(['-', 'W', 'B'])
+
+"""
+--> Class containing the default parameters of the scenes
+"""
+
+class SceneConst:
+    imageSize = (720, 1280)
+    boardSize = 420
+    backgroundColour = (60, 90, 70)
+    boardColour = (150, 150, 150)
+    lineColour = (30, 30, 30)
+    whiteColour = (240, 240, 240)
+    blackColour = (20, 20, 20)
+    pieceRatio = 0.38
+
+"""
+-->  Draw the board without perspective
+-->  Parameters:
+-->          - cells: numSquares x numSquares array of cell codes (EMPTY, WHITE, BLACK)
+-->          - size: size of the board image in pixels
+-->  Return:
+-->          - size x size BGR image of the board
+"""
+
+def drawBoard(cells, size):
+    numSquares = len(cells)
+    board = np.empty((size, size, 3), dtype=np.uint8)
+    board[:] = SceneConst.boardColour
+    spaceSize = size / numSquares
+    lineWidth = max(2, size // 100)
+    for i in range(1, numSquares):
+        position = int(round(i * spaceSize))
+        cv2.line(board, (position, 0), (position, size), SceneConst.lineColour, lineWidth)
+        cv2.line(board, (0, position), (size, position), SceneConst.lineColour, lineWidth)
+    cv2.rectangle(board, (0, 0), (size-1, size-1), SceneConst.lineColour, 2*lineWidth)
+    radius = int(spaceSize * SceneConst.pieceRatio)
+    for i in range(numSquares):
+        for j in range(numSquares):
+            if cells[i][j] == EMPTY:
+                continue
+            colour = SceneConst.whiteColour if cells[i][j] == WHITE else SceneConst.blackColour
+            center = (int((j + 0.5) * spaceSize), int((i + 0.5) * spaceSize))
+            cv2.circle(board, center, radius, colour, -1, cv2.LINE_AA)
+            cv2.circle(board, center, radius, (90, 90, 90), 2, cv2.LINE_AA)
+    return board
+
+"""
+-->  Corners of the board in the camera image
+-->  Parameters:
+-->          - center: (x, y) center of the board
+-->          - boardSize: side of the board in pixels
+-->          - rotation: rotation of the board in degrees
+-->          - perspective: maximum displacement of each corner, relative to boardSize
+-->          - rng: numpy RandomState used by the perspective displacement
+-->  Return:
+-->          - float32 array of the corners (top-left, top-right, bottom-right, bottom-left)
+"""
+
+def boardQuad(center, boardSize, rotation=0.0, perspective=0.0, rng=None):
+    half = boardSize / 2.0
+    corners = np.float32([[-half, -half], [half, -half], [half, half], [-half, half]])
+    if perspective > 0:
+        rng = np.random.RandomState() if rng is None else rng
+        corners += rng.uniform(-perspective, perspective, (4, 2)).astype(np.float32) * boardSize
+    angle = np.deg2rad(rotation)
+    rotationMatrix = np.float32([[np.cos(angle), -np.sin(angle)], [np.sin(angle), np.cos(angle)]])
+    return corners.dot(rotationMatrix.T) + np.float32(center)
+
+"""
+-->  Render a camera-like image of the board
+-->  Parameters:
+-->          - cells: numSquares x numSquares array of cell codes (EMPTY, WHITE, BLACK)
+-->          - imageSize: (height, width) of the image
+-->          - boardSize: side of the board in pixels (before perspective)
+-->          - center: (x, y) center of the board (None = center of the image)
+-->          - rotation: rotation of the board in degrees
+-->          - perspective: maximum displacement of each corner, relative to boardSize
+-->          - blur: sigma of the Gaussian blur (0 = no blur)
+-->          - noise: standard deviation of the Gaussian noise
+-->          - gain: global lighting multiplier
+-->          - gradient: lighting variation from the left to the right side of the image
+-->          - rng: numpy RandomState (None = new random state)
+-->  Return:
+-->          - BGR image
+-->          - ground truth dictionary: 'quad' (4 x 2 float32 corners), 'cells' (cell codes)
+"""
+
+def renderBoard(cells, imageSize=None, boardSize=None, center=None, rotation=0.0, perspective=0.0,
+                blur=0.0, noise=0.0, gain=1.0, gradient=0.0, rng=None):
+    rng = np.random.RandomState() if rng is None else rng
+    height, width = SceneConst.imageSize if imageSize is None else imageSize
+    boardSize = SceneConst.boardSize if boardSize is None else boardSize
+    center = (width / 2.0, height / 2.0) if center is None else center
+    cells = np.asarray(cells, dtype=np.int8)
+
+    ## --- Background with low frequency texture
+    img = np.empty((height, width, 3), dtype=np.uint8)
+    img[:] = SceneConst.backgroundColour
+    texture = cv2.resize(rng.randint(0, 30, (height // 32 + 1, width // 32 + 1)).astype(np.uint8), (width, height))
+    img = cv2.add(img, cv2.merge([texture, texture, texture]))
+
+    ## --- Board with perspective
+    textureSize = int(boardSize)
+    quad = boardQuad(center, boardSize, rotation, perspective, rng)
+    source = np.float32([[0, 0], [textureSize, 0], [textureSize, textureSize], [0, textureSize]])
+    homography = cv2.getPerspectiveTransform(source, quad)
+    board = cv2.warpPerspective(drawBoard(cells, textureSize), homography, (width, height), flags=cv2.INTER_LINEAR)
+    mask = cv2.warpPerspective(np.full((textureSize, textureSize), 255, np.uint8), homography, (width, height))
+    img[mask > 127] = board[mask > 127]
+
+    ## --- Lighting, blur and noise
+    img = img.astype(np.float32)
+    if gain != 1.0 or gradient != 0.0:
+        light = gain * (1 + gradient * (np.arange(width, dtype=np.float32) / width - 0.5))
+        img *= light[None, :, None]
+    if blur > 0:
+        img = cv2.GaussianBlur(img, (0, 0), blur)
+    if noise > 0:
+        img += rng.normal(0, noise, img.shape).astype(np.float32)
+    img = np.clip(img, 0, 255).astype(np.uint8)
+    return img, {'quad': quad, 'cells': cells}
+
+"""
+-->  Draw random parameters and pieces of a scene
+-->  Parameters:
+-->          - rng: numpy RandomState
+-->          - numSquares: number of cells of each row
+-->          - imageSize: (height, width) of the image
+-->          - maxRotation: maximum rotation in degrees
+-->          - maxPerspective: maximum corner displacement relative to the board size
+-->          - maxBlur: maximum blur sigma
+-->          - maxNoise: maximum noise standard deviation
+-->          - gainRange: (min, max) lighting multiplier
+-->          - maxGradient: maximum lighting gradient
+-->  Return:
+-->          - BGR image and ground truth dictionary (same of renderBoard)
+"""
+
+def randomScene(rng, numSquares=3, imageSize=None, maxRotation=10.0, maxPerspective=0.03, maxBlur=1.5,
+                maxNoise=6.0, gainRange=(0.6, 1.2), maxGradient=0.3):
+    height, width = SceneConst.imageSize if imageSize is None else imageSize
+    boardSize = rng.uniform(0.45, 0.7) * min(height, width)
+    margin = boardSize * 0.75
+    center = (rng.uniform(margin, width - margin), rng.uniform(margin, height - margin))
+    cells = rng.choice([EMPTY, WHITE, BLACK], (numSquares, numSquares), p=[0.5, 0.25, 0.25])
+    return renderBoard(cells, (height, width), boardSize, center,
+                       rotation=rng.uniform(-maxRotation, maxRotation),
+                       perspective=rng.uniform(0, maxPerspective),
+                       blur=rng.uniform(0, maxBlur),
+                       noise=rng.uniform(0, maxNoise),
+                       gain=rng.uniform(*gainRange),
+                       gradient=rng.uniform(-maxGradient, maxGradient),
+                       rng=rng)
+
+"""
+-->  Generate a dataset of random scenes into memory-mapped .npy files
+-->  Parameters:
+-->          - path: directory of the dataset (created if it doesn't exist)
+-->          - count: number of scenes
+-->          - numSquares: number of cells of each row
+-->          - imageSize: (height, width) of the images
+-->          - seed: seed of the random scenes
+-->          - sceneParameters: extra parameters of randomScene
+-->  Return:
+-->          - dataset dictionary (same of loadDataset)
+"""
+
+def generateDataset(path, count, numSquares=3, imageSize=(360, 640), seed=0, **sceneParameters):
+    os.makedirs(path, exist_ok=True)
+    height, width = imageSize
+    frames = np.lib.format.open_memmap(os.path.join(path, "frames.npy"), mode='w+', dtype=np.uint8,
+                                       shape=(count, height, width, 3))
+    quads = np.lib.format.open_memmap(os.path.join(path, "quads.npy"), mode='w+', dtype=np.float32,
+                                      shape=(count, 4, 2))
+    cells = np.lib.format.open_memmap(os.path.join(path, "cells.npy"), mode='w+', dtype=np.int8,
+                                      shape=(count, numSquares, numSquares))
+    rng = np.random.RandomState(seed)
+    for k in range(count):
+        frames[k], groundTruth = randomScene(rng, numSquares, imageSize, **sceneParameters)
+        quads[k] = groundTruth['quad']
+        cells[k] = groundTruth['cells']
+    for array in (frames, quads, cells):
+        array.flush()
+    return loadDataset(path)
+
+"""
+-->  Load a dataset without reading it into memory
+-->  Parameters:
+-->          - path: directory of the dataset
+-->  Return:
+-->          - dictionary of memory-mapped arrays: 'frames', 'quads' and 'cells'
+"""
+
+def loadDataset(path):
+    return {name: np.load(os.path.join(path, name + ".npy"), mmap_mode='r') for name in ("frames", "quads", "cells")}
+
+"""
+-->  Convert cell codes to the letters used by the vision ('-', 'W', 'B')
+-->  Parameters:
+-->          - cells: array of cell codes in the orientation of the image
+-->          - quarterTurns: rotation of the camera mounting (as np.rot90)
+-->  Return:
+-->          - array of letters in the orientation of the board
+"""
+
+def cellLetters(cells, quarterTurns=0):
+    return CELL_LETTERS[np.rot90(np.asarray(cells), quarterTurns)]
@@ -0,0 +1,90 @@
+"""
+:File: testbitboard.py
+:Description: | Test of the bit board of bitboard.py against a plain scan of the letters of the board
+              | Usage: python3 testbitboard.py (or python3 -m pytest testbitboard.py)
+
+:Author: Willian Beraldi Esperandio
+:Email: willian.esperandio@gmail.com
+:Date: 16/10/2026
+:Revision: version 1
+:License: MIT License
+"""
+
+
+import os
+import sys
+import random
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from bitboard import BitBoard, iterBits, WHITE_LETTER, BLACK_LETTER, EMPTY_LETTER
+
+"""
+-->  Test if a letter has k pieces in a row by scanning every cell and direction of the board
+"""
+
+def scanWinner(rows, letter, k):
+    numSquares = len(rows)
+    for i in range(numSquares):
+        for j in range(numSquares):
+            for di, dj in ((0, 1), (1, 0), (1, 1), (1, -1)):
+                cells = [(i + di*step, j + dj*step) for step in range(k)]
+                if all(0 <= y < numSquares and 0 <= x < numSquares and rows[y][x] == letter for y, x in cells):
+                    return True
+    return False
+
+"""
+-->  Random board with the letters of both players
+"""
+
+def randomRows(rng, numSquares):
+    letters = (WHITE_LETTER, BLACK_LETTER, EMPTY_LETTER, EMPTY_LETTER)
+    return [[rng.choice(letters) for _ in range(numSquares)] for _ in range(numSquares)]
+
+"""
+-->  Winner, winning moves (of the players without a line) and conversions must match the scan
+-->  of the letters
+"""
+
+def test_matchesScan():
+    rng = random.Random(0)
+    for numSquares, k in ((3, 3), (4, 4), (5, 4), (7, 5)):
+        for _ in range(200):
+            rows = randomRows(rng, numSquares)
+            bitBoard = BitBoard.fromCharArray(rows, k)
+            assert bitBoard.toCharArray().tolist() == rows
+            for letter in (WHITE_LETTER, BLACK_LETTER):
+                assert bitBoard.isWinner(letter) == scanWinner(rows, letter, k)
+                if bitBoard.isWinner(letter):
+                    continue
+                expected = 0
+                for cell in bitBoard.legalMoves():
+                    i, j = bitBoard.position(cell)
+                    rows[i][j] = letter
+                    if scanWinner(rows, letter, k):
+                        expected |= 1 << cell
+                    rows[i][j] = EMPTY_LETTER
+                assert bitBoard.winningMoves(letter) == expected
+
+"""
+-->  A move is a winning move only if it completes a line through its cell, and undo restores the board
+"""
+
+def test_winningMove():
+    rng = random.Random(1)
+    for numSquares, k in ((3, 3), (7, 5)):
+        for _ in range(200):
+            bitBoard = BitBoard.fromCharArray(randomRows(rng, numSquares), k)
+            if bitBoard.isWinner(WHITE_LETTER) or bitBoard.isFull():
+                continue
+            white, black = bitBoard.white, bitBoard.black
+            cell = rng.choice(list(bitBoard.legalMoves()))
+            bitBoard.play(cell, WHITE_LETTER)
+            assert bitBoard.isWinningMove(bitBoard.white, cell) == bitBoard.isWinner(WHITE_LETTER)
+            bitBoard.undo(cell)
+            assert (bitBoard.white, bitBoard.black) == (white, black)
+            assert cell in iterBits(bitBoard.empty())
+
+
+if __name__ == '__main__':
+    test_matchesScan()
+    test_winningMove()
+    print("Bit board tests passed")
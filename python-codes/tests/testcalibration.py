@@ -0,0 +1,97 @@
+"""
+:File: testcalibration.py
+:Description: | Test of the stored calibration of the board (calibration.py and tictactoe.py)
+              | Round trip of the arrays, interrupted saves and verification with the current frame
+              | Usage: python3 testcalibration.py (or python3 -m pytest testcalibration.py)
+
+:Author: Willian Beraldi Esperandio
+:Email: willian.esperandio@gmail.com
+:Date: 16/10/2026
+:Revision: version 1
+:License: MIT License
+"""
+
+
+import os
+import sys
+import tempfile
+import numpy as np
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import calibration
+import tictactoe as ttt
+import synthboard
+
+"""
+-->  Saved arrays and metadata are loaded back, and a new save doesn't change the arrays
+-->  already mapped by a previous load
+"""
+
+def test_roundTrip():
+    with tempfile.TemporaryDirectory() as path:
+        first = np.arange(12, dtype=np.float32).reshape(3, 4)
+        calibration.saveCalibration(path, {"name": "first"}, {"map": first})
+        metadata, arrays = calibration.loadCalibration(path)
+        assert metadata["name"] == "first"
+        assert np.array_equal(arrays["map"], first)
+
+        calibration.saveCalibration(path, {"name": "second"}, {"map": first*2})
+        newMetadata, newArrays = calibration.loadCalibration(path)
+        assert newMetadata["name"] == "second"
+        assert np.array_equal(newArrays["map"], first*2)
+        assert np.array_equal(arrays["map"], first)
+
+"""
+-->  A save interrupted before the metadata is replaced leaves the previous calibration intact
+"""
+
+def test_interruptedSave():
+    with tempfile.TemporaryDirectory() as path:
+        calibration.saveCalibration(path, {"name": "first"}, {"map": np.zeros(8, np.int32)})
+        replace = calibration.os.replace
+        def interrupt(source, destination):
+            raise OSError("interrupted")
+        calibration.os.replace = interrupt
+        try:
+            calibration.saveCalibration(path, {"name": "second"}, {"map": np.ones(4, np.int32)})
+            assert False, "the save wasn't interrupted"
+        except OSError:
+            pass
+        finally:
+            calibration.os.replace = replace
+        metadata, arrays = calibration.loadCalibration(path)
+        assert metadata["name"] == "first"
+        assert np.array_equal(arrays["map"], np.zeros(8, np.int32))
+
+"""
+-->  The board calibration is restored with the same frame and rejected with another frame,
+-->  and the white threshold is only returned by an accepted calibration
+"""
+
+def test_boardCalibration():
+    img, truth = synthboard.renderBoard(np.zeros((3, 3), np.int8), imageSize=(360, 640), boardSize=240,
+                                        rotation=4.0, noise=3.0, rng=np.random.RandomState(0))
+    square = truth['quad'].astype(np.int32)
+    tracker = ttt.BoardTracker(img, square)
+    rectifier = ttt.BoardRectifier(square)
+    whiteThreshold = ttt.ProgConst.whiteThreshold
+    with tempfile.TemporaryDirectory() as path:
+        ttt.ProgConst.whiteThreshold = 90
+        ttt.saveBoardCalibration(tracker, rectifier, None, img.shape, path)
+        ttt.ProgConst.whiteThreshold = whiteThreshold
+
+        loaded = ttt.loadBoardCalibration(np.zeros_like(img), path)
+        assert loaded == (None, None, None, None)
+        assert ttt.ProgConst.whiteThreshold == whiteThreshold
+
+        loadedTracker, loadedRectifier, classifier, loadedThreshold = ttt.loadBoardCalibration(img, path)
+        assert loadedTracker is not None and classifier is None
+        assert loadedThreshold == 90
+        assert np.abs(loadedTracker.square - square).max() <= 1
+        assert ttt.ProgConst.whiteThreshold == whiteThreshold
+
+
+if __name__ == '__main__':
+    test_roundTrip()
+    test_interruptedSave()
+    test_boardCalibration()
+    print("Calibration tests passed")
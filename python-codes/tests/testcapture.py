@@ -0,0 +1,85 @@
+"""
+:File: testcapture.py
+:Description: | Test of the frame pool, of the in-memory frame source and of the threaded capture of capture.py
+              | Usage: python3 testcapture.py (or python3 -m pytest testcapture.py)
+
+:Author: Willian Beraldi Esperandio
+:Email: willian.esperandio@gmail.com
+:Date: 16/10/2026
+:Revision: version 1
+:License: MIT License
+"""
+
+
+import os
+import sys
+import time
+import numpy as np
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from capture import FramePool, GeneratorSource, ThreadedCapture, HELD_FRAMES
+
+"""
+-->  Frames filled with their number, so a frame overwritten by a newer one is detected
+"""
+
+def numberedFrames(count):
+    return (np.full((48, 64, 3), index % 256, np.uint8) for index in range(count))
+
+"""
+-->  Buffers are reused by name and reallocated only when the shape changes
+"""
+
+def test_framePool():
+    pool = FramePool()
+    first = pool.buffer('gray', (48, 64))
+    assert pool.buffer('gray', (48, 64)) is first
+    assert pool.buffer('gray', (96, 128)) is not first
+    copy = pool.copy('overlay', np.ones((48, 64, 3), np.uint8))
+    assert pool.copy('overlay', np.zeros((48, 64, 3), np.uint8)) is copy and not copy.any()
+    assert (pool.allocations, pool.requests) == (3, 5)
+
+"""
+-->  The in-memory source writes into the given image and ends with (False, None)
+"""
+
+def test_generatorSource():
+    source = GeneratorSource(numberedFrames(2))
+    image = np.empty((48, 64, 3), np.uint8)
+    ret, frame = source.read(image)
+    assert ret and frame is image and not frame.any()
+    ret, frame = source.read()
+    assert ret and (frame == 1).all()
+    assert source.read(image) == (False, None)
+
+"""
+-->  Frames are read in order, and the last HELD_FRAMES frames returned to the reader are never
+-->  overwritten by the capture thread
+"""
+
+def test_heldFrames():
+    capture = ThreadedCapture(GeneratorSource(numberedFrames(300), fps=1000)).start()
+    held = []
+    lastIndex = 0
+    try:
+        while True:
+            ret, frame, timestamp, frameIndex = capture.readWithTimestamp(newFrame=True)
+            if not ret:
+                break
+            assert frameIndex > lastIndex
+            lastIndex = frameIndex
+            held = (held + [(frame, int(frame[0, 0, 0]))])[-HELD_FRAMES:]
+            ## --- Slow reader: the capture thread writes the other buffers meanwhile
+            time.sleep(0.002)
+            for heldFrame, value in held:
+                assert (heldFrame == value).all()
+    finally:
+        capture.release()
+    assert lastIndex > 100
+    assert capture.sourceAllocations == 1
+
+
+if __name__ == '__main__':
+    test_framePool()
+    test_generatorSource()
+    test_heldFrames()
+    print("Capture tests passed")
@@ -0,0 +1,66 @@
+"""
+:File: testmcts.py
+:Description: | Test of the Monte Carlo tree search of mcts.py
+              | Forced wins and blocks must be found, in the main process and with worker processes
+              | Usage: python3 testmcts.py (or python3 -m pytest testmcts.py)
+
+:Author: Willian Beraldi Esperandio
+:Email: willian.esperandio@gmail.com
+:Date: 16/10/2026
+:Revision: version 1
+:License: MIT License
+"""
+
+
+import os
+import sys
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from mcts import MctsEngine
+
+"""
+-->  Positions (mover, opponent, numSquares, k, expected move) of forced wins and blocks
+"""
+
+POSITIONS = (
+    ## --- 3x3: the player to move has 0 and 1, cell 2 wins
+    (0b000000011, 0b000011000, 3, 3, 2),
+    ## --- 3x3: the opponent has 0 and 1, cell 2 is the only block
+    (0b000010000, 0b000000011, 3, 3, 2),
+    ## --- 7x7, 4 in a row: the opponent has 3 pieces of the first row open on one side only
+    (1 << 8 | 1 << 9 | 1 << 16, 1 << 0 | 1 << 1 | 1 << 2, 7, 4, 3),
+)
+
+"""
+-->  Forced wins and blocks must be found with 1 and 2 workers
+"""
+
+def test_forcedMoves():
+    for numWorkers in (1, 2):
+        engines = {}
+        try:
+            for mover, opponent, numSquares, k, expected in POSITIONS:
+                if (numSquares, k) not in engines:
+                    engines[numSquares, k] = MctsEngine(numSquares, k, numWorkers, 16, 8, seed=0)
+                cell, winRate, playouts = engines[numSquares, k].search(mover, opponent, 1.0)
+                assert cell == expected, (numWorkers, numSquares, cell, expected)
+                assert playouts > 0
+        finally:
+            for engine in engines.values():
+                engine.close()
+
+"""
+-->  Searches with the same seed and the same number of batches return the same move and statistics
+"""
+
+def test_seededSearch():
+    engine = MctsEngine(3, 3, 1, 16, 8, seed=0)
+    first = engine.search(0, 1 << 4, 10.0, maxIterations=20)
+    engine.seed(0)
+    assert engine.search(0, 1 << 4, 10.0, maxIterations=20) == first
+    engine.close()
+
+
+if __name__ == '__main__':
+    test_forcedMoves()
+    test_seededSearch()
+    print("Monte Carlo tree search tests passed")
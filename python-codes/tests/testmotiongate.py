@@ -0,0 +1,63 @@
+"""
+:File: testmotiongate.py
+:Description: | Test of the motion gate of tictactoe.py with synthetic boards
+              | A single new piece must be reported as a change, camera noise must not
+              | Usage: python3 testmotiongate.py (or python3 -m pytest testmotiongate.py)
+
+:Author: Willian Beraldi Esperandio
+:Email: willian.esperandio@gmail.com
+:Date: 16/10/2026
+:Revision: version 1
+:License: MIT License
+"""
+
+
+import os
+import sys
+import numpy as np
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import tictactoe as ttt
+import synthboard
+
+"""
+-->  Render a board with the same position and lighting of the other renders of the test
+"""
+
+def render(cells, seed):
+    return synthboard.renderBoard(cells, imageSize=(360, 640), boardSize=240, rotation=4.0, noise=3.0,
+                                  rng=np.random.RandomState(seed))
+
+"""
+-->  A white piece added to an empty board (the smallest change of the mean of the board) must be
+-->  detected, and a new frame of the same board must not
+"""
+
+def test_singleCellChange():
+    empty = np.zeros((3, 3), np.int8)
+    oneMove = empty.copy()
+    oneMove[0][2] = synthboard.WHITE
+    img, truth = render(empty, 1)
+    motionGate = ttt.MotionGate(truth['quad'])
+    motionGate.setReference(img)
+    assert motionGate.isUnchanged(render(empty, 2)[0])
+    assert not motionGate.isUnchanged(render(oneMove, 3)[0])
+
+"""
+-->  Motion stops after stillFrames frames without change, and the new piece is the change
+"""
+
+def test_motionStops():
+    empty = np.zeros((3, 3), np.int8)
+    oneMove = empty.copy()
+    oneMove[1][1] = synthboard.WHITE
+    img, truth = render(empty, 1)
+    motionGate = ttt.MotionGate(truth['quad'], stillFrames=3)
+    frames = [render(empty, 10)[0]] + [render(oneMove, 11 + k)[0] for k in range(4)]
+    stopped = [motionGate.update(frame) for frame in frames]
+    assert stopped == [False, False, False, False, True]
+
+
+if __name__ == '__main__':
+    test_singleCellChange()
+    test_motionStops()
+    print("Motion gate tests passed")
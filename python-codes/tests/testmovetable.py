@@ -0,0 +1,52 @@
+"""
+:File: testmovetable.py
+:Description: | Test of the perfect play table of movetable.py
+              | Usage: python3 testmovetable.py (or python3 -m pytest testmovetable.py)
+
+:Author: Willian Beraldi Esperandio
+:Email: willian.esperandio@gmail.com
+:Date: 16/10/2026
+:Revision: version 1
+:License: MIT License
+"""
+
+
+import os
+import sys
+import numpy as np
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import movetable
+
+"""
+-->  The stored table must be the generated table, and every position must agree with minimax
+"""
+
+def test_tableMatchesMinimax():
+    table = movetable.loadMoveTable()
+    assert table is not None, "movetable.npy not found"
+    assert np.array_equal(table, movetable.generateTable())
+    positions, errors = movetable.verifyTable(table)
+    assert positions > 5000 and errors == 0
+
+"""
+-->  Known positions: the empty board is a draw, a forced win is played and a threat is blocked,
+-->  unreachable positions have no moves
+"""
+
+def test_lookup():
+    table = movetable.loadMoveTable()
+    value, moves = movetable.lookupMoves(0, 0, table)
+    assert value == 0 and moves
+    ## --- Player to move has 0 and 1, the opponent has 3 and 4: cell 2 wins
+    value, moves = movetable.lookupMoves(0b11, 0b11000, table)
+    assert value == 1 and moves == 1 << 2
+    ## --- Opponent has 0 and 1, the player to move has 4: cell 2 is the only move that doesn't lose
+    value, moves = movetable.lookupMoves(0b10000, 0b11, table)
+    assert moves == 1 << 2
+    assert movetable.lookupMoves(0b111, 0, table) == (None, 0)
+
+
+if __name__ == '__main__':
+    test_tableMatchesMinimax()
+    test_lookup()
+    print("Move table tests passed")
@@ -0,0 +1,58 @@
+"""
+:File: testpyramid.py
+:Description: | Test of the coarse-to-fine board localization of tictactoe.py with synthetic boards
+              | The board with the preset pattern must be found at 1/4 and 1/8 scale
+              | Usage: python3 testpyramid.py (or python3 -m pytest testpyramid.py)
+
+:Author: Willian Beraldi Esperandio
+:Email: willian.esperandio@gmail.com
+:Date: 16/10/2026
+:Revision: version 1
+:License: MIT License
+"""
+
+
+import os
+import sys
+import numpy as np
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import tictactoe as ttt
+import synthboard
+
+"""
+-->  Render a 1280x720 camera image of the preset board (white pieces on the corners and center)
+"""
+
+def renderPreset(seed):
+    cells = np.zeros((3, 3), np.int8)
+    for i, j in ((0, 0), (0, 2), (1, 1), (2, 0), (2, 2)):
+        cells[i][j] = synthboard.WHITE
+    return synthboard.renderBoard(cells, imageSize=(720, 1280), boardSize=400, center=(600, 380), rotation=6.0,
+                                  perspective=0.02, blur=1.0, noise=4.0, gain=0.9, gradient=0.2,
+                                  rng=np.random.RandomState(seed))
+
+"""
+-->  Average distance between the corners found and the corners of the ground truth
+"""
+
+def cornerError(square, quad):
+    distances = np.linalg.norm(square.reshape(-1, 1, 2).astype(float) - quad[None, :, :], axis=2)
+    return distances.min(axis=1).mean()
+
+"""
+-->  The board must be found at full resolution and with 1, 2 and 3 pyramid levels, and the
+-->  refined corners must be close to the ground truth
+"""
+
+def test_pyramidLevels():
+    img, truth = renderPreset(0)
+    for levels in (0, 1, 2, 3):
+        square = ttt.findBoardSquarePyramid(img, levels=levels)
+        print("")
+        assert square is not None, "board not found with %d levels" % levels
+        assert cornerError(square, truth['quad']) < 4.0, "corner error with %d levels" % levels
+
+
+if __name__ == '__main__':
+    test_pyramidLevels()
+    print("Pyramid localization tests passed")
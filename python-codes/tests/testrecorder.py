@@ -0,0 +1,86 @@
+"""
+:File: testrecorder.py
+:Description: | Test of the session recorder and of the replay of recorder.py
+              | Usage: python3 testrecorder.py (or python3 -m pytest testrecorder.py)
+
+:Author: Willian Beraldi Esperandio
+:Email: willian.esperandio@gmail.com
+:Date: 16/10/2026
+:Revision: version 1
+:License: MIT License
+"""
+
+
+import os
+import sys
+import tempfile
+import numpy as np
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import recorder
+
+"""
+-->  Board state with a single white piece on a cell
+"""
+
+def boardWithPiece(cell):
+    board = np.chararray((3, 3), 1, True)
+    board[:] = '-'
+    board.reshape(-1)[cell] = 'W'
+    return board
+
+"""
+-->  Recorded images, timestamps and boards are replayed unchanged, a frame is recorded only
+-->  once and the preset board is always recorded
+"""
+
+def test_roundTrip():
+    rng = np.random.RandomState(0)
+    images = rng.randint(0, 256, (4, 30, 30, 3)).astype(np.uint8)
+    with tempfile.TemporaryDirectory() as path:
+        fileName = os.path.join(path, "session.rec")
+        sessionRecorder = recorder.SessionRecorder(fileName, 30, 3)
+        assert sessionRecorder.record(images[0], 1.0, recorder.PRESET_FRAME, boardWithPiece(4))
+        assert sessionRecorder.record(images[1], 2.0, 7, boardWithPiece(0))
+        assert not sessionRecorder.record(images[1], 2.5, 7, boardWithPiece(0))
+        assert sessionRecorder.record(images[2], 3.0, 8)
+        assert sessionRecorder.record(images[3], 4.0, recorder.PRESET_FRAME, boardWithPiece(4))
+        sessionRecorder.close()
+        assert sessionRecorder.recordedFrames == 4
+
+        session = recorder.loadSession(fileName)
+        assert len(session) == 4
+        assert list(session['frameIndex']) == [recorder.PRESET_FRAME, 7, 8, recorder.PRESET_FRAME]
+        assert list(session['timestamp']) == [1.0, 2.0, 3.0, 4.0]
+        assert np.array_equal(session['image'], images[[0, 1, 2, 3]])
+        assert np.char.decode(session['board'][1]).tolist() == boardWithPiece(0).tolist()
+        assert (session['board'][2] == recorder.UNKNOWN_CELL).all()
+        del session
+
+"""
+-->  A record partially written by an interrupted session is ignored, and other files are rejected
+"""
+
+def test_truncatedSession():
+    with tempfile.TemporaryDirectory() as path:
+        fileName = os.path.join(path, "session.rec")
+        sessionRecorder = recorder.SessionRecorder(fileName, 20, 3)
+        for frameIndex in range(3):
+            sessionRecorder.record(np.full((20, 20, 3), frameIndex, np.uint8), float(frameIndex), frameIndex)
+        sessionRecorder.close()
+        with open(fileName, 'r+b') as file:
+            file.truncate(os.path.getsize(fileName) - 10)
+        session = recorder.loadSession(fileName)
+        assert len(session) == 2 and (session['image'][1] == 1).all()
+        del session
+
+        otherFile = os.path.join(path, "other.rec")
+        with open(otherFile, 'wb') as file:
+            file.write(b'not a session' * 10)
+        assert recorder.loadSession(otherFile) is None
+        assert recorder.loadSession(os.path.join(path, "missing.rec")) is None
+
+
+if __name__ == '__main__':
+    test_roundTrip()
+    test_truncatedSession()
+    print("Recorder tests passed")
@@ -0,0 +1,79 @@
+"""
+:File: testsearch.py
+:Description: | Test of the search engine of search.py
+              | The moves of the 3x3 game are checked against the perfect play table and the
+              | time budget is checked on large boards
+              | Usage: python3 testsearch.py (or python3 -m pytest testsearch.py)
+
+:Author: Willian Beraldi Esperandio
+:Email: willian.esperandio@gmail.com
+:Date: 16/10/2026
+:Revision: version 1
+:License: MIT License
+"""
+
+
+import os
+import sys
+import time
+import random
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from search import SearchEngine
+from transposition import TranspositionTable
+from movetable import loadMoveTable, lookupMoves, hasLine
+
+"""
+-->  Positions of random 3x3 games that aren't over, seen by the player to move
+"""
+
+def samplePositions(count, seed):
+    rng = random.Random(seed)
+    positions = []
+    while len(positions) < count:
+        mover, opponent = 0, 0
+        for _ in range(rng.randrange(0, 8)):
+            empty = [cell for cell in range(9) if not (mover | opponent) >> cell & 1]
+            mover, opponent = opponent, mover | 1 << rng.choice(empty)
+            if hasLine(opponent):
+                break
+        if not hasLine(opponent) and mover | opponent != 511:
+            positions.append((mover, opponent))
+    return positions
+
+"""
+-->  On 3x3 boards the complete search must find the value of the perfect play table and a move
+-->  that keeps it, with and without transposition table
+"""
+
+def test_searchMatchesMoveTable():
+    table = loadMoveTable()
+    assert table is not None, "movetable.npy not found"
+    for engine in (SearchEngine(3, 3), SearchEngine(3, 3, table=TranspositionTable(3, 3, 2**12))):
+        for mover, opponent in samplePositions(200, 1):
+            value, moves = lookupMoves(mover, opponent, table)
+            cell, score, depth = engine.search(mover, opponent, 10.0)
+            searchValue = 1 if score > 0 else (-1 if score < 0 else 0)
+            assert searchValue == value, (mover, opponent, score, value)
+            assert lookupMoves(opponent, mover | 1 << cell, table)[0] == -value or hasLine(mover | 1 << cell)
+
+"""
+-->  The search must return within the time budget on boards where a node is slow
+"""
+
+def test_deadline():
+    for numSquares, k in ((7, 5), (15, 5)):
+        center = numSquares//2*numSquares + numSquares//2
+        for timeBudget in (0.05, 0.2, 0.5):
+            engine = SearchEngine(numSquares, k)
+            start = time.perf_counter()
+            cell, score, depth = engine.search(1 << center + 1, 1 << center, timeBudget)
+            elapsed = time.perf_counter() - start
+            assert cell is not None
+            assert elapsed <= timeBudget, "%dx%d: %.3f s for a budget of %.3f s" % (numSquares, numSquares,
+                                                                                     elapsed, timeBudget)
+
+
+if __name__ == '__main__':
+    test_searchMatchesMoveTable()
+    test_deadline()
+    print("Search tests passed")
@@ -0,0 +1,110 @@
+"""
+:File: testtransposition.py
+:Description: | Test of the symmetric Zobrist hashes and of the transposition table of transposition.py
+              | Usage: python3 testtransposition.py (or python3 -m pytest testtransposition.py)
+
+:Author: Willian Beraldi Esperandio
+:Email: willian.esperandio@gmail.com
+:Date: 16/10/2026
+:Revision: version 1
+:License: MIT License
+"""
+
+
+import os
+import sys
+import random
+import tempfile
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from transposition import ZobristHasher, TranspositionTable, canonicalKey, symmetryPermutations, EXACT, LOWER
+
+"""
+-->  Random position with the same number of pieces of both players (or one more of the opponent)
+"""
+
+def randomPosition(rng, numSquares):
+    cells = rng.sample(range(numSquares*numSquares), rng.randrange(0, numSquares*numSquares))
+    opponentCount = (len(cells) + 1)//2
+    mover = sum(1 << cell for cell in cells[opponentCount:])
+    opponent = sum(1 << cell for cell in cells[:opponentCount])
+    return mover, opponent
+
+"""
+-->  Position moved to another orientation of the board
+"""
+
+def transform(mask, permutation):
+    return sum(1 << permutation[cell] for cell in range(len(permutation)) if mask >> cell & 1)
+
+"""
+-->  Moves equivalent to a move in a position: its images by the symmetries that keep the position
+"""
+
+def equivalentMoves(mover, opponent, move, numSquares):
+    if move < 0:
+        return {move}
+    return {permutation[move] for permutation in symmetryPermutations(numSquares)
+            if transform(mover, permutation) == mover and transform(opponent, permutation) == opponent}
+
+"""
+-->  The 8 orientations of a position have the same canonical key, and a move stored in one
+-->  orientation is returned in the orientation of the lookup (or as an equivalent move, if the
+-->  position is symmetric)
+"""
+
+def test_symmetricLookup():
+    rng = random.Random(0)
+    for numSquares in (3, 4, 7):
+        hasher = ZobristHasher(numSquares)
+        table = TranspositionTable(numSquares, 3, 2**12)
+        for _ in range(50):
+            mover, opponent = randomPosition(rng, numSquares)
+            empty = [cell for cell in range(numSquares*numSquares) if not (mover | opponent) >> cell & 1]
+            move = rng.choice(empty) if empty else -1
+            key, symmetry = canonicalKey(hasher.hashPosition(mover, opponent)[0])
+            table.store(key, symmetry, 7, 3, EXACT, move)
+            for permutation in symmetryPermutations(numSquares):
+                otherMover, otherOpponent = transform(mover, permutation), transform(opponent, permutation)
+                otherKey, otherSymmetry = canonicalKey(hasher.hashPosition(otherMover, otherOpponent)[0])
+                assert otherKey == key
+                score, depth, flag, otherMove = table.probe(otherKey, otherSymmetry)
+                assert (score, depth, flag) == (7, 3, EXACT)
+                expected = permutation[move] if move >= 0 else -1
+                assert otherMove in equivalentMoves(otherMover, otherOpponent, expected, numSquares)
+
+"""
+-->  The hashes updated by play are the hashes of the position after the move
+"""
+
+def test_incrementalHashes():
+    rng = random.Random(1)
+    hasher = ZobristHasher(5)
+    for _ in range(100):
+        mover, opponent = randomPosition(rng, 5)
+        empty = [cell for cell in range(25) if not (mover | opponent) >> cell & 1]
+        if not empty:
+            continue
+        cell = rng.choice(empty)
+        assert hasher.play(hasher.hashPosition(mover, opponent), cell) == hasher.hashPosition(opponent, mover | 1 << cell)
+
+"""
+-->  Entries of a persisted table are found again after it is reopened
+"""
+
+def test_persistence():
+    hasher = ZobristHasher(3)
+    key, symmetry = canonicalKey(hasher.hashPosition(0b1, 0b10000)[0])
+    with tempfile.TemporaryDirectory() as path:
+        table = TranspositionTable(3, 3, 2**10, path)
+        table.store(key, symmetry, -5, 4, LOWER, 8)
+        table.flush()
+        del table
+        table = TranspositionTable(3, 3, 2**10, path)
+        assert table.probe(key, symmetry) == (-5, 4, LOWER, 8)
+
+
+if __name__ == '__main__':
+    test_symmetricLookup()
+    test_incrementalHashes()
+    test_persistence()
+    print("Transposition table tests passed")
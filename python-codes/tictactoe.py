@@ -15,15 +15,22 @@
 
 import cv2
 import numpy as np
-import random
-import math
+import os
+import time
 import serial
-
-"""
---> Class created to break nested for
-"""
-
-class BigBreak(Exception): pass
+from functools import lru_cache
+from collections import deque
+from calibration import saveCalibration, loadCalibration
+from capture import ThreadedCapture, openFrameSource, FramePool
+from recorder import SessionRecorder, PRESET_FRAME
+from display import Display
+from preview import PreviewServer
+from bitboard import BitBoard, regionMasks, iterBits, randomBit
+from movetable import lookupMoves
+from search import SearchEngine
+from mcts import MctsEngine
+from transposition import TranspositionTable
+from concurrent.futures import ThreadPoolExecutor
 
 """
 --> Class for colored text
@@ -48,7 +55,80 @@ class ProgConst:
     computerLetter = 'W'
     playerLetter = 'B'
     numSquares = 3
+    ## Number of pieces in a row to win the game
+    winLength = 3
+    ## Use the perfect play table of the 3x3 game (movetable.npy) to choose the moves
+    useMoveTable = True
+    ## Moves of the positions without the table: 'alphabeta' (search engine), 'mcts' (Monte Carlo tree
+    ## search) or 'heuristic'
+    moveEngine = 'alphabeta'
+    ## Maximum time (seconds) of the search of each move
+    searchTimeBudget = 2.0
+    ## Directory of the transposition tables kept between the games (None = only in memory) and number of entries
+    transpositionPath = "transposition"
+    transpositionSize = 2**18
+    ## Monte Carlo tree search: worker processes of the playouts (1 = in the main process), playouts of
+    ## each leaf, leaves of each worker in a batch, exploration constant of UCT and seed (None = random)
+    mctsWorkers = 4
+    mctsPlayoutsPerLeaf = 16
+    mctsBatchSize = 16
+    mctsExploration = 1.4
+    mctsSeed = None
+    ## Quarter turns between the camera image and the board of the robot (camera mounting)
+    boardRotation = 2
+    ## Minimum average gray intensity of white pieces
+    whiteThreshold = 127
+    ## Cell classifier used during the game: 'grid' (sampling of the cells) or 'hough' (circles)
+    cellClassifier = 'grid'
+    ## Radius of the region sampled at the center of each cell, relative to the cell size
+    cellSampleRatio = 0.25
+    ## Minimum difference of lightness (Lab, 0 to 100) between the white and black clusters of the preset pieces
+    minColourSeparation = 15
+    ## Board state voting: frames kept, minimum/maximum frames read and minimum agreement of each cell
+    votingFrames = 5
+    votingMinFrames = 3
+    votingMaxFrames = 15
+    votingMinConfidence = 0.8
+    ## Motion gate: size of the sampled board, minimum mean difference of a cell for a change and frames to stop
+    motionSampleSize = 32
+    motionThreshold = 6.0
+    motionStillFrames = 5
+    ## Threads used by findSquares to sweep the threshold levels (1 = serial)
+    squaresWorkers = 1
+    ## Squares with a larger intersection over union are merged as the same candidate
+    squaresMinIoU = 0.8
+    ## Test the candidates ranked by votes after each threshold level (False tests each square as found)
+    rankSquares = True
+    ## Number of pyrDown levels used to find the board candidates (0 = full resolution)
+    pyramidLevels = 0
+    ## Margin (in pixels of the reduced image) of the window used to refine the board
+    pyramidRefineMargin = 4
+    ## Board tracker: size of the corner patches, search radius and minimum match score
+    trackerPatchSize = 32
+    trackerSearchRadius = 24
+    trackerMinConfidence = 0.7
+    ## Size (in pixels) of the square image of the board produced by the rectification
+    boardImageSize = 300
+    ## Directory of the stored calibration of the board
+    calibrationPath = "calibration"
     serialPortName = "/dev/ttyS0"
+    ## Source of the frames: camera index, directory of images or video file
+    frameSource = 0
+    ## Replay rate of directories and video files (None = full speed)
+    frameSourceFps = 30
+    ## Directory of the recorded sessions (None = no recording) and recording of the frames between analyses
+    ## (every live frame: about 8 MB/s at 30 fps, only for debugging)
+    sessionPath = "sessions"
+    recordLiveFrames = False
+    ## Display of the images: 'off' (headless), 'throttled' (downscaled preview), 'stream' (MJPEG preview
+    ## server on localhost) or 'debug' (every window)
+    displayMode = 'throttled'
+    ## Maximum refresh rate and scale of the images of the throttled preview and of the stream
+    displayFps = 10
+    displayScale = 0.5
+    ## Port and JPEG quality of the preview server
+    previewPort = 8080
+    previewQuality = 70
     templateBlack = [['B','-','B'],
                      ['-','B','-'],
                      ['B','-','B']]
@@ -56,6 +136,19 @@ class ProgConst:
                      ['-','W','-'],
                      ['W','-','W']]
 
+"""
+--> Pool of the frames and intermediate images (blur, gray, overlays), shared by the capture
+--> and the processing so the steady-state loop doesn't allocate images
+"""
+
+framePool = FramePool()
+
+"""
+--> Display of the images, windows are created once and kept open
+"""
+
+display = Display(ProgConst.displayMode, ProgConst.displayFps, ProgConst.displayScale, framePool)
+
 """
 -->  Find if image has circles and return their positions
 -->  Parameters:
@@ -66,8 +159,8 @@ class ProgConst:
 """
 
 def findCircles(img):
-    blurImg = cv2.GaussianBlur(img, (7, 7), 0)
-    grayImg = cv2.cvtColor(blurImg,cv2.COLOR_RGB2GRAY)
+    blurImg = cv2.GaussianBlur(img, (7, 7), 0, dst=framePool.like('circlesBlur', img))
+    grayImg = cv2.cvtColor(blurImg,cv2.COLOR_RGB2GRAY, dst=framePool.like('circlesGray', img, 1))
     #cv2.imshow('Imagem convertida',grayImg)
 
     ##Max radius of the circle is half the size of each square
@@ -77,95 +170,451 @@ def findCircles(img):
     circles = cv2.HoughCircles(grayImg,cv2.HOUGH_GRADIENT, 1, maxRadius,
                                 param1=maxRadius//2, param2=maxRadius,
                                minRadius=maxRadius//2, maxRadius=maxRadius)
-    cimg = img.copy()
     if(circles is not None):
         circles = np.uint16(np.around(circles))
+    if(circles is not None and display.wants('Detected circles', debug=True)):
+        cimg = framePool.copy('circlesOverlay', img)
         for i in circles[0,:]:
             # draw the outer circle
             cv2.circle(cimg,(i[0],i[1]),i[2],(0,255,0),2)
             # draw the center of the circle
             cv2.circle(cimg,(i[0],i[1]),2,(0,0,255),3)
-        showImage('Detected circles', cimg)
+        showImage('Detected circles', cimg, debug=True)
 
     return circles
 
 """
--->  Get average gray intensity in a circle area around a specific pixel
+-->  Circular mask of a given radius (cached, created once for each radius)
+-->  Parameters:
+-->          - radius: radius of the circle
+-->  Return:
+-->          - uint8 (2*radius+1) x (2*radius+1) mask, 1 inside the circle
+"""
+
+@lru_cache(maxsize=32)
+def diskMask(radius):
+    dy, dx = np.mgrid[-radius:radius+1, -radius:radius+1]
+    return (dx*dx + dy*dy <= radius*radius).astype(np.uint8)
+
+"""
+-->  Offsets of the pixels inside a circle (cached, created once for each radius)
+-->  Parameters:
+-->          - radius: radius of the circle
+-->  Return:
+-->          - arrays of row and column offsets relative to the center of the circle
+"""
+
+@lru_cache(maxsize=32)
+def diskOffsets(radius):
+    dy, dx = np.nonzero(diskMask(radius))
+    return dy - radius, dx - radius
+
+"""
+-->  Offsets of the pixels sampled on the perimeter of a circle (cached for each radius)
+-->  One pixel of each row of the right half of the circle
+-->  Parameters:
+-->          - radius: radius of the circle
+-->  Return:
+-->          - arrays of row and column offsets relative to the center of the circle
+"""
+
+@lru_cache(maxsize=32)
+def ringOffsets(radius):
+    dy = np.arange(-radius, radius+1)
+    dx = np.sqrt(radius*radius - dy*dy).astype(np.intp)
+    return dy, dx
+
+"""
+-->  Get average gray intensity on the perimeter of a circle around a specific pixel
+-->  Near the right border of the image the pixel of the left half of the circle is used
 -->  Parameters:
 -->          - img: image to process
 -->          - height: height of the pixel
 -->          - width: width of the pixel
--->          - radius: radius of the circle area
+-->          - radius: radius of the circle
 -->  Return:
--->          - int value containing average gray intensity
+-->          - int value containing average gray intensity (only pixels inside the image)
 """
 
 def avgGrayIntensity(img, height, width, radius=20):
-    pixelCount = 0
-    sumIntensity = 0
+    height, width = int(height), int(width)
+    imgX,imgY = img.shape[0:2]
+    dy, dx = ringOffsets(radius)
+    rows = height + dy
+    right = width + dx < imgY
+    cols = np.where(right, width + dx, width - dx)
+    valid = (rows > 0) & (rows < imgX) & (right | (width - dx > 0))
+    return int(img[rows[valid], cols[valid]].sum(dtype=np.int64) // np.count_nonzero(valid))
+
+"""
+-->  Offsets of the pixels of ringOffsets in a flattened image (cached for each radius and width)
+-->  Parameters:
+-->          - radius: radius of the circle
+-->          - imgWidth: width of the image
+-->  Return:
+-->          - array of offsets relative to the flat index of the center of the circle
+"""
+
+@lru_cache(maxsize=32)
+def ringFlatOffsets(radius, imgWidth):
+    dy, dx = ringOffsets(radius)
+    return (dy*imgWidth + dx).astype(np.intp)
+
+"""
+-->  Get average gray intensity on the perimeter of a circle around many pixels at once
+-->  Circles completely inside the image are computed in a single NumPy gather, circles
+-->  crossing the border of the image use avgGrayIntensity to ignore pixels outside the image
+-->  Parameters:
+-->          - img: gray image to process
+-->          - centers: array of (width, height) positions, as the circles of HoughCircles
+-->          - radius: radius of the circle area
+-->  Return:
+-->          - int array with the average gray intensity of each position
+"""
+
+def avgGrayIntensities(img, centers, radius=20):
+    centers = np.asarray(centers, dtype=np.intp).reshape(-1, 2)
     imgX,imgY = img.shape[0:2]
-    for x in range(-radius,radius+1):
-        if(height + x > 0 and height+x < imgX):
-            y = int(math.sqrt(radius*radius - x*x))
-            if (width+y < imgY):
-                sumIntensity = sumIntensity + img[height+x][width+y]
-                pixelCount = pixelCount + 1
-            elif (width - y > 0):
-                sumIntensity = sumIntensity + img[height+x][width-y]
-                pixelCount = pixelCount + 1
-    return (sumIntensity // pixelCount)
+    inside = ((centers[:,1] > radius) & (centers[:,1] < imgX-radius) &
+              (centers[:,0] >= 0) & (centers[:,0] < imgY-radius))
+    intensities = np.empty(len(centers), dtype=np.int64)
+    offsets = ringFlatOffsets(radius, imgY)
+    flatCenters = centers[inside,1]*imgY + centers[inside,0]
+    values = np.ascontiguousarray(img).ravel().take(flatCenters[:,None] + offsets)
+    intensities[inside] = values.sum(axis=1, dtype=np.int64) // len(offsets)
+    for k in np.nonzero(~inside)[0]:
+        intensities[k] = avgGrayIntensity(img, centers[k,1], centers[k,0], radius)
+    return intensities
         
+"""
+-->  Permutation of the cells of the board for the rotation of the camera mounting
+-->  Parameters:
+-->          - numSquares: number of cells of each row
+-->          - quarterTurns: number of rotations of 90 degrees (as np.rot90)
+-->  Return:
+-->          - array of flat indexes: rotated.flat[k] = board.flat[indexes[k]]
+"""
+
+@lru_cache(maxsize=8)
+def rotationIndices(numSquares, quarterTurns):
+    return np.rot90(np.arange(numSquares*numSquares).reshape(numSquares, numSquares), quarterTurns).ravel()
+
 """
 -->  Test circles' positions and return their relative position on
 -->  the board
+-->  Each circle is mapped to its cell with an integer division and circles on the lines
+-->  between cells (or outside the board) are ignored
 -->  Parameters:
 -->          - img: image to process
 -->          - posCircles: list of circles' positions
+-->          - printIntensity: print the intensity of each piece
+-->          - colourModel: CellClassifier used to label the pieces (None uses ProgConst.whiteThreshold)
 -->  Return:
 -->          - List of relative positions:
 -->              - 'B' for black pieces
 -->              - 'W' for white pieces
 -->              - '-' for empty spaces
--->          - None if any invalid circle position
+-->          - None if any invalid circle position (more than one circle in a cell)
 """
 
-def getRelativePos(img, posCircles, printIntensity = True):
+def getRelativePos(img, posCircles, printIntensity = True, colourModel = None):
     if posCircles is None:
         return None
-    grayImg = cv2.cvtColor(img,cv2.COLOR_BGR2GRAY)
+    grayImg = cv2.cvtColor(img,cv2.COLOR_BGR2GRAY, dst=framePool.like('relativePosGray', img, 1))
     #cv2.imshow('gray',grayImg)
     height, width, channel = img.shape
     spaceSize = height // ProgConst.numSquares
+    numSquares = ProgConst.numSquares
 
-    #Create matrix 3,3, 1 character unicode (True)
-    relativePos = np.chararray((ProgConst.numSquares,ProgConst.numSquares),1,True)
-    relativePos[:] = '-'
+    centers = posCircles[0,:,0:2].astype(np.intp)
+    rows = centers[:,1] // spaceSize
+    cols = centers[:,0] // spaceSize
+    valid = ((centers[:,1] % spaceSize != 0) & (centers[:,0] % spaceSize != 0) &
+             (rows < numSquares) & (cols < numSquares))
+    cells = rows[valid]*numSquares + cols[valid]
 
-    for pos in posCircles[0,:]:
-        height = pos[1]
-        width = pos[0]
-        try:
-            for i in range(ProgConst.numSquares):
-                for j in range(ProgConst.numSquares):
-                    if i*spaceSize < height < (i+1)*spaceSize and j*spaceSize < width < (j+1)*spaceSize:
-                        if relativePos[i][j] == '-':
-                            if avgGrayIntensity(grayImg, height, width, 20) >= 127:
-                                relativePos[i][j] = 'W'
-                                if printIntensity:
-                                    print ("Intesity of [",i,",",j,"] = ",avgGrayIntensity(grayImg, height, width, 10), " >= 127 --> White piece")
-                            else:
-                                relativePos[i][j] = 'B'
-                                if printIntensity:
-                                    print ("Intesity of [",i,",",j,"] = ",avgGrayIntensity(grayImg, height, width, 10), " < 127 --> Black piece")
-                        elif relativePos[i][j] == 'W' or relativePos[i][j] == 'B':
-                            return None
-                        raise BigBreak
-        except:
-            pass
-    relativePos = np.rot90(relativePos)
-    relativePos = np.rot90(relativePos)
+    ## --- More than one circle in the same cell
+    if cells.size > 0 and np.bincount(cells).max() > 1:
+        return None
+
+    intensities = avgGrayIntensities(grayImg, centers[valid], 20)
+    if colourModel is None:
+        isWhite = intensities >= ProgConst.whiteThreshold
+    else:
+        isWhite = colourModel.classifyPieces(avgColours(img, centers[valid], 20)) == 'W'
+    cellLabels = np.full(numSquares*numSquares, '-')
+    cellLabels[cells] = np.where(isWhite, 'W', 'B')
+    if printIntensity:
+        for cell, intensity, white in zip(cells, intensities, isWhite):
+            if white:
+                print ("Intesity of [",cell//numSquares,",",cell%numSquares,"] = ",intensity, "--> White piece")
+            else:
+                print ("Intesity of [",cell//numSquares,",",cell%numSquares,"] = ",intensity, "--> Black piece")
+
+    #Create matrix 3,3, 1 character unicode (True)
+    relativePos = np.chararray((numSquares,numSquares),1,True)
+    relativePos[:] = cellLabels[rotationIndices(numSquares, ProgConst.boardRotation)].reshape(numSquares, numSquares)
     return relativePos
 
+"""
+-->  Flat indexes of the pixels of a disk at the center of each cell of the board image
+-->  Parameters:
+-->          - boardSize: size of the square board image
+-->          - numSquares: number of cells of each row
+-->          - sampleRatio: radius of the disk relative to the cell size
+-->  Return:
+-->          - array with shape (numSquares*numSquares, pixels of the disk)
+"""
+
+@lru_cache(maxsize=8)
+def cellSampleIndices(boardSize, numSquares, sampleRatio):
+    spaceSize = boardSize / numSquares
+    dy, dx = diskOffsets(max(1, int(spaceSize * sampleRatio)))
+    centers = (np.arange(numSquares) * spaceSize + spaceSize/2).astype(np.int64)
+    centerRows, centerCols = np.meshgrid(centers, centers, indexing='ij')
+    rows = np.clip(centerRows.reshape(-1, 1) + dy, 0, boardSize-1)
+    cols = np.clip(centerCols.reshape(-1, 1) + dx, 0, boardSize-1)
+    return (rows*boardSize + cols).astype(np.intp)
+
+"""
+-->  Convert BGR colours to Lab colours
+-->  Parameters:
+-->          - colours: array of BGR colours (number of colours x 3), values from 0 to 255
+-->  Return:
+-->          - float32 array of Lab colours (L from 0 to 100)
+"""
+
+def bgrToLab(colours):
+    colours = np.float32(colours).reshape(-1, 1, 3) / 255
+    return cv2.cvtColor(colours, cv2.COLOR_BGR2LAB).reshape(-1, 3)
+
+"""
+-->  Average colour at the center of each cell of the board
+-->  The pixels of all the cells are gathered at once and only the averages are converted to Lab
+-->  Parameters:
+-->          - boardImg: rectified image of the board (BGR)
+-->  Return:
+-->          - numSquares x numSquares x 3 array of Lab colours, in the same orientation of getRelativePos
+"""
+
+def cellColours(boardImg):
+    indices = cellSampleIndices(boardImg.shape[0], ProgConst.numSquares, ProgConst.cellSampleRatio)
+    samples = np.ascontiguousarray(boardImg).reshape(-1, 3).take(indices, axis=0)
+    means = bgrToLab(cv2.reduce(samples, 1, cv2.REDUCE_AVG, dtype=cv2.CV_32F))
+    rotation = rotationIndices(ProgConst.numSquares, ProgConst.boardRotation)
+    return means[rotation].reshape(ProgConst.numSquares, ProgConst.numSquares, 3)
+
+"""
+-->  Get average Lab colour in a circle area around many pixels at once
+-->  Parameters:
+-->          - img: BGR image
+-->          - centers: array of (width, height) positions, as the circles of HoughCircles
+-->          - radius: radius of the circle area
+-->  Return:
+-->          - float32 array of Lab colours (number of centers x 3), only pixels inside the image are used
+"""
+
+def avgColours(img, centers, radius=20):
+    centers = np.asarray(centers, dtype=np.intp).reshape(-1, 2)
+    dy, dx = diskOffsets(radius)
+    rows = centers[:,1,None] + dy
+    cols = centers[:,0,None] + dx
+    inside = (rows >= 0) & (rows < img.shape[0]) & (cols >= 0) & (cols < img.shape[1])
+    values = img[np.clip(rows, 0, img.shape[0]-1), np.clip(cols, 0, img.shape[1]-1)]
+    sums = (values * inside[:,:,None]).sum(axis=1)
+    return bgrToLab(sums / np.maximum(inside.sum(axis=1), 1)[:,None])
+
+"""
+-->  Fit the colours of the white and black pieces with 2-cluster k-means (Lab space)
+-->  Parameters:
+-->          - colours: Lab colours of the pieces (number of pieces x 3)
+-->          - labels: labels of the pieces detected with the gray threshold ('W' or 'B')
+-->  Return:
+-->          - Lab colour of the white pieces and Lab colour of the black pieces
+"""
+
+def fitPieceColours(colours, labels):
+    colours = np.float32(colours)
+    if len(colours) >= 2:
+        criteria = (cv2.TERM_CRITERIA_EPS + cv2.TERM_CRITERIA_MAX_ITER, 20, 0.5)
+        _compactness, _clusters, centers = cv2.kmeans(colours, 2, None, criteria, 3, cv2.KMEANS_PP_CENTERS)
+        black, white = sorted(centers, key=lambda center: center[0])
+        if white[0] - black[0] >= ProgConst.minColourSeparation:
+            return white, black
+    ## --- Pieces of a single colour: clusters are not reliable, use the gray threshold labels
+    centroids = []
+    for label, default in (('W', (100, 0, 0)), ('B', (0, 0, 0))):
+        samples = colours[labels == label]
+        centroids.append(samples.mean(axis=0) if len(samples) > 0 else np.float32(default))
+    return centroids[0], centroids[1]
+
+"""
+-->  Class of the colour model of the board, used to classify the cells without Hough transform
+-->  The Lab colours of empty cells, white pieces and black pieces are learned from the preset
+-->  pattern at configuration time and each cell is labeled with the nearest of them
+"""
+
+class CellClassifier:
+    labels = np.array(['-', 'W', 'B'])
+
+    def __init__(self, emptyColour, whiteColour, blackColour):
+        self.centroids = np.array([emptyColour, whiteColour, blackColour], dtype=np.float64)
+
+    """
+    -->  Learn the colours from an image of the board with the preset pattern
+    -->  Parameters:
+    -->          - boardImg: rectified image of the board
+    -->          - board: board of the preset pattern detected in boardImg
+    -->  Return:
+    -->          - CellClassifier
+    -->          - None if board doesn't match the preset pattern
+    """
+
+    @staticmethod
+    def fit(boardImg, board):
+        if not comparePresetBoard(board):
+            return None
+        colours = cellColours(boardImg)
+        board = np.array(board)
+        pieces = board != '-'
+        whiteColour, blackColour = fitPieceColours(colours[pieces], board[pieces])
+        return CellClassifier(colours[~pieces].mean(axis=0), whiteColour, blackColour)
+
+    """
+    -->  Label of the nearest centroid of each colour
+    -->  Parameters:
+    -->          - colours: array of Lab colours (..., 3)
+    -->          - centroids: indexes of the centroids to be used
+    -->  Return:
+    -->          - array of labels ('-', 'W' or 'B')
+    """
+
+    def nearestLabels(self, colours, centroids = (0, 1, 2)):
+        centroids = np.array(centroids)
+        distances = ((colours[...,None,:] - self.centroids[centroids])**2).sum(axis=-1)
+        return self.labels[centroids[np.argmin(distances, axis=-1)]]
+
+    """
+    -->  Classify all the cells of the board
+    -->  Parameters:
+    -->          - boardImg: rectified image of the board
+    -->  Return:
+    -->          - Matrix of relative positions ('B', 'W' or '-'), same format of getRelativePos
+    """
+
+    def classify(self, boardImg):
+        colours = cellColours(boardImg)
+        relativePos = np.chararray(colours.shape[0:2], 1, True)
+        relativePos[:] = self.nearestLabels(colours)
+        return relativePos
+
+    """
+    -->  Classify the colours of pieces already detected (only white or black)
+    -->  Parameters:
+    -->          - colours: array of Lab colours (number of pieces x 3)
+    -->  Return:
+    -->          - array of labels ('W' or 'B')
+    """
+
+    def classifyPieces(self, colours):
+        return self.nearestLabels(colours, (1, 2))
+
+    def toDict(self):
+        return {"space": "Lab", "centroids": self.centroids.tolist()}
+
+    @staticmethod
+    def fromDict(values):
+        return CellClassifier(*values["centroids"])
+
+"""
+-->  Detect the pieces of the board with the configured cell classifier
+-->  Parameters:
+-->          - boardImg: rectified image of the board
+-->          - classifier: CellClassifier of the board (None uses Hough circles and gray threshold)
+-->  Return:
+-->          - Matrix of relative positions ('B', 'W' or '-')
+-->          - None if any invalid circle position (Hough circles only)
+"""
+
+def readBoard(boardImg, classifier):
+    if classifier is not None and ProgConst.cellClassifier == 'grid':
+        return classifier.classify(boardImg)
+    posCircles = findCircles(boardImg)
+    return getRelativePos(boardImg, posCircles, False, classifier)
+
+"""
+-->  Class to estimate the board state from the last frames
+-->  The boards of the last frames are kept in a ring buffer and each cell receives the label
+-->  of the majority. New frames are only read while any cell has low agreement
+"""
+
+class BoardStateEstimator:
+    labels = np.array(['-', 'W', 'B'])
+
+    def __init__(self, numFrames = None, minFrames = None, maxFrames = None, minConfidence = None):
+        self.minFrames = ProgConst.votingMinFrames if minFrames is None else minFrames
+        self.maxFrames = ProgConst.votingMaxFrames if maxFrames is None else maxFrames
+        self.minConfidence = ProgConst.votingMinConfidence if minConfidence is None else minConfidence
+        self.history = deque(maxlen = ProgConst.votingFrames if numFrames is None else numFrames)
+        self.rejectedFrames = 0
+
+    """
+    -->  Remove all the stored boards
+    """
+
+    def clear(self):
+        self.history.clear()
+        self.rejectedFrames = 0
+
+    """
+    -->  Add the board of a new frame (invalid boards are counted and ignored)
+    -->  Parameters:
+    -->          - board: matrix of relative positions or None
+    -->  Return:
+    -->          - None
+    """
+
+    def addBoard(self, board):
+        if board is None:
+            self.rejectedFrames += 1
+        else:
+            self.history.append(np.array(board))
+
+    """
+    -->  Majority vote of the stored boards
+    -->  Return:
+    -->          - Matrix of relative positions and matrix of agreement of each cell (0 to 1)
+    -->          - None, None if there is no stored board
+    """
+
+    def estimate(self):
+        if len(self.history) == 0:
+            return None, None
+        boards = np.array(self.history)
+        counts = (boards[None] == self.labels[:,None,None,None]).sum(axis=1)
+        relativePos = np.chararray(boards.shape[1:], 1, True)
+        relativePos[:] = self.labels[np.argmax(counts, axis=0)]
+        return relativePos, counts.max(axis=0) / len(boards)
+
+    """
+    -->  Read frames until all the cells agree or the maximum number of frames is reached
+    -->  Parameters:
+    -->          - analyzeFrame: function without parameters that reads a frame and returns its board
+    -->  Return:
+    -->          - Matrix of relative positions and matrix of agreement of each cell
+    -->          - None, None if no valid board was found
+    """
+
+    def estimateBoard(self, analyzeFrame):
+        self.clear()
+        for frame in range(self.maxFrames):
+            self.addBoard(analyzeFrame())
+            if len(self.history) >= self.minFrames:
+                board, confidence = self.estimate()
+                if confidence.min() >= self.minConfidence:
+                    return board, confidence
+        return self.estimate()
+
 """
 -->  Test if board is full of pieces
 -->  Parameters:
@@ -176,9 +625,7 @@ def getRelativePos(img, posCircles, printIntensity = True):
 """
 
 def isFull(board):
-    return ((board[0][0] != '-' and board[0][1] != '-' and board[0][2] != '-') and
-            (board[1][0] != '-' and board[1][1] != '-' and board[1][2] != '-') and
-            (board[2][0] != '-' and board[2][1] != '-' and board[2][2] != '-'))
+    return BitBoard.fromCharArray(board, ProgConst.winLength).isFull()
 
 """
 -->  Test if desired player won the game
@@ -191,17 +638,49 @@ def isFull(board):
 """
 
 def isWinner(board, letter):
-    return ((board[0][0] == letter and board[0][1] == letter and board[0][2] == letter) or #top row
-            (board[1][0] == letter and board[1][1] == letter and board[1][2] == letter) or #middle row
-            (board[2][0] == letter and board[2][1] == letter and board[2][2] == letter) or #bottom row
-            (board[0][0] == letter and board[1][0] == letter and board[2][0] == letter) or #left column
-            (board[0][1] == letter and board[1][1] == letter and board[2][1] == letter) or #middle column
-            (board[0][2] == letter and board[1][2] == letter and board[2][2] == letter) or #right column
-            (board[0][0] == letter and board[1][1] == letter and board[2][2] == letter) or #diagonal 1
-            (board[2][0] == letter and board[1][1] == letter and board[0][2] == letter))   #diagonal 2
+    return BitBoard.fromCharArray(board, ProgConst.winLength).isWinner(letter)
+
+"""
+-->  Search engines of the moves, one for each size of the board (the history of the moves and
+-->  the transposition table are kept between the turns)
+"""
+
+searchEngines = {}
+
+"""
+-->  Get (and create on first use) the search engine of a board
+-->  Parameters:
+-->          - numSquares: number of cells of each row
+-->          - winLength: number of pieces in a row to win
+-->  Return:
+-->          - SearchEngine shared by every call with the same board
+"""
+
+def getSearchEngine(numSquares, winLength):
+    if (numSquares, winLength) not in searchEngines:
+        table = TranspositionTable(numSquares, winLength, ProgConst.transpositionSize, ProgConst.transpositionPath)
+        searchEngines[numSquares, winLength] = SearchEngine(numSquares, winLength, table=table)
+    return searchEngines[numSquares, winLength]
+
+"""
+-->  Monte Carlo tree search engines, one for each size of the board (the worker processes are
+-->  started with the engine, at the start of main, and kept between the turns)
+"""
+
+mctsEngines = {}
+
+def getMctsEngine(numSquares, winLength):
+    if (numSquares, winLength) not in mctsEngines:
+        mctsEngines[numSquares, winLength] = MctsEngine(numSquares, winLength, ProgConst.mctsWorkers,
+                                                        ProgConst.mctsPlayoutsPerLeaf, ProgConst.mctsBatchSize,
+                                                        ProgConst.mctsExploration, ProgConst.mctsSeed)
+    return mctsEngines[numSquares, winLength]
 
 """
 -->  Discover next computer move following this rules:
+-->          0. Optimal move of the perfect play table (3x3 boards, if the position is reachable)
+-->             or best move of the alpha-beta search (or most visited move of the Monte Carlo
+-->             tree search) within ProgConst.searchTimeBudget
 -->          1. Try any winning move
 -->          2. Block any opponent winning move
 -->          3. Try any corner
@@ -214,54 +693,56 @@ def isWinner(board, letter):
 """
          
 def getComputerMove(board):
+    bitBoard = BitBoard.fromCharArray(board, ProgConst.winLength)
+
+    #Look up the optimal moves of the position, chosen randomly among equivalent moves
+    if ProgConst.useMoveTable and bitBoard.numSquares == 3 and bitBoard.k == 3:
+        value, moves = lookupMoves(bitBoard.pieces(ProgConst.computerLetter), bitBoard.pieces(ProgConst.playerLetter))
+        if moves:
+            i,j = bitBoard.position(randomBit(moves))
+            print('Move: Perfect play move ('+('win', 'draw', 'loss')[1-value]+') - ('+str(i)+","+str(j)+")")
+            return i,j
+
+    #Search the best move, returned at the deadline even if the search isn't complete
+    if ProgConst.moveEngine == 'alphabeta':
+        engine = getSearchEngine(bitBoard.numSquares, bitBoard.k)
+        cell, score, depth = engine.search(bitBoard.pieces(ProgConst.computerLetter), bitBoard.pieces(ProgConst.playerLetter),
+                                           ProgConst.searchTimeBudget)
+        if cell is not None:
+            i,j = bitBoard.position(cell)
+            print('Move: Search move (depth '+str(depth)+', score '+str(score)+', '+str(engine.nodes)+' nodes) - ('+str(i)+","+str(j)+")")
+            return i,j
+    elif ProgConst.moveEngine == 'mcts':
+        engine = getMctsEngine(bitBoard.numSquares, bitBoard.k)
+        cell, winRate, playouts = engine.search(bitBoard.pieces(ProgConst.computerLetter), bitBoard.pieces(ProgConst.playerLetter),
+                                                ProgConst.searchTimeBudget)
+        if cell is not None:
+            i,j = bitBoard.position(cell)
+            print('Move: Monte Carlo move (win rate '+str(round(winRate, 3))+', '+str(playouts)+' playouts) - ('+str(i)+","+str(j)+")")
+            return i,j
 
     #Check if there is any move that wins the game
-    for i in range(ProgConst.numSquares):
-        for j in range(ProgConst.numSquares):
-            copy = board.copy()
-            if copy[i][j] == '-':
-                copy[i][j] = ProgConst.computerLetter
-                if isWinner(copy, ProgConst.computerLetter):
-                    print('Move: Winning move - ('+str(i)+","+str(j)+")")
-                    return i,j
-                
-    # Check if the player could win on his next move, and block them.
-    for i in range(ProgConst.numSquares):
-        for j in range(ProgConst.numSquares):
-            copy = board.copy()
-            if copy[i][j] == '-':
-                copy[i][j] = ProgConst.playerLetter
-                if isWinner(copy, ProgConst.playerLetter):
-                    print('Move: Blocking move - ('+str(i)+","+str(j)+")")
-                    return i,j
-
-    # Try to take one of the corners, if they are free.
-    moves = [[0,0],[0,2],[2,0],[2,2]]
-    possibleMoves = []
-    for move in moves:
-        if board[move[0]][move[1]] == '-':
-            possibleMoves.append(move)
-    if possibleMoves != []:
-        move = random.choice(possibleMoves)
-        print('Move: Corner move - ('+str(move[0])+","+str(move[1])+")")
-        return move
-        
+    moves = bitBoard.winningMoves(ProgConst.computerLetter)
+    if moves:
+        i,j = bitBoard.position(next(iterBits(moves)))
+        print('Move: Winning move - ('+str(i)+","+str(j)+")")
+        return i,j
 
-    # Try to take the center, if it is free.
-    if board[1,1] == '':
-        print('Move: Center move - (1,1)')
-        return 1,1
+    # Check if the player could win on his next move, and block them.
+    moves = bitBoard.winningMoves(ProgConst.playerLetter)
+    if moves:
+        i,j = bitBoard.position(next(iterBits(moves)))
+        print('Move: Blocking move - ('+str(i)+","+str(j)+")")
+        return i,j
 
-    # Move on one of the sides.
-    moves = [[0,1],[1,0],[1,2],[2,1]]
-    possibleMoves = []
-    for move in moves:
-        if board[move[0]][move[1]] == '-':
-            possibleMoves.append(move)
-    if possibleMoves != []:
-        move = random.choice(possibleMoves)
-        print('Move: Side move - ('+str(move[0])+","+str(move[1])+")")
-        return move
+    # Try to take one of the corners, then the center and then one of the sides, if they are free.
+    empty = bitBoard.empty()
+    for name, region in zip(('Corner', 'Center', 'Side'), regionMasks(bitBoard.numSquares)):
+        moves = empty & region
+        if moves:
+            i,j = bitBoard.position(randomBit(moves))
+            print('Move: '+name+' move - ('+str(i)+","+str(j)+")")
+            return i,j
 
 """
 -->  Computes cosine value from three points
@@ -278,49 +759,459 @@ def angleCos(p0, p1, p2):
     return abs( np.dot(d1, d2) / np.sqrt( np.dot(d1, d1)*np.dot(d2, d2) ) )
 
 """
--->  Find squares in a given image and filter them with preset parameters
+-->  Thread pools used by findSquares, one for each number of workers
+"""
+
+squaresPools = {}
+
+"""
+-->  Get (and create on first use) the thread pool with the desired number of workers
+-->  Parameters:
+-->          - numWorkers: number of threads of the pool
+-->  Return:
+-->          - ThreadPoolExecutor shared by every call with the same numWorkers
+"""
+
+def getSquaresPool(numWorkers):
+    if numWorkers not in squaresPools:
+        squaresPools[numWorkers] = ThreadPoolExecutor(max_workers=numWorkers)
+    return squaresPools[numWorkers]
+
+"""
+-->  Find squares in a single binarization level of a gray image
+-->  Parameters:
+-->          - gray: blurred gray image
+-->          - thrs: threshold level (0 uses Canny instead of threshold)
+-->          - maxCountourArea: minimum area of the squares
+-->          - maxAspectRatioDiff: maximum difference between the sides of the squares
+-->          - levels: number of pyrDown levels of the image (0 = full resolution)
+-->  Return:
+-->          - list of squares (empty if didn't find any square)
+"""
+
+def findSquaresInLevel(gray, thrs, maxCountourArea = 4000, maxAspectRatioDiff = 0.1, levels = 0):
+    squares = []
+    if thrs == 0:
+        if levels == 0:
+            bin = cv2.Canny(gray, 0, 50, apertureSize=5)
+        else:
+            ## --- The 5x5 aperture and the low thresholds follow the texture of the background
+            ## --- on reduced images, where the border of the board is only a few pixels wide
+            bin = cv2.Canny(gray, 50, 100, apertureSize=3)
+        bin = cv2.dilate(bin, None)
+    else:
+        _retval, bin = cv2.threshold(gray, thrs, 255, cv2.THRESH_BINARY)
+    bin, contours, hierarchy = cv2.findContours(bin, cv2.RETR_TREE, cv2.CHAIN_APPROX_SIMPLE)
+    contours = list(contours)
+    ## --- Top-level contours are dropped at full resolution only: on reduced images the border lines
+    ## --- of the board vanish in the blur and the outline of the board is a top-level contour
+    if hierarchy is not None and levels == 0:
+        for i in range(len(hierarchy[0])-1,-1,-1):
+            if hierarchy[0][i][3] == -1:
+                del contours[i]
+    for cnt in contours:
+        cnt_len = cv2.arcLength(cnt, True)
+        cnt = cv2.approxPolyDP(cnt, 0.02*cnt_len, True)
+        x,y,w,h = cv2.boundingRect(cnt)
+        aspectRatio = float (w)/h
+        if (len(cnt) == 4 and cv2.contourArea(cnt) > maxCountourArea and cv2.isContourConvex(cnt) and
+            aspectRatio < (1+maxAspectRatioDiff) and aspectRatio > (1-maxAspectRatioDiff)):
+            cnt = cnt.reshape(-1, 2)
+            max_cos = np.max([angleCos( cnt[i], cnt[(i+1) % 4], cnt[(i+2) % 4] ) for i in range(4)])
+            if max_cos < 0.1:
+                squares.append(cnt)
+    return squares
+
+"""
+-->  Generator of the squares of each threshold level of a given image
+-->  The squares of a level are yielded as soon as the level is processed, so the caller can
+-->  stop the sweep at the first useful square. With a thread pool the levels not started yet
+-->  are cancelled when the caller closes the generator
 -->  Parameters:
 -->          - img: desired RGB image
+-->          - maxCountourArea: minimum area of the squares
+-->          - maxAspectRatioDiff: maximum difference between the sides of the squares
+-->          - numWorkers: number of threads (None uses ProgConst.squaresWorkers)
+-->          - levels: number of pyrDown levels of the image (0 = full resolution)
 -->  Return:
--->          - list of squares (None if fails)
+-->          - iterator of the lists of squares of each level, in the order of the serial sweep
 """
 
-def findSquares(img, maxCountourArea = 4000, maxAspectRatioDiff = 0.1):
+def iterSquareLevels(img, maxCountourArea = 4000, maxAspectRatioDiff = 0.1, numWorkers = None, levels = 0):
+    if numWorkers is None:
+        numWorkers = ProgConst.squaresWorkers
+    ## --- Images of this call only: the levels read gray in the thread pool, possibly after the caller
+    ## --- dropped the generator and started a new sweep, so pooled buffers would be overwritten
     img = cv2.GaussianBlur(img, (5, 5), 0)
-    img = cv2.cvtColor(img,cv2.COLOR_RGB2GRAY)
-    squares = []
-    for gray in cv2.split(img):
+    gray = cv2.cvtColor(img,cv2.COLOR_RGB2GRAY)
+    levelSquares = lambda thrs: findSquaresInLevel(gray, thrs, maxCountourArea, maxAspectRatioDiff, levels)
+    if numWorkers > 1:
+        futures = [getSquaresPool(numWorkers).submit(levelSquares, thrs) for thrs in range(0, 255, 26)]
+        try:
+            ## --- Results are read in the order of the levels, the same of the serial sweep
+            for future in futures:
+                yield future.result()
+        finally:
+            for future in futures:
+                future.cancel()
+    else:
         for thrs in range(0, 255, 26):
-            if thrs == 0:
-                bin = cv2.Canny(gray, 0, 50, apertureSize=5)
-                bin = cv2.dilate(bin, None)
-            else:
-                _retval, bin = cv2.threshold(gray, thrs, 255, cv2.THRESH_BINARY)
-            bin, contours, hierarchy = cv2.findContours(bin, cv2.RETR_TREE, cv2.CHAIN_APPROX_SIMPLE)
-            if hierarchy is not None:
-                for i in range(len(hierarchy[0])-1,-1,-1):
-                    if hierarchy[0][i][3] == -1:
-                        del contours[i]
-            for cnt in contours:
-                cnt_len = cv2.arcLength(cnt, True)
-                cnt = cv2.approxPolyDP(cnt, 0.02*cnt_len, True)
-                x,y,w,h = cv2.boundingRect(cnt)
-                aspectRatio = float (w)/h
-                if (len(cnt) == 4 and cv2.contourArea(cnt) > maxCountourArea and cv2.isContourConvex(cnt) and
-                    aspectRatio < (1+maxAspectRatioDiff) and aspectRatio > (1-maxAspectRatioDiff)):
-                    cnt = cnt.reshape(-1, 2)
-                    max_cos = np.max([angleCos( cnt[i], cnt[(i+1) % 4], cnt[(i+2) % 4] ) for i in range(4)])
-                    if max_cos < 0.1:
-                        squares.append(cnt)
+            yield levelSquares(thrs)
+
+"""
+-->  Generator of the squares of a given image, filtered with preset parameters
+-->  Parameters:
+-->          - img: desired RGB image
+-->          - maxCountourArea: minimum area of the squares
+-->          - maxAspectRatioDiff: maximum difference between the sides of the squares
+-->          - numWorkers: number of threads (None uses ProgConst.squaresWorkers)
+-->          - levels: number of pyrDown levels of the image (0 = full resolution)
+-->  Return:
+-->          - iterator of squares, in the same order of the serial sweep
+"""
+
+def iterSquares(img, maxCountourArea = 4000, maxAspectRatioDiff = 0.1, numWorkers = None, levels = 0):
+    squareLevels = iterSquareLevels(img, maxCountourArea, maxAspectRatioDiff, numWorkers, levels)
+    try:
+        for squares in squareLevels:
+            for square in squares:
+                yield square
+    finally:
+        squareLevels.close()
+
+"""
+-->  Find squares in a given image and filter them with preset parameters
+-->  The threshold levels can be processed in parallel by a thread pool, the squares
+-->  are merged in the same order of the serial execution
+-->  Parameters:
+-->          - img: desired RGB image
+-->          - maxCountourArea: minimum area of the squares
+-->          - maxAspectRatioDiff: maximum difference between the sides of the squares
+-->          - numWorkers: number of threads (None uses ProgConst.squaresWorkers)
+-->  Return:
+-->          - list of squares (None if fails)
+"""
+
+def findSquares(img, maxCountourArea = 4000, maxAspectRatioDiff = 0.1, numWorkers = None):
+    squares = list(iterSquares(img, maxCountourArea, maxAspectRatioDiff, numWorkers))
     if len(squares) == 0:
         return None
     else:
         return squares
 
+"""
+-->  Class of a board candidate, grouping near-identical squares found by different
+-->  threshold levels
+"""
+
+class SquareCandidate:
+    def __init__(self, square):
+        self.votes = 1
+        self.tested = False
+        self.setSquare(square, squarePlausibility(square))
+
+    """
+    -->  Set the representative square and the fields derived from it
+    -->  Parameters:
+    -->          - square: square with 4 corners
+    -->          - plausibility: squarePlausibility of the square
+    -->  Return:
+    -->          - None
+    """
+
+    def setSquare(self, square, plausibility):
+        self.square = square
+        self.plausibility = plausibility
+        self.area = cv2.contourArea(square)
+        self.center = square.mean(axis=0)
+        self.polygon = square.astype(np.float32)
+
+    """
+    -->  Test if a square is the same physical square of the candidate
+    -->  Parameters:
+    -->          - square: square to be tested
+    -->          - minIoU: minimum intersection over union of both squares
+    -->  Return:
+    -->          - True if it is the same square
+    -->          - False if it isn't
+    """
+
+    def matches(self, square, minIoU):
+        ## --- Cheap test with the centroids before computing the intersection
+        if np.sum((square.mean(axis=0) - self.center)**2) > (1-minIoU)*self.area:
+            return False
+        return squareIoU(self.polygon, square.astype(np.float32), self.area) >= minIoU
+
+    """
+    -->  Add a square to the candidate, keeping the most plausible one as representative
+    -->  Parameters:
+    -->          - square: square matched by the candidate
+    -->  Return:
+    -->          - None
+    """
+
+    def addVote(self, square):
+        self.votes += 1
+        plausibility = squarePlausibility(square)
+        if plausibility > self.plausibility:
+            self.setSquare(square, plausibility)
+
+"""
+-->  Computes how close a square is to a perfect square
+-->  Parameters:
+-->          - square: square with 4 corners
+-->  Return:
+-->          - Float value, 1 for a perfect square
+"""
+
+def squarePlausibility(square):
+    x,y,w,h = cv2.boundingRect(square)
+    max_cos = np.max([angleCos( square[i], square[(i+1) % 4], square[(i+2) % 4] ) for i in range(4)])
+    return 1 - max_cos - abs(1 - float(w)/h)
+
+"""
+-->  Computes the intersection over union of two convex squares
+-->  Parameters:
+-->          - polygonA: float32 corners of the first square
+-->          - polygonB: float32 corners of the second square
+-->          - areaA: area of the first square (computed if None)
+-->  Return:
+-->          - Float value between 0 and 1
+"""
+
+def squareIoU(polygonA, polygonB, areaA = None):
+    if areaA is None:
+        areaA = cv2.contourArea(polygonA)
+    intersection, _polygon = cv2.intersectConvexConvex(polygonA, polygonB)
+    union = areaA + cv2.contourArea(polygonB) - intersection
+    if union <= 0:
+        return 0.0
+    return intersection / union
+
+"""
+-->  Add a square to a list of candidates, voting for the candidate of the same square if exists
+-->  Parameters:
+-->          - candidates: list of SquareCandidate
+-->          - square: square to be added
+-->          - minIoU: minimum intersection over union to merge two squares
+-->  Return:
+-->          - True if the square created a new candidate
+-->          - False if it was merged in an existing candidate
+"""
+
+def addSquareCandidate(candidates, square, minIoU):
+    for candidate in candidates:
+        if candidate.matches(square, minIoU):
+            candidate.addVote(square)
+            return False
+    candidates.append(SquareCandidate(square))
+    return True
+
+"""
+-->  Merge near-identical squares in a single candidate with the number of votes
+-->  Parameters:
+-->          - squares: list of squares
+-->          - minIoU: minimum intersection over union to merge two squares
+-->  Return:
+-->          - list of SquareCandidate ranked by votes and plausibility
+"""
+
+def groupSquares(squares, minIoU = None):
+    if minIoU is None:
+        minIoU = ProgConst.squaresMinIoU
+    candidates = []
+    for square in squares:
+        addSquareCandidate(candidates, square, minIoU)
+    rankCandidates(candidates)
+    return candidates
+
+"""
+-->  Sort a list of candidates by votes and plausibility (best first)
+-->  Parameters:
+-->          - candidates: list of SquareCandidate
+-->  Return:
+-->          - None
+"""
+
+def rankCandidates(candidates):
+    candidates.sort(key=lambda candidate: (candidate.votes, candidate.plausibility), reverse=True)
+
+"""
+-->  Generator of the candidates ranked while the threshold sweep is running
+-->  After each level the squares are grouped with the squares of the previous levels and the
+-->  candidates not yet tested are yielded by votes and plausibility, so the caller can stop the
+-->  sweep at the first match. A candidate is yielded only once, a more plausible square found by
+-->  a later level is the same physical square
+-->  Parameters:
+-->          - squareLevels: iterator of the lists of squares of each level (iterSquareLevels)
+-->          - minIoU: minimum intersection over union to merge two squares
+-->  Return:
+-->          - iterator of SquareCandidate
+"""
+
+def iterRankedCandidates(squareLevels, minIoU = None):
+    if minIoU is None:
+        minIoU = ProgConst.squaresMinIoU
+    candidates = []
+    try:
+        for squares in squareLevels:
+            for square in squares:
+                addSquareCandidate(candidates, square, minIoU)
+            rankCandidates(candidates)
+            for candidate in candidates:
+                if not candidate.tested:
+                    candidate.tested = True
+                    yield candidate
+    finally:
+        squareLevels.close()
+
+"""
+-->  Generator of the squares that don't match any previous square
+-->  The same square is found by many threshold levels, it is yielded only once
+-->  Parameters:
+-->          - squares: iterator of squares
+-->  Return:
+-->          - iterator of squares
+"""
+
+def uniqueSquares(squares):
+    candidates = []
+    for square in squares:
+        if addSquareCandidate(candidates, square, ProgConst.squaresMinIoU):
+            yield square
+
+"""
+-->  Test if the region of a square contains the preset pattern of pieces
+-->  Parameters:
+-->          - img: image to be processed
+-->          - square: square to be tested
+-->  Return:
+-->          - True if the pieces match the preset pattern
+-->          - False if they don't
+"""
+
+def isPresetSquare(img, square):
+    x,y,w,h = cv2.boundingRect(square)
+    posCircles = findCircles(img[y:y+h,x:x+w])
+    board = getRelativePos(img[y:y+h,x:x+w], posCircles, False)
+    return comparePresetBoard(board)
+
+"""
+-->  Find the square of the board in the image
+-->  Near-identical squares found by different threshold levels are tested only once and
+-->  the search stops at the first square matching the preset pattern. With ranked search
+-->  (default) the candidates found so far are ranked by votes after each threshold level,
+-->  otherwise the squares are tested in the order they are found
+-->  Parameters:
+-->          - img: image to be processed
+-->          - areaSize: minimum area of the board
+-->          - ranked: test ranked candidates (None uses ProgConst.rankSquares)
+-->  Return:
+-->          - square of the board (4 corners)
+-->          - None if not successful
+"""
+
+def findBoardSquare(img, areaSize = 1000, ranked = None):
+    if ranked is None:
+        ranked = ProgConst.rankSquares
+    print ("Trying to find the board with size > " + str(areaSize) + "... ", end="", flush=True)
+    if ranked:
+        squares = (candidate.square for candidate in iterRankedCandidates(iterSquareLevels(img, areaSize)))
+    else:
+        squares = uniqueSquares(iterSquares(img, areaSize))
+    for square in squares:
+        if isPresetSquare(img, square):
+            ## --- Preset matched
+            if display.wants('Board detection', debug=True):
+                contourImg = framePool.copy('boardOverlay', img)
+                cv2.drawContours(contourImg, [square], 0, (0, 0, 255), 2 )
+                showImage('Board detection',contourImg, debug=True)
+            return square
+
+    ## --- Board not found. A larger areaSize only keeps squares already tested above,
+    ## --- so there is no need to run the sweep again with larger squares
+    print("FAIL")
+    return None
+
+"""
+-->  Reduce an image with cv2.pyrDown
+-->  Parameters:
+-->          - img: image to be reduced
+-->          - levels: number of levels (each level halves the size of the image)
+-->  Return:
+-->          - reduced image
+"""
+
+def pyramidDown(img, levels):
+    for _ in range(levels):
+        img = cv2.pyrDown(img)
+    return img
+
+"""
+-->  Refine a square inside a small window around it at full resolution
+-->  Parameters:
+-->          - img: full resolution image
+-->          - square: approximated square (full resolution coordinates)
+-->          - margin: margin of the window around the square
+-->  Return:
+-->          - refined square (the same square if none was found in the window)
+"""
+
+def refineSquare(img, square, margin):
+    x,y,w,h = cv2.boundingRect(square)
+    x0, y0 = max(0, x-margin), max(0, y-margin)
+    x1, y1 = min(img.shape[1], x+w+margin), min(img.shape[0], y+h+margin)
+    target = (square - [x0,y0]).astype(np.float32)
+    targetArea = cv2.contourArea(target)
+    bestSquare = square
+    bestIoU = 0
+    for candidate in groupSquares(iterSquares(img[y0:y1,x0:x1], targetArea//2)):
+        iou = squareIoU(target, candidate.polygon, targetArea)
+        if iou > bestIoU:
+            bestSquare = candidate.square + [x0,y0]
+            bestIoU = iou
+    return bestSquare
+
+"""
+-->  Find the square of the board with a coarse-to-fine search
+-->  The candidates are found on a reduced image, tested with the preset pattern on the full
+-->  resolution image and only the matched square is refined at full resolution
+-->  Parameters:
+-->          - img: image to be processed
+-->          - areaSize: minimum area of the board (full resolution)
+-->          - levels: number of pyrDown levels (None uses ProgConst.pyramidLevels)
+-->  Return:
+-->          - square of the board (4 corners)
+-->          - None if not successful
+"""
+
+def findBoardSquarePyramid(img, areaSize = 1000, levels = None):
+    if levels is None:
+        levels = ProgConst.pyramidLevels
+    if levels == 0:
+        return findBoardSquare(img, areaSize)
+    scale = 2**levels
+    print ("Trying to find the board with size > " + str(areaSize) + " (1/" + str(scale) + " scale)... ", end="", flush=True)
+    smallImg = pyramidDown(img, levels)
+    for candidate in iterRankedCandidates(iterSquareLevels(smallImg, areaSize//(scale*scale), levels=levels)):
+        square = (candidate.square*scale).astype(np.int32)
+        if isPresetSquare(img, square):
+            ## --- Preset matched
+            square = refineSquare(img, square, ProgConst.pyramidRefineMargin*scale)
+            if display.wants('Board detection', debug=True):
+                contourImg = framePool.copy('boardOverlay', img)
+                cv2.drawContours(contourImg, [square], 0, (0, 0, 255), 2 )
+                showImage('Board detection',contourImg, debug=True)
+            return square
+    print("FAIL")
+    return None
+
 """
 -->  Find the position of the board in the image and return position and sizes
 -->  Parameters:
 -->          - img: image to be processed
+-->          - areaSize: minimum area of the board
+-->          - levels: number of pyrDown levels of the search (None uses ProgConst.pyramidLevels)
 -->  Return:
 -->          - x: starting position on the x-axis
 -->          - y: starting position on the y-axis
@@ -329,37 +1220,430 @@ def findSquares(img, maxCountourArea = 4000, maxAspectRatioDiff = 0.1):
 -->          - If not successful, return -1
 """
 
-def configureBoardPosition(img, areaSize = 1000):
-    print ("Trying to find the board with size < " + str(areaSize) + "... ", end="", flush=True)
-    squares = findSquares(img,areaSize)
-    if squares is not None:
-        contourImg = img.copy()
-        for square in squares:
-            #cv2.drawContours(contourImg, [square], 0, (0, 255, 0), 2 )
-            x,y,w,h = cv2.boundingRect(square)
-            posCircles = findCircles(img[y:y+h,x:x+w])
-            board = getRelativePos(img[y:y+h,x:x+w], posCircles, False)
-            
-            if comparePresetBoard(board): 
-                ## --- Preset matched
-                cv2.drawContours(contourImg, [square], 0, (0, 0, 255), 2 )
-                showImage('Board detection',contourImg)
-                return x,y,h,w
-    
-    ## --- Board not found, trying again or aborting
-    print("FAIL")
-    if (img.size > areaSize*1.5):
-        ## --- Trying with larger squares
-        return configureBoardPosition(img, areaSize*1.5)
-    else:
-        ## --- Max size reached (areaSize = image size), return not found
-        if(img.size == areaSize):
-            return -1,-1,-1,-1
-        ## --- Last try, trying with maximum areaSize (size of the image)
+def configureBoardPosition(img, areaSize = 1000, levels = None):
+    square = findBoardSquarePyramid(img, areaSize, levels)
+    if square is None:
+        return -1,-1,-1,-1
+    x,y,w,h = cv2.boundingRect(square)
+    return x,y,h,w
+
+"""
+-->  Class to track the board between turns
+-->  Patches around the 4 corners of the board are stored at configuration time and searched
+-->  in a small window around the last known position. A full detection of the board is only
+-->  run when the match score of any corner is below the minimum confidence
+"""
+
+class BoardTracker:
+    def __init__(self, img, square, patchSize = None, searchRadius = None, minConfidence = None, patches = None):
+        self.patchSize = ProgConst.trackerPatchSize if patchSize is None else patchSize
+        self.searchRadius = ProgConst.trackerSearchRadius if searchRadius is None else searchRadius
+        self.minConfidence = ProgConst.trackerMinConfidence if minConfidence is None else minConfidence
+        if patches is None:
+            self.reset(img, square)
         else:
-            return configureBoardPosition(img,img.size)
-            
-            
+            self.setState(square, patches)
+
+    """
+    -->  Store the square and the corner patches of the board
+    -->  Parameters:
+    -->          - img: image of the board
+    -->          - square: square of the board (4 corners)
+    -->  Return:
+    -->          - None
+    """
+
+    def reset(self, img, square):
+        gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY, dst=framePool.like('trackerGray', img, 1))
+        imgHeight, imgWidth = gray.shape
+        square = np.array(square, dtype=np.int32).reshape(-1, 2)
+        patches = []
+        for corner in square:
+            ## --- Patch is moved inside the image if the corner is close to the border
+            x = int(min(max(corner[0] - self.patchSize//2, 0), imgWidth - self.patchSize))
+            y = int(min(max(corner[1] - self.patchSize//2, 0), imgHeight - self.patchSize))
+            patches.append((gray[y:y+self.patchSize, x:x+self.patchSize].copy(), corner - [x, y]))
+        self.setState(square, patches)
+
+    """
+    -->  Set the square and the corner patches of the board (used to restore a calibration)
+    -->  Parameters:
+    -->          - square: square of the board (4 corners)
+    -->          - patches: list of (patch, offset of the corner inside the patch)
+    -->  Return:
+    -->          - None
+    """
+
+    def setState(self, square, patches):
+        self.square = np.array(square, dtype=np.int32).reshape(-1, 2)
+        self.area = cv2.contourArea(self.square)
+        self.patches = patches
+        self.confidence = 1.0
+
+    """
+    -->  Search the corner patches around the last known position of the board
+    -->  Parameters:
+    -->          - gray: gray image of the current frame
+    -->  Return:
+    -->          - new square of the board
+    -->          - lowest match score of the 4 corners
+    """
+
+    def matchCorners(self, gray):
+        imgHeight, imgWidth = gray.shape
+        newSquare = self.square.copy()
+        confidence = 1.0
+        for i, (patch, offset) in enumerate(self.patches):
+            corner = self.square[i] - offset
+            x0 = int(max(corner[0] - self.searchRadius, 0))
+            y0 = int(max(corner[1] - self.searchRadius, 0))
+            x1 = int(min(corner[0] + self.patchSize + self.searchRadius, imgWidth))
+            y1 = int(min(corner[1] + self.patchSize + self.searchRadius, imgHeight))
+            if x1 - x0 < self.patchSize or y1 - y0 < self.patchSize:
+                return newSquare, 0.0
+            result = cv2.matchTemplate(gray[y0:y1, x0:x1], patch, cv2.TM_CCOEFF_NORMED)
+            _minVal, maxVal, _minLoc, maxLoc = cv2.minMaxLoc(result)
+            newSquare[i] = [x0 + maxLoc[0], y0 + maxLoc[1]] + offset
+            confidence = min(confidence, maxVal)
+        return newSquare, confidence
+
+    """
+    -->  Run a full detection of the board, choosing the square with the area closest to the
+    -->  tracked board (the preset pattern isn't on the board during the game)
+    -->  Parameters:
+    -->          - img: current frame
+    -->  Return:
+    -->          - square of the board
+    -->          - None if not found
+    """
+
+    def redetect(self, img):
+        bestSquare = None
+        bestScore = 0
+        for candidate in groupSquares(iterSquares(img, self.area*0.7)):
+            areaRatio = min(candidate.area, self.area) / max(candidate.area, self.area)
+            score = areaRatio * candidate.votes
+            if areaRatio > 0.8 and score > bestScore:
+                bestSquare = candidate.square
+                bestScore = score
+        return bestSquare
+
+    """
+    -->  Update the position of the board in a new frame
+    -->  Parameters:
+    -->          - img: current frame
+    -->  Return:
+    -->          - True if the board was found
+    -->          - False if the board was lost (last known position is kept)
+    """
+
+    def update(self, img):
+        gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY, dst=framePool.like('trackerGray', img, 1))
+        newSquare, self.confidence = self.matchCorners(gray)
+        if self.confidence >= self.minConfidence:
+            self.square = newSquare
+            return True
+        print(bcolors.WARNING + "Board tracking lost (score " + "%.2f" % self.confidence + "), detecting the board again... " + bcolors.ENDC, end="", flush=True)
+        square = self.redetect(img)
+        if square is None:
+            print(bcolors.FAIL + "FAIL" + bcolors.ENDC)
+            return False
+        print(bcolors.OKGREEN + "DONE" + bcolors.ENDC)
+        self.reset(img, square)
+        return True
+
+    """
+    -->  Update the position of the board and return its bounding rectangle
+    -->  Parameters:
+    -->          - img: current frame
+    -->  Return:
+    -->          - x, y, height, width of the board (same order of configureBoardPosition)
+    """
+
+    def track(self, img):
+        self.update(img)
+        return self.boundingRect()
+
+    """
+    -->  Bounding rectangle of the tracked board
+    -->  Return:
+    -->          - x, y, height, width of the board (same order of configureBoardPosition)
+    """
+
+    def boundingRect(self):
+        x,y,w,h = cv2.boundingRect(self.square)
+        return x,y,h,w
+
+"""
+-->  Sort the corners of a square as top-left, top-right, bottom-right and bottom-left
+-->  The corners are sorted clockwise by their angle around the centroid, so each corner is
+-->  used once at any rotation, and the list starts at the corner with the smallest x + y
+-->  Parameters:
+-->          - square: square with 4 corners in any order
+-->  Return:
+-->          - float32 array of the sorted corners
+"""
+
+def orderCorners(square):
+    square = np.array(square, dtype=np.float32).reshape(-1, 2)
+    center = square.mean(axis=0)
+    ## --- With the y axis pointing down, increasing angles are clockwise on the image
+    square = square[np.argsort(np.arctan2(square[:,1] - center[1], square[:,0] - center[0]))]
+    return np.roll(square, -int(np.argmin(square.sum(axis=1))), axis=0)
+
+"""
+-->  Class to produce a square image of the board without perspective
+-->  The homography of the board is baked in cv2.remap tables once for each position of the
+-->  board, so every image of the board costs a single remap of boardSize x boardSize pixels
+"""
+
+class BoardRectifier:
+    def __init__(self, square, boardSize = None, maps = None):
+        self.boardSize = ProgConst.boardImageSize if boardSize is None else boardSize
+        self.square = None
+        if maps is None:
+            self.setSquare(square)
+        else:
+            ## --- Remap tables restored from a calibration
+            self.square = orderCorners(square)
+            self.map1, self.map2 = maps
+
+    """
+    -->  Compute the remap tables of the board if its position changed
+    -->  Parameters:
+    -->          - square: square of the board (4 corners)
+    -->  Return:
+    -->          - None
+    """
+
+    def setSquare(self, square):
+        square = orderCorners(square)
+        if self.square is not None and np.array_equal(square, self.square):
+            return
+        self.square = square
+        size = self.boardSize
+        boardCorners = np.float32([[0, 0], [size-1, 0], [size-1, size-1], [0, size-1]])
+        ## --- Homography from the board image to the camera image
+        homography = cv2.getPerspectiveTransform(boardCorners, square)
+        xs, ys = np.meshgrid(np.arange(size, dtype=np.float32), np.arange(size, dtype=np.float32))
+        points = cv2.perspectiveTransform(np.dstack((xs, ys)).reshape(-1, 1, 2), homography)
+        mapX = points[:,0,0].reshape(size, size)
+        mapY = points[:,0,1].reshape(size, size)
+        ## --- Fixed point tables are faster in cv2.remap than float tables
+        self.map1, self.map2 = cv2.convertMaps(mapX, mapY, cv2.CV_16SC2)
+
+    """
+    -->  Produce the square image of the board
+    -->  Parameters:
+    -->          - img: camera image
+    -->          - dst: image where the board is written (None allocates a new image)
+    -->  Return:
+    -->          - boardSize x boardSize image of the board
+    """
+
+    def rectify(self, img, dst = None):
+        return cv2.remap(img, self.map1, self.map2, cv2.INTER_LINEAR, dst=dst)
+
+"""
+-->  Class to detect changes on the board with frame differencing
+-->  The board is sampled with a tiny rectified image, so each frame costs a remap of
+-->  sampleSize x sampleSize pixels. It reports when the motion on the board stops and if the
+-->  board changed since the last analysis, so the last board state can be reused
+-->  Frames are compared cell by cell: a single new piece covers a small part of the board, so it
+-->  is lost in the mean of the whole board but not in the mean of its cell
+"""
+
+class MotionGate:
+    def __init__(self, square, sampleSize = None, threshold = None, stillFrames = None, numSquares = None):
+        self.threshold = ProgConst.motionThreshold if threshold is None else threshold
+        self.numSquares = ProgConst.numSquares if numSquares is None else numSquares
+        self.stillFrames = ProgConst.motionStillFrames if stillFrames is None else stillFrames
+        self.rectifier = BoardRectifier(square, ProgConst.motionSampleSize if sampleSize is None else sampleSize)
+        self.previous = None
+        self.reference = None
+        ## --- Buffers of the samples, swapped with previous so no sample is allocated per frame
+        self.colourSample = None
+        self.spare = None
+        self.checkSample = None
+        self.difference = None
+        self.cellDifferences = None
+        self.moving = False
+        self.stillCount = 0
+
+    """
+    -->  Update the position of the board
+    -->  Parameters:
+    -->          - square: square of the board (4 corners)
+    -->  Return:
+    -->          - None
+    """
+
+    def setSquare(self, square):
+        self.rectifier.setSquare(square)
+
+    """
+    -->  Downsampled gray image of the board
+    -->  Parameters:
+    -->          - img: camera image
+    -->          - dst: gray image where the sample is written (None allocates a new image)
+    -->  Return:
+    -->          - sampleSize x sampleSize gray image
+    """
+
+    def sample(self, img, dst = None):
+        self.colourSample = self.rectifier.rectify(img, self.colourSample)
+        return cv2.cvtColor(self.colourSample, cv2.COLOR_BGR2GRAY, dst=dst)
+
+    """
+    -->  Largest mean absolute difference of the cells between two samples
+    -->  Parameters:
+    -->          - sampleA, sampleB: samples of the board
+    -->  Return:
+    -->          - mean absolute difference of the most changed cell
+    """
+
+    def cellDifference(self, sampleA, sampleB):
+        self.difference = cv2.absdiff(sampleA, sampleB, dst=self.difference)
+        ## --- Area interpolation averages the pixels of each cell (cells of fractional size included)
+        self.cellDifferences = cv2.resize(self.difference, (self.numSquares, self.numSquares), dst=self.cellDifferences,
+                                          interpolation=cv2.INTER_AREA)
+        return float(self.cellDifferences.max())
+
+    """
+    -->  Compare a new frame with the previous one
+    -->  Parameters:
+    -->          - img: camera image
+    -->  Return:
+    -->          - True if the motion on the board stopped in this frame
+    -->          - False otherwise
+    """
+
+    def update(self, img):
+        current = self.sample(img, self.spare)
+        previous, self.previous = self.previous, current
+        self.spare = previous
+        if previous is None:
+            return False
+        if self.cellDifference(current, previous) > self.threshold:
+            self.moving = True
+            self.stillCount = 0
+            return False
+        self.stillCount += 1
+        if self.moving and self.stillCount >= self.stillFrames:
+            self.moving = False
+            return True
+        return False
+
+    """
+    -->  Store the frame used by the last analysis of the board
+    -->  Parameters:
+    -->          - img: camera image
+    -->  Return:
+    -->          - None
+    """
+
+    def setReference(self, img):
+        self.reference = self.sample(img, self.reference)
+
+    """
+    -->  Test if the board is the same of the last analysis
+    -->  Parameters:
+    -->          - img: camera image
+    -->  Return:
+    -->          - True if there is no change since the last analysis
+    -->          - False if the board changed (or was never analyzed)
+    """
+
+    def isUnchanged(self, img):
+        if self.reference is None:
+            return False
+        self.checkSample = self.sample(img, self.checkSample)
+        return self.cellDifference(self.checkSample, self.reference) <= self.threshold
+
+"""
+-->  Save the calibration of the board to be reused in the next executions
+-->  Parameters:
+-->          - tracker: BoardTracker of the configured board
+-->          - rectifier: BoardRectifier of the configured board
+-->          - classifier: CellClassifier of the board (or None)
+-->          - imgShape: shape of the camera images
+-->          - path: directory of the calibration (None uses ProgConst.calibrationPath)
+-->  Return:
+-->          - None
+"""
+
+def saveBoardCalibration(tracker, rectifier, classifier, imgShape, path = None):
+    if path is None:
+        path = ProgConst.calibrationPath
+    metadata = {"square": tracker.square.tolist(),
+                "imageShape": list(imgShape[0:2]),
+                "numSquares": ProgConst.numSquares,
+                "boardImageSize": rectifier.boardSize,
+                "cellSize": rectifier.boardSize / ProgConst.numSquares,
+                "whiteThreshold": ProgConst.whiteThreshold,
+                "trackerPatchSize": tracker.patchSize,
+                "cellClassifier": None if classifier is None else classifier.toDict()}
+    arrays = {"trackerPatches": np.stack([patch for patch, offset in tracker.patches]),
+              "trackerOffsets": np.array([offset for patch, offset in tracker.patches], dtype=np.int32),
+              "remapMap1": rectifier.map1,
+              "remapMap2": rectifier.map2}
+    saveCalibration(path, metadata, arrays)
+
+"""
+-->  Load the stored calibration of the board and verify it with the current frame
+-->  Parameters:
+-->          - img: current frame
+-->          - path: directory of the calibration (None uses ProgConst.calibrationPath)
+-->  Return:
+-->          - BoardTracker, BoardRectifier, CellClassifier (or None) and white threshold of the stored board
+-->          - None, None, None, None if there is no calibration or if it doesn't match the current frame
+"""
+
+def loadBoardCalibration(img, path = None):
+    if path is None:
+        path = ProgConst.calibrationPath
+    metadata, arrays = loadCalibration(path)
+    if metadata is None:
+        return None, None, None, None
+    if (metadata["imageShape"] != list(img.shape[0:2]) or metadata["numSquares"] != ProgConst.numSquares or
+        metadata["boardImageSize"] != ProgConst.boardImageSize):
+        return None, None, None, None
+    patches = list(zip(arrays["trackerPatches"], arrays["trackerOffsets"]))
+    tracker = BoardTracker(None, metadata["square"], patchSize=metadata["trackerPatchSize"], patches=patches)
+
+    ## --- Quick verification: the corners of the board must be found around the stored position
+    square, tracker.confidence = tracker.matchCorners(cv2.cvtColor(img, cv2.COLOR_BGR2GRAY))
+    if tracker.confidence < tracker.minConfidence:
+        return None, None, None, None
+    tracker.square = square
+    rectifier = BoardRectifier(metadata["square"], metadata["boardImageSize"],
+                               (arrays["remapMap1"], arrays["remapMap2"]))
+    rectifier.setSquare(square)
+    classifier = None
+    if metadata["cellClassifier"] is not None:
+        classifier = CellClassifier.fromDict(metadata["cellClassifier"])
+    return tracker, rectifier, classifier, metadata["whiteThreshold"]
+
+"""
+-->  Start the recording of a session in a new file of ProgConst.sessionPath
+-->  Parameters:
+-->          - boardSize: size of the square image of the board
+-->  Return:
+-->          - SessionRecorder
+-->          - None if the recording is disabled or the file can't be created
+"""
+
+def startSessionRecorder(boardSize):
+    if ProgConst.sessionPath is None:
+        return None
+    path = os.path.join(ProgConst.sessionPath, time.strftime("session-%Y%m%d-%H%M%S.rec"))
+    try:
+        recorder = SessionRecorder(path, boardSize, ProgConst.numSquares)
+    except OSError as error:
+        print(bcolors.WARNING + "WARNING: Unable to record the session - " + error.__str__() + bcolors.ENDC)
+        return None
+    print("Recording the session in '" + path + "'")
+    return recorder
 
 """
 -->  Test if board detected have all the positions correct
@@ -453,19 +1737,18 @@ def printBoard(board):
     print("")
 
 """
--->  Complementary version of cv2.imshow to add commands cv2.namedWindow and cv.resizeWindow
--->  to standardize image windows
+-->  Complementary version of cv2.imshow using the display layer: standard windows created once,
+-->  nothing shown in headless mode and preview images throttled and downscaled
 -->  Parameters:
 -->          - windowName: name of the window
 -->          - img: image to be displayed
+-->          - debug: window only shown in debug mode
 -->  Return:
 -->          - None
 """
 
-def showImage(windowName, img):
-    cv2.namedWindow(windowName, cv2.WINDOW_NORMAL | cv2.WINDOW_KEEPRATIO | cv2.WINDOW_GUI_NORMAL)
-    cv2.resizeWindow(windowName,640,360)
-    cv2.imshow(windowName, img)
+def showImage(windowName, img, debug = False):
+    display.show(windowName, img, debug)
 
 """
 -->  Display an image with two diagonal lines from each corner of the image and crossing in the middle
@@ -476,7 +1759,9 @@ def showImage(windowName, img):
 """
 
 def drawCenterLine(windowName, img):
-    centerImg = img.copy()
+    if not display.wants(windowName):
+        return
+    centerImg = framePool.copy('centerOverlay', img)
     x,y,c = centerImg.shape
     cv2.line(centerImg,(0,0),(y,x),(255,0,0),2)
     cv2.line(centerImg,(y,0),(0,x),(255,0,0),2)
@@ -487,7 +1772,18 @@ def drawCenterLine(windowName, img):
 """
 
 def main():
-    cam = cv2.VideoCapture(0)
+    cam = ThreadedCapture(openFrameSource(ProgConst.frameSource, ProgConst.frameSourceFps), framePool).start()
+    if display.mode == 'stream':
+        try:
+            display.server = PreviewServer(ProgConst.previewPort, ProgConst.displayFps, ProgConst.previewQuality).start()
+            print("Preview server running on " + display.server.url())
+        except OSError as error:
+            print(bcolors.WARNING + "WARNING: Unable to start the preview server - " + error.__str__() + bcolors.ENDC)
+    if ProgConst.moveEngine == 'mcts':
+        ## --- The worker processes start while the board is set up, not in the first move
+        getMctsEngine(ProgConst.numSquares, ProgConst.winLength)
+    if display.mode in ('off', 'stream'):
+        print("Headless mode: type a key and press <ENTER> ('q' quit, 'c' configure the board, <ENTER> alone as <ENTER>)")
 
     # ---- Flags
     computerTurn = False
@@ -497,13 +1793,61 @@ def main():
     executionFlag = False
     errorFlag = False
     startMessage = True
+    ret_val = True
     
     
     # ---- New pieces list position
     newPiecePos = 0
     
     # ---- Position of the board
-    xPos = yPos = eightBoard = widthBoard = -1
+    tracker = rectifier = classifier = motionGate = None
+    estimator = BoardStateEstimator()
+    lastBoard = None
+    recorder = None
+
+    ## --- Read the newest frame, recording the image of the board if the session is recorded
+    ## --- ret_val is False at the end of a video or directory (or on a camera error): the game stops
+    def readFrame():
+        ret_val, frame, timestamp, frameIndex = cam.readWithTimestamp()
+        if ret_val and recorder is not None and rectifier is not None and ProgConst.recordLiveFrames:
+            boardImg = framePool.buffer('recordImg', (rectifier.boardSize, rectifier.boardSize, 3))
+            recorder.record(rectifier.rectify(frame, boardImg), timestamp, frameIndex)
+        return ret_val, frame
+
+    ## --- Read a new frame and detect the pieces of the board
+    def analyzeFrame():
+        ret_val, frame, timestamp, frameIndex = cam.readWithTimestamp(newFrame=True)
+        if not ret_val:
+            return None
+        tracker.update(frame)
+        rectifier.setSquare(tracker.square)
+        motionGate.setSquare(tracker.square)
+        motionGate.setReference(frame)
+        boardImg = rectifier.rectify(frame, framePool.buffer('boardImg', (rectifier.boardSize, rectifier.boardSize, 3)))
+        board = readBoard(boardImg, classifier)
+        if recorder is not None:
+            recorder.record(boardImg, timestamp, frameIndex, board)
+        return board
+
+    ## --- Board state of the current frame, reusing the last analysis if the board didn't change
+    def currentBoard(img):
+        nonlocal lastBoard
+        if lastBoard is not None and motionGate.isUnchanged(img):
+            print("Board unchanged since the last analysis")
+            return lastBoard, None
+        board, confidence = estimator.estimateBoard(analyzeFrame)
+        if board is not None:
+            lastBoard = board
+        return board, confidence
+
+    ## --- Board state used by the game: an empty board if no frame gave a valid board
+    def gameBoard(img):
+        board, confidence = currentBoard(img)
+        if board is None:
+            print(bcolors.WARNING + "WARNING: No valid board in " + str(estimator.rejectedFrames) + " frames, using an empty board" + bcolors.ENDC)
+            board = np.chararray((ProgConst.numSquares,ProgConst.numSquares),1,True)
+            board[:] = '-'
+        return board, confidence
     
     ## --- Configuration of the serial port
     serialCounter = 1
@@ -524,24 +1868,63 @@ def main():
                 errorFlag = True
                 break
 
+    ## --- Warm start with the stored calibration of the board
+    if executionFlag:
+        print("Trying to load the board calibration from '" + ProgConst.calibrationPath + "'... ", end="", flush = True)
+        ret_val, img = readFrame()
+        if ret_val:
+            tracker, rectifier, classifier, whiteThreshold = loadBoardCalibration(img)
+        if tracker is not None:
+            ## --- Threshold of the stored board, applied only once the calibration is accepted
+            ProgConst.whiteThreshold = whiteThreshold
+            motionGate = MotionGate(tracker.square)
+            print(bcolors.OKGREEN + "DONE" + bcolors.ENDC)
+            boardConfigurated = True
+            recorder = startSessionRecorder(rectifier.boardSize)
+        else:
+            print(bcolors.WARNING + "NOT FOUND" + bcolors.ENDC)
+
     ## --- Execution of the computer vision     
     while executionFlag:
-        ret_val, img = cam.read(1)
+        ret_val, img = readFrame()
+        if not ret_val:
+            break
         showImage('Live Feed',img)
 
+        ## --- Detection of motion on the board
+        if motionGate is not None and motionGate.update(img):
+            print(bcolors.OKBLUE + "Motion stopped on the board" + bcolors.ENDC)
+
         ## --- Configuration of the board size
         if not boardConfigurated:
             print(bcolors.WARNING+"\nSetup the board and press any key to start configuration"+bcolors.ENDC)
-            while cv2.waitKey(1) == -1:
-                ret_val, img = cam.read(1)
+            while display.waitKey(1) == -1:
+                ret_val, img = readFrame()
+                if not ret_val:
+                    break
                 showImage('Live Feed',img)
                 drawCenterLine('Centered Image',img)
+            if not ret_val:
+                break
             print("\nInitializing board configuration... ")
-            cv2.destroyWindow('Centered Image')
-            xPos, yPos, heightBoard, widthBoard = configureBoardPosition(img)
-            if (xPos != -1 and yPos != -1 and heightBoard != -1 and widthBoard != -1):
+            display.destroyWindow('Centered Image')
+            boardSquare = findBoardSquarePyramid(img)
+            if boardSquare is not None:
+                tracker = BoardTracker(img, boardSquare)
+                rectifier = BoardRectifier(boardSquare)
+                motionGate = MotionGate(boardSquare)
+                lastBoard = None
+                boardImg = rectifier.rectify(img)
+                presetBoard = getRelativePos(boardImg, findCircles(boardImg), False)
+                classifier = CellClassifier.fit(boardImg, presetBoard)
+                saveBoardCalibration(tracker, rectifier, classifier, img.shape)
                 print(bcolors.OKGREEN + "DONE" + bcolors.ENDC)
                 boardConfigurated = True
+                if recorder is None:
+                    recorder = startSessionRecorder(rectifier.boardSize)
+                ## --- The preset board is recorded, so the replay fits the same cell classifier
+                if recorder is not None and classifier is not None:
+                    recorder.record(boardImg, time.time(), PRESET_FRAME, presetBoard)
             else:
                 print(bcolors.FAIL + "FAIL" + bcolors.ENDC)
                 print(bcolors.FAIL + "ERROR: Unable to find the board" + bcolors.ENDC)
@@ -549,9 +1932,13 @@ def main():
                 errorFlag = True
             if(errorFlag is False):
                 print("\n"+bcolors.WARNING+"Clear the board and press any key!"+bcolors.ENDC)
-                while cv2.waitKey(1) == -1:
-                    ret_val, img = cam.read(1)
+                while display.waitKey(1) == -1:
+                    ret_val, img = readFrame()
+                    if not ret_val:
+                        break
                     showImage('Live Feed',img)
+                if not ret_val:
+                    break
 
         if startMessage:
             print("\n--------------------------------------------")
@@ -564,14 +1951,11 @@ def main():
             print("\n--------------------")
             print("---- ROBOT TURN ----")
             print("--------------------")
-            boardImg = img[yPos:yPos+heightBoard,xPos:xPos+widthBoard]
-            
-            posCircles = findCircles(boardImg)
-            board = getRelativePos(boardImg, posCircles, False)
-
-            if board is None:
-                board = np.chararray((3,3),1,True)
-                board[:] = '-'
+            ## --- The estimation reads new frames, so the capture reuses the buffer of img: keep a copy
+            img = framePool.copy('keptFrame', img)
+            board, confidence = gameBoard(img)
+            if confidence is not None and confidence.min() < estimator.minConfidence:
+                print(bcolors.WARNING + "WARNING: Low agreement of the cells (" + "%.2f" % confidence.min() + ")" + bcolors.ENDC)
             
             printBoard(board)
             
@@ -590,9 +1974,13 @@ def main():
                 print("\nGAME PAUSED!")
                 print("Press <ENTER> to unpause the game")
                 
-                while cv2.waitKey(1) != 13:
-                    ret_val, img = cam.read(1)
+                while display.waitKey(1) != 13:
+                    ret_val, img = readFrame()
+                    if not ret_val:
+                        break
                     showImage('Live Feed',img)
+                if not ret_val:
+                    break
 
                 print("Trying to send command to robot...",end="", flush = True)
 
@@ -606,13 +1994,17 @@ def main():
             print("\nGAME PAUSED!")
             print("Press <ENTER> to unpause the game")
             
-            while cv2.waitKey(1) != 13:
-                ret_val, img = cam.read(1)
+            while display.waitKey(1) != 13:
+                ret_val, img = readFrame()
+                if not ret_val:
+                    break
                 showImage('Live Feed',img)
+            if not ret_val:
+                break
             
-            boardImg = img[yPos:yPos+heightBoard,xPos:xPos+widthBoard]
-            posCircles = findCircles(boardImg)
-            board = getRelativePos(boardImg, posCircles, False)
+            ## --- The estimation reads new frames, so the capture reuses the buffer of img: keep a copy
+            img = framePool.copy('keptFrame', img)
+            board, confidence = gameBoard(img)
             printBoard(board)
             if isWinner(board,ProgConst.computerLetter):
                 print ("---------------------------------")
@@ -642,14 +2034,14 @@ def main():
             else:
                 print("Waiting for the player turn")
 
-            while cv2.waitKey(1) != 13:
+            while display.waitKey(1) != 13:
                     pass
                               
             computerTurn = False
         
         ## --- Keyboard inputs        
         else:
-            key = cv2.waitKey(1)
+            key = display.waitKey(1)
             if key == 27: # esc to quit
                 executionFlag = False 
                 
@@ -658,14 +2050,14 @@ def main():
                 
             elif key == 32: # space to configure board
                 boardConfigurated = False 
-                xPos = yPos = heightBoard = widthBoard = -1
+                tracker = rectifier = classifier = motionGate = None
                 
             elif key == 8: # backspace to centerLines
                 if centerLines == False:
                     centerLines = True
                 else:
                     centerLines = False
-                    cv2.destroyWindow('Centered Image')             
+                    display.destroyWindow('Centered Image')             
 
         ## --- Create a window with image and center lines
         if centerLines == True:
@@ -673,12 +2065,22 @@ def main():
     
     if(errorFlag):
         print(bcolors.WARNING + "Program finishing by error\n" + bcolors.ENDC)
+    elif not ret_val:
+        print(bcolors.WARNING + "Program finishing: no more frames from the source\n" + bcolors.ENDC)
     else:
         print(bcolors.OKBLUE + "Program finishing by keyboard input\n" + bcolors.ENDC)
         
+    print("Frames captured: " + str(cam.frameIndex) + " - dropped: " + str(cam.droppedFrames))
+    print("Image buffers allocated: " + str(framePool.allocations) + " - frames allocated by the source: " + str(cam.sourceAllocations))
+
     ##END OF PROGRAM EXECUTION
+    if recorder is not None:
+        recorder.close()
+        print("Session recorded: " + str(recorder.recordedFrames) + " frames - dropped: " + str(recorder.droppedRecords))
     serialPort.close()
-    cv2.destroyAllWindows()
+    display.close()
+    for engine in mctsEngines.values():
+        engine.close()
     cam.release()
         
         
@@ -0,0 +1,243 @@
+"""
+:File: transposition.py
+:Description: | Transposition table of the search engine, persisted in a memory-mapped file
+              | Positions are keyed by a Zobrist hash made canonical over the 8 symmetries of
+              | the board (rotations and reflections), so symmetric positions share the entries
+              | Bounded size, the replacement prefers deeper and newer entries
+
+:Author: Willian Beraldi Esperandio
+:Email: willian.esperandio@gmail.com
+:Date: 16/10/2026
+:Revision: version 1
+:License: MIT License
+"""
+
+
+import os
+from functools import lru_cache
+import numpy as np
+
+"""
+--> Flags of the entries (empty, exact score, lower and upper bounds), seed of the Zobrist keys
+--> and type of the entries of the table (18 bytes)
+"""
+
+EMPTY = 0
+EXACT = 1
+LOWER = 2
+UPPER = 3
+ZOBRIST_SEED = 20261016
+ENTRY_DTYPE = np.dtype([('key', '<u8'), ('score', '<i4'), ('move', '<i2'), ('depth', 'i1'), ('flag', 'u1'),
+                        ('age', '<u2')])
+
+"""
+-->  Permutations of the cells of the 8 symmetries of the board (dihedral group of the square)
+-->  Parameters:
+-->          - numSquares: number of cells of each row
+-->  Return:
+-->          - tuple of 8 permutations, permutation[cell] = cell of the transformed board
+"""
+
+@lru_cache(maxsize=16)
+def symmetryPermutations(numSquares):
+    last = numSquares - 1
+    transforms = (lambda i, j: (i, j), lambda i, j: (j, last-i), lambda i, j: (last-i, last-j),
+                  lambda i, j: (last-j, i), lambda i, j: (i, last-j), lambda i, j: (last-i, j),
+                  lambda i, j: (j, i), lambda i, j: (last-j, last-i))
+    permutations = []
+    for transform in transforms:
+        permutation = []
+        for cell in range(numSquares*numSquares):
+            i, j = transform(*divmod(cell, numSquares))
+            permutation.append(i*numSquares + j)
+        permutations.append(tuple(permutation))
+    return tuple(permutations)
+
+"""
+-->  Inverse of the permutations of symmetryPermutations
+"""
+
+@lru_cache(maxsize=16)
+def inversePermutations(numSquares):
+    inverses = []
+    for permutation in symmetryPermutations(numSquares):
+        inverse = [0]*len(permutation)
+        for cell, image in enumerate(permutation):
+            inverse[image] = cell
+        inverses.append(tuple(inverse))
+    return tuple(inverses)
+
+"""
+--> Class of the Zobrist hashes of the positions in the 8 symmetries
+--> A position is seen by the player to move, so two hashes are kept: hashes[0] with the
+--> pieces of the player to move as the first colour and hashes[1] with the colours swapped.
+--> After a move the roles swap, so both are updated with one xor for each symmetry
+"""
+
+class ZobristHasher:
+    def __init__(self, numSquares, seed=ZOBRIST_SEED):
+        numCells = numSquares*numSquares
+        rng = np.random.RandomState(seed + numSquares)
+        baseKeys = rng.randint(1, 2**63, (2, numCells), dtype=np.int64).astype(np.uint64) << np.uint64(1)
+        baseKeys ^= rng.randint(0, 2, (2, numCells)).astype(np.uint64)
+        permutations = symmetryPermutations(numSquares)
+        ## --- keys[colour][cell] = keys of the cell in each of the 8 symmetries
+        self.keys = tuple(tuple(tuple(int(baseKeys[colour][permutation[cell]]) for permutation in permutations)
+                                for cell in range(numCells)) for colour in range(2))
+
+    """
+    -->  Hashes of a position
+    -->  Parameters:
+    -->          - mover: pieces of the player to move
+    -->          - opponent: pieces of the opponent
+    -->  Return:
+    -->          - (hashes of the position, hashes with the colours swapped), 8 hashes each
+    """
+
+    def hashPosition(self, mover, opponent):
+        hashes = [[0]*8, [0]*8]
+        for colour, pieces in ((0, mover), (1, opponent)):
+            cell = 0
+            while pieces:
+                if pieces & 1:
+                    for s in range(8):
+                        hashes[0][s] ^= self.keys[colour][cell][s]
+                        hashes[1][s] ^= self.keys[1-colour][cell][s]
+                pieces >>= 1
+                cell += 1
+        return tuple(hashes[0]), tuple(hashes[1])
+
+    """
+    -->  Hashes of the position after a move of the player to move
+    """
+
+    def play(self, hashes, cell):
+        moverHashes, swappedHashes = hashes
+        return (tuple(h ^ k for h, k in zip(swappedHashes, self.keys[1][cell])),
+                tuple(h ^ k for h, k in zip(moverHashes, self.keys[0][cell])))
+
+"""
+-->  Canonical key of a position: the smallest hash of the 8 symmetries
+-->  Parameters:
+-->          - hashes: hashes of the position (first item of ZobristHasher hashes)
+-->  Return:
+-->          - key and index of the symmetry of the key
+"""
+
+def canonicalKey(hashes):
+    key = min(hashes)
+    return key, hashes.index(key)
+
+"""
+--> Class of the transposition table
+--> One entry for each index (key modulo size). A new entry replaces the stored one if it is the
+--> same position, if it was searched at least as deep or if the stored one is from an older search.
+--> Moves are stored in the canonical orientation and converted back on lookup
+"""
+
+class TranspositionTable:
+    def __init__(self, numSquares, k, size=2**18, path=None):
+        self.numSquares = numSquares
+        self.k = k
+        self.size = 1 << (size - 1).bit_length()
+        self.mask = self.size - 1
+        self.permutations = symmetryPermutations(numSquares)
+        self.inverses = inversePermutations(numSquares)
+        self.path = path
+        self.entries = None
+        if path is not None:
+            fileName = os.path.join(path, "transposition-%dx%d-k%d.npy" % (numSquares, numSquares, k))
+            self.entries = openEntries(fileName, self.size)
+        if self.entries is None:
+            self.entries = np.zeros(self.size, ENTRY_DTYPE)
+        self.keys = self.entries['key']
+        self.scores = self.entries['score']
+        self.moves = self.entries['move']
+        self.depths = self.entries['depth']
+        self.flags = self.entries['flag']
+        self.ages = self.entries['age']
+        self.generation = int(self.ages.max()) if self.size else 0
+        self.hits = 0
+        self.stores = 0
+
+    """
+    -->  Start a new search: entries of older searches become replaceable
+    """
+
+    def newSearch(self):
+        self.generation = (self.generation + 1) % 65536
+
+    """
+    -->  Look up a position
+    -->  Parameters:
+    -->          - key: canonical key of the position
+    -->          - symmetry: symmetry of the canonical key
+    -->  Return:
+    -->          - score, depth, flag and best move (in the orientation of the position)
+    -->          - None if the position isn't stored
+    """
+
+    def probe(self, key, symmetry):
+        index = key & self.mask
+        if self.flags[index] == EMPTY or int(self.keys[index]) != key:
+            return None
+        self.hits += 1
+        move = int(self.moves[index])
+        if move >= 0:
+            move = self.inverses[symmetry][move]
+        return int(self.scores[index]), int(self.depths[index]), int(self.flags[index]), move
+
+    """
+    -->  Store a position
+    -->  Parameters:
+    -->          - key, symmetry: canonical key of the position and its symmetry
+    -->          - score: score of the position (relative to the position, not to the root)
+    -->          - depth: depth of the search
+    -->          - flag: EXACT, LOWER (fail high) or UPPER (fail low)
+    -->          - move: best move (-1 if none)
+    -->  Return:
+    -->          - None
+    """
+
+    def store(self, key, symmetry, score, depth, flag, move):
+        index = key & self.mask
+        if (self.flags[index] != EMPTY and int(self.keys[index]) != key and
+                depth < self.depths[index] and self.ages[index] == self.generation):
+            return
+        self.keys[index] = key
+        self.scores[index] = score
+        self.moves[index] = -1 if move is None or move < 0 else self.permutations[symmetry][move]
+        self.depths[index] = max(-128, min(127, depth))
+        self.flags[index] = flag
+        self.ages[index] = self.generation
+        self.stores += 1
+
+    """
+    -->  Write the table to its file (if it is persisted)
+    """
+
+    def flush(self):
+        if isinstance(self.entries, np.memmap):
+            self.entries.flush()
+
+"""
+-->  Open (or create) the file of the entries of a transposition table
+-->  Parameters:
+-->          - fileName: .npy file of the entries
+-->          - size: number of entries
+-->  Return:
+-->          - memory-mapped array of entries
+-->          - None if the file can't be created
+"""
+
+def openEntries(fileName, size):
+    try:
+        if os.path.exists(fileName):
+            entries = np.lib.format.open_memmap(fileName, mode='r+')
+            if entries.dtype == ENTRY_DTYPE and entries.shape == (size,):
+                return entries
+            del entries
+        os.makedirs(os.path.dirname(fileName) or '.', exist_ok=True)
+        return np.lib.format.open_memmap(fileName, mode='w+', dtype=ENTRY_DTYPE, shape=(size,))
+    except (OSError, ValueError):
+        return None